@@ -0,0 +1,247 @@
+"""Population aggregates of the training store for the analytics panel.
+
+Usage:
+    python analytics.py [--rebuild]          # refresh data/analytics.npz, print a summary
+
+Two kinds of compact arrays are kept, both additive so that rows appended to
+the store (`python data_store.py append`) are folded in without reading the
+earlier ones again:
+
+    groups  risk-category counts per age band, smoking status and blood
+            pressure bucket: one (n_groups, 3) int64 array each
+    values  per continuous feature, the sorted distinct values (rounded to
+            RESOLUTION) and their counts; a percentile is two searchsorted
+            calls on it, and the same arrays give the feature histograms of
+            the panel (Aggregates.histogram)
+
+refresh() returns the aggregates of the current store: unchanged store ->
+the saved file; store grown from the saved one (its hash is a prefix of the
+store's chain) -> only the new rows are aggregated and merged; anything else
+-> full rebuild, in CHUNK_ROWS blocks of the memory-mapped arrays.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import numpy as np
+
+import cardio_model
+import data_store
+import features
+
+AGG_PATH   = os.path.join(data_store.STORE_DIR, "analytics.npz")
+FORMAT     = 1
+CHUNK_ROWS = 1_000_000
+RESOLUTION = {'daily_steps': 10.0}   # others: 0.1
+N_CLASSES  = len(cardio_model.RISK_LABELS)
+
+
+# ── GROUPS ──
+def _age_band(col):
+    """<30, then decades up to 70+ (the form accepts ages from 10)."""
+    age = col('age')
+    return np.digitize(age, [30, 40, 50, 60, 70]), np.isnan(age)
+
+
+def _smoking(col):
+    s = col('smoking_status')
+    return np.nan_to_num(s).astype(np.int64), np.isnan(s)
+
+
+def _bp_bucket(col):
+    """Normal / elevated / stage 1 / stage 2 from the worse of the two pressures."""
+    sys_bp, dia_bp = col('systolic_bp'), col('diastolic_bp')
+    dia = np.array([0, 2, 3])[np.digitize(np.nan_to_num(dia_bp), [80, 90])]
+    return np.maximum(np.digitize(np.nan_to_num(sys_bp), [120, 130, 140]), dia), \
+        np.isnan(sys_bp) | np.isnan(dia_bp)
+
+
+# name: (title, group labels, function(column getter) -> (group index, missing mask))
+GROUPS = {
+    'age_band':   ("Tranche d'age", ["<30", "30-39", "40-49", "50-59", "60-69", "70+"], _age_band),
+    'smoking':    ("Tabagisme", ["Jamais", "Ex-fumeur", "Fumeur"], _smoking),
+    'bp_bucket':  ("Tension arterielle", ["Normale", "Elevee", "HTA grade 1", "HTA grade 2"], _bp_bucket),
+}
+
+
+def value_features(feat_cols):
+    """The features with a percentile: everything but the codes."""
+    return [c for c in feat_cols if c not in features.CODES]
+
+
+# ── AGGREGATES ──
+class Aggregates:
+    """groups {name: (n_groups, 3) counts}, values {feature: (sorted values, counts)}."""
+
+    def __init__(self, feat_cols, rows=0, hash=None, groups=None, values=None):
+        self.feat_cols = list(feat_cols)
+        self.rows = rows
+        self.hash = hash
+        self.groups = groups or {g: np.zeros((len(GROUPS[g][1]), N_CLASSES), dtype=np.int64)
+                                 for g in GROUPS}
+        self.values = values or {c: (np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64))
+                                 for c in value_features(feat_cols)}
+        self._cum = {}
+
+    def add(self, other):
+        """Merge the aggregates of other rows into this one."""
+        for g, counts in other.groups.items():
+            self.groups[g] = self.groups[g] + counts
+        for c, (v2, n2) in other.values.items():
+            v1, n1 = self.values[c]
+            v = np.union1d(v1, v2)
+            n = np.zeros(len(v), dtype=np.int64)
+            n[np.searchsorted(v, v1)] += n1
+            n[np.searchsorted(v, v2)] += n2
+            self.values[c] = (v, n)
+        self._cum.clear()
+        self.rows += other.rows
+        self.hash = other.hash
+
+    def percentile(self, feature, value):
+        """Share (%) of the population below `value`, ties counted half."""
+        v, n = self.values[feature]
+        if not len(v) or value != value:
+            return float("nan")
+        if feature not in self._cum:
+            self._cum[feature] = np.concatenate([[0], np.cumsum(n)])
+        cum = self._cum[feature]
+        value = _quantise(feature, np.float32(value))
+        below, upto = cum[np.searchsorted(v, value, "left")], cum[np.searchsorted(v, value, "right")]
+        return float((below + upto) / 2 / cum[-1] * 100)
+
+    def histogram(self, feature, bins=30):
+        """(bin edges, counts) from the distinct values, without touching the rows."""
+        v, n = self.values[feature]
+        if not len(v):
+            return np.zeros(bins + 1), np.zeros(bins, dtype=np.int64)
+        edges = np.linspace(v[0], v[-1], bins + 1)
+        idx = np.clip(np.searchsorted(edges, v, "right") - 1, 0, bins - 1)
+        return edges, np.bincount(idx, weights=n, minlength=bins).astype(np.int64)
+
+    def group_of(self, x):
+        """{group name: index} of one float32 feature row."""
+        col = lambda c: x[None, self.feat_cols.index(c)]
+        out = {}
+        for g, (_, _, fn) in GROUPS.items():
+            idx, missing = fn(col)
+            if not missing[0]:
+                out[g] = int(idx[0])
+        return out
+
+
+def _steps(feature, values):
+    return np.round(np.asarray(values, dtype=np.float64) / RESOLUTION.get(feature, 0.1)).astype(np.int64)
+
+
+def _quantise(feature, values):
+    return (_steps(feature, values) * RESOLUTION.get(feature, 0.1)).astype(np.float32)
+
+
+def _value_counts(feature, values):
+    """Sorted distinct quantised values and their counts: a bincount, no sort."""
+    step = RESOLUTION.get(feature, 0.1)
+    q = _steps(feature, values[~np.isnan(values)])
+    if not len(q):
+        return np.empty(0, dtype=np.float32), np.empty(0, dtype=np.int64)
+    lo = q.min()
+    counts = np.bincount(q - lo)
+    present = np.flatnonzero(counts)
+    return ((present + lo) * step).astype(np.float32), counts[present]
+
+
+def compute(X, y, feat_cols, hash=None):
+    """Aggregates of the rows X (n, n_features), y (n,) int risk category."""
+    X, y = np.asarray(X), np.asarray(y, dtype=np.int64)
+    col = lambda c: X[:, feat_cols.index(c)]
+    agg = Aggregates(feat_cols, len(y), hash)
+    for g, (_, labels, fn) in GROUPS.items():
+        idx, missing = fn(col)
+        keep = ~missing
+        flat = np.bincount(idx[keep] * N_CLASSES + y[keep], minlength=len(labels) * N_CLASSES)
+        agg.groups[g] = flat.reshape(len(labels), N_CLASSES)
+    for c in agg.values:
+        agg.values[c] = _value_counts(c, col(c))
+    return agg
+
+
+def _compute_store(store, start=0):
+    agg = Aggregates(store.feat_cols, hash=store.hash)
+    for i in range(start, store.rows, CHUNK_ROWS):
+        j = min(i + CHUNK_ROWS, store.rows)
+        agg.add(compute(store.X[i:j], store.y[i:j], store.feat_cols, store.hash))
+    return agg
+
+
+# ── FILE ──
+def save(agg, path=AGG_PATH):
+    arrays = {"meta": np.array(json.dumps({"format": FORMAT, "feat_cols": agg.feat_cols,
+                                           "rows": agg.rows, "hash": agg.hash}))}
+    for g, counts in agg.groups.items():
+        arrays[f"group.{g}"] = counts
+    for c, (v, n) in agg.values.items():
+        arrays[f"values.{c}"], arrays[f"counts.{c}"] = v, n
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp, path)
+
+
+def load(path=AGG_PATH):
+    """The saved aggregates, or None if missing or from another format / layout."""
+    try:
+        with np.load(path) as f:
+            meta = json.loads(str(f["meta"]))
+            if meta.get("format") != FORMAT or set(f"group.{g}" for g in GROUPS) - set(f.files):
+                return None
+            groups = {g: f[f"group.{g}"] for g in GROUPS}
+            values = {c: (f[f"values.{c}"], f[f"counts.{c}"]) for c in value_features(meta["feat_cols"])}
+    except (OSError, KeyError, ValueError):
+        return None
+    return Aggregates(meta["feat_cols"], meta["rows"], meta["hash"], groups, values)
+
+
+def refresh(store_dir=cardio_model.STORE_DIR, path=None, rebuild=False):
+    """Aggregates of the current store; returns (aggregates, how) with how in
+    "cached" / "incremental" / "full"."""
+    store = data_store.open_store(store_dir)
+    path = path or os.path.join(store_dir, os.path.basename(AGG_PATH))
+    agg = None if rebuild else load(path)
+    if agg is not None and agg.feat_cols == store.feat_cols:
+        if agg.hash == store.hash and agg.rows == store.rows:
+            return agg, "cached"
+        if store.rows_at(agg.hash) == agg.rows:
+            agg.add(_compute_store(store, agg.rows))
+            save(agg, path)
+            return agg, "incremental"
+    agg = _compute_store(store)
+    save(agg, path)
+    return agg, "full"
+
+
+# ── CLI ──
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA population aggregates")
+    parser.add_argument("--store", default=cardio_model.STORE_DIR)
+    parser.add_argument("--rebuild", action="store_true", help="ignore the saved aggregates")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    agg, how = refresh(args.store, rebuild=args.rebuild)
+    secs = time.perf_counter() - t0
+    size = sum(a.nbytes for a in agg.groups.values()) + \
+        sum(v.nbytes + n.nbytes for v, n in agg.values.values())
+    print(f"{agg.rows} rows, {how} in {secs * 1000:.1f} ms, {size / 1024:.1f} KiB of aggregates")
+    for g, (title, labels, _) in GROUPS.items():
+        print(f"\n{title}")
+        for label, counts in zip(labels, agg.groups[g]):
+            total = counts.sum()
+            shares = "  ".join(f"{c / total * 100:5.1f}%" if total else "    -" for c in counts)
+            print(f"  {label:<12}{total:>9}  {shares}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Headless HTTP scoring API for integration with the hospital information system.
+
+Usage:
+    uvicorn api:app --host 0.0.0.0 --port 8000 [--workers 4]
+
+    POST /predict  {"age": 62, "bmi": 25.0, ...}          -> one result
+    POST /predict  {"patients": [{...}, {...}]}           -> {"results": [...]}
+    GET  /health
+    GET  /metrics                                         -> Prometheus text (CARDIO_PERF=1)
+
+Patients carry the 14 feature columns of the training CSV; smoking_status is
+Never/Former/Current or its 0/1/2 code and bmi may be replaced by height_cm
+and weight_kg. Values outside features.RANGES get a 422. No PDF is produced
+here. Scored patients are counted by the drift monitor (drift.py).
+"""
+import contextlib
+
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+import cardio_model
+import drift
+import features
+import inference_server
+import perf
+
+MAX_BATCH = 10_000
+
+_state = {}
+
+
+def _model():
+    """(model, feat_cols) of the published artifact, hot-swapped by ServingModel
+    (or the shared worker pool when CARDIO_INFERENCE_SOCKET is set)."""
+    if "serving" not in _state:
+        if inference_server.SOCKET:
+            _state["serving"] = inference_server.RemoteModel(inference_server.SOCKET)
+        else:
+            _state["serving"] = cardio_model.ServingModel(fit_missing=True)
+    return _state["serving"].get()
+
+
+def _result(proba, idx, score):
+    return {
+        "proba":         {"low": float(proba[0]), "medium": float(proba[1]), "high": float(proba[2])},
+        "risk_category": int(idx),
+        "risk_label":    cardio_model.RISK_LABELS[idx],
+        "score":         round(float(score), 2),
+    }
+
+
+async def predict(request):
+    with perf.request("api_predict"):
+        with perf.timer("api_parse"):
+            try:
+                body = await request.json()
+            except ValueError:
+                return JSONResponse({"error": "invalid JSON"}, status_code=400)
+
+        batched = isinstance(body, dict) and "patients" in body
+        patients = body["patients"] if batched else [body]
+        if not isinstance(patients, list) or not patients:
+            return JSONResponse({"error": "'patients' must be a non-empty list"}, status_code=422)
+        if len(patients) > MAX_BATCH:
+            return JSONResponse({"error": f"at most {MAX_BATCH} patients per request"}, status_code=413)
+        # scoring blocks (model load, NumPy / xgboost, drift reference, worker
+        # socket): run it in the threadpool so the event loop keeps serving
+        return await run_in_threadpool(_score, patients, batched)
+
+
+def _score(patients, batched):
+    model, feat_cols = _model()
+    with perf.timer("api_validate"):
+        try:
+            X = features.from_records(patients, feat_cols)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=422)
+
+    probas, classes, scores = cardio_model.predict(model, X)
+    with perf.timer("drift"):
+        drift.monitor(model).observe(X, classes)
+    with perf.timer("api_serialize"):
+        results = [_result(p, i, s) for p, i, s in zip(probas, classes, scores)]
+        return JSONResponse({"results": results} if batched else results[0])
+
+
+def health(request):
+    model, _ = _model()
+    return JSONResponse({"status": "ok", "model": model.fingerprint[:12]})
+
+
+async def metrics(request):
+    return PlainTextResponse(perf.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    _model()  # load before accepting traffic
+    yield
+
+
+app = Starlette(
+    routes=[
+        Route("/predict", predict, methods=["POST"]),
+        Route("/health", health, methods=["GET"]),
+        Route("/metrics", metrics, methods=["GET"]),
+    ],
+    lifespan=lifespan,
+)
@@ -1,356 +1,113 @@
+import startup_profile
 import streamlit as st
-import pandas as pd
-import xgboost as xgb
-import numpy as np
-from fpdf import FPDF
 from datetime import datetime
 import pytz
-import time
-import unicodedata
+import functools
+import hashlib
 import io
+import os
+import time
 
-# --- CONFIGURATION ---
-st.set_page_config(page_title="CardioIA Pro", layout="wide", page_icon="🫀")
-
-# --- SESSION STATE INIT ---
-if "pdf_bytes" not in st.session_state:
-    st.session_state.pdf_bytes = None
-if "pdf_filename" not in st.session_state:
-    st.session_state.pdf_filename = "bilan.pdf"
-if "show_result" not in st.session_state:
-    st.session_state.show_result = False
-if "result_html" not in st.session_state:
-    st.session_state.result_html = ""
-
-# --- HELPER: strip accents for PDF ---
-def safe(text):
-    """Convert any string to latin-1 safe ASCII for FPDF."""
-    text = str(text)
-    text = unicodedata.normalize('NFKD', text)
-    return text.encode('latin-1', 'ignore').decode('latin-1')
-
-# --- LIGHT ELEGANT THEME ---
-st.markdown("""
-    <style>
-    @import url('https://fonts.googleapis.com/css2?family=Cormorant+Garamond:ital,wght@0,400;0,600;0,700;1,400&family=Montserrat:wght@300;400;500;600;700&family=Playfair+Display:wght@700;900&display=swap');
-
-    :root {
-        --cream: #F8F5F0;
-        --white: #FFFFFF;
-        --light-gray: #F2EEE9;
-        --border: #D8CFC4;
-        --soft: #EBE5DC;
-        --navy: #0B1F3A;
-        --blue-mid: #1A3A5C;
-        --blue-light: #2E6DA4;
-        --accent: #C8102E;
-        --text-dark: #1A1A2E;
-        --text-mid: #3D4A5C;
-        --text-muted: #8A97A8;
-        --gold: #B8972A;
-    }
-
-    .stApp {
-        background: var(--cream);
-        font-family: 'Montserrat', sans-serif;
-    }
-
-    /* FLOATING HEARTS */
-    .hearts-bg {
-        position: fixed;
-        top: 0; left: 0;
-        width: 100%; height: 100%;
-        pointer-events: none;
-        z-index: 0;
-        overflow: hidden;
-    }
-    .heart-float {
-        position: absolute;
-        bottom: -60px;
-        font-size: 18px;
-        opacity: 0;
-        animation: floatUp linear infinite;
-        color: #C8102E;
-    }
-    .heart-float:nth-child(1)  { left: 5%;  animation-duration: 13s; animation-delay: 0s;   font-size: 14px; }
-    .heart-float:nth-child(2)  { left: 13%; animation-duration: 16s; animation-delay: 2s;   font-size: 20px; }
-    .heart-float:nth-child(3)  { left: 22%; animation-duration: 11s; animation-delay: 4s;   font-size: 11px; }
-    .heart-float:nth-child(4)  { left: 33%; animation-duration: 14s; animation-delay: 1s;   font-size: 16px; }
-    .heart-float:nth-child(5)  { left: 45%; animation-duration: 13s; animation-delay: 6s;   font-size: 22px; }
-    .heart-float:nth-child(6)  { left: 55%; animation-duration: 17s; animation-delay: 3s;   font-size: 10px; }
-    .heart-float:nth-child(7)  { left: 65%; animation-duration: 12s; animation-delay: 5s;   font-size: 18px; }
-    .heart-float:nth-child(8)  { left: 76%; animation-duration: 15s; animation-delay: 7s;   font-size: 14px; }
-    .heart-float:nth-child(9)  { left: 85%; animation-duration: 10s; animation-delay: 2s;   font-size: 20px; }
-    .heart-float:nth-child(10) { left: 93%; animation-duration: 14s; animation-delay: 9s;   font-size: 13px; }
-    .heart-float:nth-child(11) { left: 18%; animation-duration: 18s; animation-delay: 11s;  font-size: 16px; }
-    .heart-float:nth-child(12) { left: 38%; animation-duration: 15s; animation-delay: 8s;   font-size: 9px; }
-
-    @keyframes floatUp {
-        0%   { transform: translateY(0) rotate(-12deg); opacity: 0; }
-        8%   { opacity: 0.20; }
-        92%  { opacity: 0.10; }
-        100% { transform: translateY(-115vh) rotate(12deg); opacity: 0; }
-    }
-
-    /* HEADER */
-    .main-header {
-        background: linear-gradient(135deg, #0B1F3A 0%, #1A3A5C 55%, #1E4976 100%);
-        border-radius: 20px;
-        padding: 36px 40px 28px;
-        margin-bottom: 24px;
-        position: relative;
-        overflow: hidden;
-        box-shadow: 0 10px 50px rgba(11,31,58,0.22);
-    }
-    .main-header::before {
-        content: '\u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661';
-        position: absolute;
-        top: 9px; left: 0; right: 0;
-        font-size: 10px; color: rgba(255,255,255,0.07);
-        letter-spacing: 6px; text-align: center; font-family: serif;
-    }
-    .main-header::after {
-        content: '\u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665  \u2661  \u2665';
-        position: absolute;
-        bottom: 9px; left: 0; right: 0;
-        font-size: 10px; color: rgba(255,255,255,0.07);
-        letter-spacing: 6px; text-align: center; font-family: serif;
-    }
-    .header-title {
-        font-family: 'Playfair Display', serif;
-        font-size: 2.55rem;
-        font-weight: 900;
-        color: #FFFFFF;
-        text-align: center;
-        letter-spacing: 2px;
-        text-shadow: 0 2px 20px rgba(255,255,255,0.12);
-        margin: 0;
-        position: relative; z-index: 1;
-    }
-    .header-subtitle {
-        font-family: 'Montserrat', sans-serif;
-        font-size: 0.73rem;
-        color: rgba(255,255,255,0.50);
-        text-align: center;
-        letter-spacing: 4px;
-        text-transform: uppercase;
-        margin-top: 10px;
-        font-weight: 300;
-        position: relative; z-index: 1;
-    }
-    .beat-heart {
-        font-size: 2.6rem;
-        display: inline-block;
-        animation: heartbeat 1.3s ease-in-out infinite;
-        filter: drop-shadow(0 0 14px rgba(220,50,70,0.85));
-    }
-    @keyframes heartbeat {
-        0%   { transform: scale(1.0); }
-        14%  { transform: scale(1.32); }
-        28%  { transform: scale(1.0); }
-        42%  { transform: scale(1.18); }
-        70%  { transform: scale(1.0); }
-        100% { transform: scale(1.0); }
-    }
-
-    /* CLOCK BAR */
-    .clock-bar {
-        background: var(--white);
-        border: 1px solid var(--border);
-        border-radius: 50px;
-        padding: 11px 30px;
-        margin-bottom: 24px;
-        display: flex;
-        align-items: center;
-        justify-content: space-between;
-        box-shadow: 0 2px 16px rgba(0,0,0,0.06);
-    }
-    .clock-left {
-        font-family: 'Montserrat', sans-serif;
-        font-size: 0.70rem;
-        font-weight: 600;
-        color: var(--text-muted);
-        letter-spacing: 2px;
-        text-transform: uppercase;
-        display: flex; align-items: center; gap: 8px;
-    }
-    .clock-dot {
-        width: 8px; height: 8px;
-        background: #28C76F;
-        border-radius: 50%;
-        box-shadow: 0 0 10px #28C76F;
-        animation: blink 1s ease-in-out infinite;
-        display: inline-block;
-    }
-    @keyframes blink {
-        0%, 100% { opacity: 1; }
-        50% { opacity: 0.3; }
-    }
-    .clock-time {
-        font-family: 'Cormorant Garamond', serif;
-        font-size: 1.45rem;
-        font-weight: 700;
-        color: var(--navy);
-        letter-spacing: 3px;
-    }
-    .clock-right {
-        font-family: 'Montserrat', sans-serif;
-        font-size: 0.70rem;
-        color: var(--text-muted);
-        letter-spacing: 1px;
-    }
-
-    /* SECTION LABELS */
-    .section-label {
-        font-family: 'Montserrat', sans-serif;
-        font-size: 0.66rem;
-        font-weight: 700;
-        letter-spacing: 3px;
-        text-transform: uppercase;
-        color: var(--blue-light);
-        border-bottom: 2px solid var(--soft);
-        padding-bottom: 10px;
-        margin-bottom: 16px;
-        display: flex; align-items: center; gap: 8px;
-    }
-    .section-label::before { content: '\u2665'; color: var(--accent); font-size: 11px; }
-
-    /* INPUTS */
-    input[type="number"], input[type="text"],
-    div[data-baseweb="input"] input, textarea {
-        background: var(--light-gray) !important;
-        border: 1.5px solid var(--border) !important;
-        border-radius: 10px !important;
-        color: var(--text-dark) !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 500 !important;
-        font-size: 0.92rem !important;
-        transition: all 0.2s !important;
-    }
-    input:focus {
-        border-color: var(--blue-light) !important;
-        background: var(--white) !important;
-        box-shadow: 0 0 0 3px rgba(46,109,164,0.12) !important;
-    }
-
-    /* SELECT */
-    div[data-baseweb="select"] > div {
-        background: var(--light-gray) !important;
-        border: 1.5px solid var(--border) !important;
-        border-radius: 10px !important;
-    }
-    div[data-baseweb="select"] span {
-        color: var(--text-dark) !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 500 !important;
-    }
+import analytics
+import batching
+import cardio_model
+import data_store
+import drift
+import features
+import history
+import inference_server
+import perf
+from prediction_cache import PredictionCache, summary as cache_summary
+import what_if
 
-    /* LABELS */
-    label, .stTextInput label, .stNumberInput label,
-    .stSelectbox label, .stSlider label, .stRadio label {
-        color: var(--text-mid) !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-size: 0.72rem !important;
-        font-weight: 600 !important;
-        letter-spacing: 1.5px !important;
-        text-transform: uppercase !important;
-    }
-    .stRadio [data-testid="stMarkdownContainer"] p {
-        color: var(--text-dark) !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 500 !important;
-        font-size: 0.88rem !important;
-    }
+# pandas, batch_score (pandas/pyarrow) and report (fpdf) are imported where
+# they are first needed, after a submit; `python startup_profile.py` shows
+# what the first render costs.
 
-    /* SUBMIT BUTTON */
-    .stButton > button {
-        background: linear-gradient(135deg, #0B1F3A 0%, #1A3A5C 50%, #2E6DA4 100%) !important;
-        color: white !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 700 !important;
-        font-size: 0.80rem !important;
-        letter-spacing: 3px !important;
-        padding: 18px 36px !important;
-        border-radius: 50px !important;
-        border: none !important;
-        width: 100% !important;
-        text-transform: uppercase !important;
-        box-shadow: 0 8px 30px rgba(11,31,58,0.28) !important;
-        transition: all 0.3s ease !important;
-    }
-    .stButton > button:hover {
-        transform: translateY(-3px) !important;
-        box-shadow: 0 14px 40px rgba(11,31,58,0.40) !important;
-    }
-
-    /* DOWNLOAD BUTTON */
-    .stDownloadButton > button {
-        background: var(--white) !important;
-        color: var(--navy) !important;
-        font-family: 'Montserrat', sans-serif !important;
-        font-weight: 700 !important;
-        font-size: 0.78rem !important;
-        letter-spacing: 2px !important;
-        border: 2px solid var(--navy) !important;
-        border-radius: 50px !important;
-        padding: 16px 32px !important;
-        width: 100% !important;
-        box-shadow: 0 4px 20px rgba(11,31,58,0.10) !important;
-        transition: all 0.3s !important;
-    }
-    .stDownloadButton > button:hover {
-        background: var(--navy) !important;
-        color: white !important;
-        transform: translateY(-2px) !important;
-    }
-
-    /* RESULT CARD */
-    .result-wrap {
-        border-radius: 20px;
-        padding: 36px 40px;
-        text-align: center;
-        margin: 28px 0;
-    }
-    .result-low    { background: linear-gradient(135deg,#E8FAF0,#D0F4E3); border:2px solid #28C76F; box-shadow:0 12px 40px rgba(40,199,111,0.18); }
-    .result-medium { background: linear-gradient(135deg,#FFF8E6,#FFF0C0); border:2px solid #FFB300; box-shadow:0 12px 40px rgba(255,179,0,0.18); }
-    .result-high   { background: linear-gradient(135deg,#FEE8EC,#FDD0D8); border:2px solid #C8102E; box-shadow:0 12px 40px rgba(200,16,46,0.22); animation:result-pulse 2s ease-in-out infinite; }
-    @keyframes result-pulse {
-        0%,100% { box-shadow:0 12px 40px rgba(200,16,46,0.22); }
-        50%     { box-shadow:0 18px 60px rgba(200,16,46,0.42); }
-    }
-    .result-main-label {
-        font-family: 'Playfair Display', serif;
-        font-size: 2rem; font-weight: 900; letter-spacing: 2px;
-    }
-    .result-score-text {
-        font-family: 'Montserrat', sans-serif;
-        font-size: 0.95rem; font-weight: 600; letter-spacing: 1px;
-        margin-top: 8px; opacity: 0.82;
-    }
-    .result-patient {
-        font-family: 'Cormorant Garamond', serif;
-        font-size: 1.1rem; color: var(--text-mid);
-        margin-top: 12px; font-style: italic;
-    }
-
-    /* FORM & COLUMNS */
-    div[data-testid="stForm"] { background:transparent; border:none; padding:0; }
-    [data-testid="column"] {
-        background: var(--white) !important;
-        border: 1px solid var(--border) !important;
-        border-radius: 16px !important;
-        padding: 24px 20px !important;
-        box-shadow: 0 4px 20px rgba(0,0,0,0.05) !important;
-    }
-
-    /* MISC */
-    #MainMenu, footer, header { visibility: hidden; }
-    ::-webkit-scrollbar { width: 6px; }
-    ::-webkit-scrollbar-track { background: var(--cream); }
-    ::-webkit-scrollbar-thumb { background: var(--border); border-radius: 3px; }
-    ::-webkit-scrollbar-thumb:hover { background: var(--blue-light); }
-    </style>
+startup_profile.mark("imports")
 
+# --- CONFIGURATION ---
+st.set_page_config(page_title="CardioIA Pro", layout="wide", page_icon="🫀")
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+# --- PERF ADMIN (hidden page: ?admin=perf) ---
+if st.query_params.get("admin") == "perf":
+    st.subheader("Temps par etape (processus courant)")
+    if not perf.ENABLED:
+        st.info("Instrumentation desactivee : relancer avec CARDIO_PERF=1.")
+    st.table(perf.summary())
+    if batching.summary():
+        st.subheader("Regroupement des predictions")
+        st.table(batching.summary())
+    if cache_summary():
+        st.subheader("Cache des predictions")
+        st.table(cache_summary())
+    st.code(perf.prometheus_text(), language="text")
+    st.stop()
+
+# --- DRIFT ADMIN (hidden page: ?admin=drift) ---
+if st.query_params.get("admin") == "drift":
+    periods = {"Processus courant": None, "24 h (export)": 24, "7 jours (export)": 168}
+    period = st.radio("Periode", list(periods), horizontal=True)
+    mon = drift.current()
+    ref = mon.ref if mon is not None else drift.reference()
+    if periods[period] is not None:
+        counts, classes = drift.read_log(ref, time.time() - periods[period] * 3600)
+    elif mon is not None:
+        counts, classes, _ = mon.snapshot()
+    else:
+        st.info("Aucune prediction dans ce processus depuis son demarrage.")
+        st.stop()
+    drift_report = drift.compare(ref, counts, classes)
+    st.subheader("Derive des patients analyses")
+    st.caption(f"{drift_report['rows']} prediction(s) comparee(s) aux {ref.rows} lignes d'entrainement "
+               f"du modele (reference {ref.hash[:12]}). PSI : stable < {drift.PSI_MODERATE}, "
+               f"moderee < {drift.PSI_MAJOR}, forte au-dela.")
+    st.table(drift_report["features"])
+    st.subheader(f"Classes predites (PSI {drift_report['class_psi']:.3f}, "
+                 f"{drift.status(drift_report['class_psi'], drift_report['rows'])})")
+    st.table(drift_report["classes"])
+    if mon is not None and mon.exported:
+        st.caption(f"Dernier export : {datetime.fromtimestamp(mon.exported):%d/%m/%Y %H:%M:%S} "
+                   f"vers {mon.log_path}")
+    st.stop()
+
+# the page body runs in try/finally so that reruns ended by st.stop() or an
+# error are timed too
+perf_run = perf.request("rerun").start()
+try:
+    # --- SESSION STATE INIT ---
+    if "report_args" not in st.session_state:
+        st.session_state.report_args = None
+    if "last_x" not in st.session_state:
+        st.session_state.last_x = None
+    if "pdf_filename" not in st.session_state:
+        st.session_state.pdf_filename = "bilan.pdf"
+    if "show_result" not in st.session_state:
+        st.session_state.show_result = False
+    if "result_html" not in st.session_state:
+        st.session_state.result_html = ""
+
+    # --- LIGHT ELEGANT THEME ---
+    # Served once as static files (.streamlit/config.toml enables /app/static);
+    # the content hash in the URL lets the browser cache them until they change,
+    # so a rerun only re-sends this short block. Until fetch_fonts.py has
+    # bundled the fonts, they still come from Google Fonts.
+    @st.cache_resource
+    def theme_links():
+        links = []
+        for name in ("fonts.css", "theme.css"):
+            path = os.path.join(STATIC_DIR, name)
+            if os.path.exists(path):
+                with open(path, "rb") as f:
+                    digest = hashlib.sha256(f.read()).hexdigest()[:12]
+                links.append(f'<link rel="stylesheet" href="app/static/{name}?v={digest}">')
+            elif name == "fonts.css":
+                import fetch_fonts
+                links.append(f'<link rel="stylesheet" href="{fetch_fonts.CSS_URL}">')
+        return "\n".join(links)
+
+    st.markdown(theme_links() + """
     <div class="hearts-bg">
         <div class="heart-float">&#9829;</div>
         <div class="heart-float">&#9825;</div>
@@ -368,8 +125,8 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# ── HEADER ──
-st.markdown("""
+    # ── HEADER ──
+    st.markdown("""
 <div class="main-header">
     <div class="header-title">
         <span class="beat-heart">&#129706;</span>&nbsp; CardioIA Pro &nbsp;<span class="beat-heart">&#129706;</span>
@@ -379,339 +136,371 @@ st.markdown("""
 """, unsafe_allow_html=True)
 
 
-# ── LIVE CLOCK ──
-clock_ph = st.empty()
-
-def show_clock():
-    tz = pytz.timezone('Africa/Algiers')
-    now = datetime.now(tz)
-    date_str = now.strftime("%A %d %B %Y").capitalize()
-    time_str = now.strftime("%H : %M : %S")
-    clock_ph.markdown(f"""
+    # ── LIVE CLOCK ──
+    # Ticks in the browser: the server only renders the initial value, so an idle
+    # session no longer re-executes the script every second.
+    CLOCK_JS = """
+<script>
+(function () {
+    var tz = "Africa/Algiers";
+    var fmtTime = new Intl.DateTimeFormat("en-GB", {timeZone: tz, hour12: false,
+        hour: "2-digit", minute: "2-digit", second: "2-digit"});
+    var fmtDate = new Intl.DateTimeFormat("en-GB", {timeZone: tz,
+        weekday: "long", day: "2-digit", month: "long", year: "numeric"});
+    function part(parts, type) {
+        return parts.find(function (p) { return p.type === type; }).value;
+    }
+    function tick() {
+        var t = document.getElementById("cia-clock-time");
+        var d = document.getElementById("cia-clock-date");
+        if (!t || !d) return;
+        var now = new Date();
+        var tp = fmtTime.formatToParts(now), dp = fmtDate.formatToParts(now);
+        t.textContent = [part(tp, "hour"), part(tp, "minute"), part(tp, "second")].join(" : ");
+        var date = [part(dp, "weekday"), part(dp, "day"), part(dp, "month"), part(dp, "year")].join(" ").toLowerCase();
+        d.textContent = date.charAt(0).toUpperCase() + date.slice(1);
+    }
+    if (window.ciaClock) clearInterval(window.ciaClock);
+    window.ciaClock = setInterval(tick, 1000);
+    tick();
+})();
+</script>
+"""
+
+    def show_clock():
+        tz = pytz.timezone('Africa/Algiers')
+        now = datetime.now(tz)
+        date_str = now.strftime("%A %d %B %Y").capitalize()
+        time_str = now.strftime("%H : %M : %S")
+        st.html(f"""
     <div class="clock-bar">
         <div class="clock-left">
             <span class="clock-dot"></span>Heure Algerie &mdash; En Direct
         </div>
-        <div class="clock-time">{time_str}</div>
-        <div class="clock-right">&#128205; {date_str}</div>
+        <div class="clock-time" id="cia-clock-time">{time_str}</div>
+        <div class="clock-right">&#128205; <span id="cia-clock-date">{date_str}</span></div>
     </div>
-    """, unsafe_allow_html=True)
-    return now
-
-current_time = show_clock()
-
-
-# ── MODEL ──
-@st.cache_resource
-def train_model():
-    df = pd.read_csv("cardiovascular_risk_numeric.csv")
-    df['smoking_status'] = df['smoking_status'].map({'Never': 0, 'Former': 1, 'Current': 2})
-    X = df.drop(['Patient_ID', 'heart_disease_risk_score', 'risk_category'], axis=1)
-    y = df['risk_category']
-    mdl = xgb.XGBClassifier(n_estimators=100, max_depth=5, learning_rate=0.1)
-    mdl.fit(X, y)
-    return mdl, X.columns
-
-model, feat_cols = train_model()
-
-
-# ── FORM ──
-with st.form("main_form"):
-    c1, c2, c3 = st.columns(3)
-    with c1:
-        st.markdown('<div class="section-label">Identite Patient</div>', unsafe_allow_html=True)
-        nom    = st.text_input("Nom")
-        prenom = st.text_input("Prenom")
-        age    = st.number_input("Age (ans)", 10, 110, 45)
-        family = st.radio("Heredite Cardiaque", ["Non", "Oui"])
-    with c2:
-        st.markdown('<div class="section-label">Donnees Cliniques</div>', unsafe_allow_html=True)
-        sys_bp = st.number_input("Tension Systolique (mmHg)", 80, 220, 120)
-        dia_bp = st.number_input("Tension Diastolique (mmHg)", 40, 140, 80)
-        chol   = st.number_input("Cholesterol (mg/dL)", 100, 450, 200)
-        pulse  = st.number_input("Pouls (BPM)", 40, 160, 72)
-    with c3:
-        st.markdown('<div class="section-label">Mode de Vie</div>', unsafe_allow_html=True)
-        smoke   = st.selectbox("Tabagisme", ["Jamais", "Ex-fumeur", "Fumeur"])
-        steps   = st.number_input("Pas / Jour", 0, 30000, 5000)
-        sleep   = st.slider("Sommeil (H/nuit)", 3, 12, 7)
-        stress  = st.slider("Niveau de Stress (1-10)", 1, 10, 5)
-        alcohol = st.number_input("Alcool (verres/sem.)", 0, 50, 0)
-        diet    = st.slider("Qualite Alimentaire (1-10)", 1, 10, 7)
-
-    st.markdown("<br>", unsafe_allow_html=True)
-    submitted = st.form_submit_button("Lancer l'Analyse IA - Generer le Bilan Cardiaque")
-
-
-# ── RESULTS ──
-if submitted:
-    m_smoke = {'Jamais': 0, 'Ex-fumeur': 1, 'Fumeur': 2}
-    input_data = pd.DataFrame(
-        [[age, 25.0, sys_bp, dia_bp, chol, pulse, m_smoke[smoke],
-          steps, stress, 3, sleep, (1 if family == "Oui" else 0), diet, alcohol]],
-        columns=feat_cols
-    )
-    proba      = model.predict_proba(input_data)[0]
-    risk_score = np.max(proba) * 100
-    res_idx    = model.predict(input_data)[0]
-
-    cats   = ["RISQUE FAIBLE", "RISQUE MODERE", "RISQUE ELEVE"]
-    cls    = ["result-low", "result-medium", "result-high"]
-    colors = ["#28C76F", "#E6A000", "#C8102E"]
-    emojis = ["&#9989;", "&#9888;", "&#128680;"]
-
-    st.markdown(f"""
+    {CLOCK_JS}
+    """, unsafe_allow_javascript=True)
+        return now
+
+    current_time = show_clock()
+
+
+    # ── MODEL ──
+    # The booster is trained offline (python train.py / retrain.py) and only
+    # loaded here: the web process never fits a model. A newly published
+    # artifact is picked up on the next rerun; running sessions keep theirs
+    # until then. With CARDIO_INFERENCE_SOCKET set, scoring is forwarded to the
+    # shared worker pool (inference_server.py) and this process holds no model.
+    @st.cache_resource
+    def serving_model():
+        if inference_server.SOCKET:
+            return inference_server.RemoteModel(inference_server.SOCKET)
+        return cardio_model.ServingModel()
+
+    try:
+        model, feat_cols = serving_model().get()
+    except FileNotFoundError:
+        st.error("Aucun modele entraine pour ces donnees : lancer `python train.py` puis recharger la page.")
+        st.stop()
+    except ConnectionError:
+        st.error(f"Serveur d'inference injoignable ({inference_server.SOCKET}) : "
+                 "lancer `python inference_server.py` puis recharger la page.")
+        st.stop()
+
+    # predictions run on the NumPy export; xgboost is only needed for the
+    # TreeSHAP explanations, so it loads in the background as soon as the
+    # model does (and again for each new artifact), ahead of the first submit
+    @st.cache_resource
+    def warm_explainer(model_file, _model):
+        cardio_model.warm_explainer(_model)
+
+    warm_explainer(model.model_file, model)
+
+    startup_profile.mark("model")
+
+    # simultaneous submits of all sessions are scored together (batching.py)
+    @st.cache_resource
+    def micro_batcher():
+        return batching.MicroBatcher(n_features=len(feat_cols))
+
+    @st.cache_resource
+    def prediction_cache():
+        return PredictionCache(maxsize=4096, scorer=micro_batcher().predict)
+
+    # one writer thread per process, shared by every session
+    @st.cache_resource
+    def history_store():
+        return history.History()
+
+    def show_history(rows):
+        """Trend of a patient's bilans (oldest first) and the last ones as a table."""
+        import pandas as pd
+        df = pd.DataFrame(rows)
+        df["Date"] = (pd.to_datetime(df["created_at"], unit="s", utc=True)
+                      .dt.tz_convert("Africa/Algiers").dt.tz_localize(None))
+        trend = df.set_index("Date")[["p_low", "p_medium", "p_high"]] * 100
+        trend.columns = ["Faible %", "Modere %", "Eleve %"]
+        st.line_chart(trend, color=["#28C76F", "#E6A000", "#C8102E"])
+        st.table(pd.DataFrame({
+            "Date":      df["Date"].dt.strftime("%d/%m/%Y %H:%M"),
+            "Age":       df["age"],
+            "Categorie": [cardio_model.RISK_LABELS[c] for c in df["risk_class"]],
+            "Score":     [f"{s:.1f}%" for s in df["risk_score"]],
+        }).iloc[::-1].head(10).set_index("Date"))
+
+
+    # ── FORM ──
+    with st.form("main_form"):
+        c1, c2, c3 = st.columns(3)
+        with c1:
+            st.markdown('<div class="section-label">Identite Patient</div>', unsafe_allow_html=True)
+            nom    = st.text_input("Nom")
+            prenom = st.text_input("Prenom")
+            dossier = st.text_input("N Dossier (optionnel)")
+            age    = st.number_input("Age (ans)", 10, 110, 45)
+            family = st.radio("Heredite Cardiaque", ["Non", "Oui"])
+        with c2:
+            st.markdown('<div class="section-label">Donnees Cliniques</div>', unsafe_allow_html=True)
+            sys_bp = st.number_input("Tension Systolique (mmHg)", 80, 220, 120)
+            dia_bp = st.number_input("Tension Diastolique (mmHg)", 40, 140, 80)
+            chol   = st.number_input("Cholesterol (mg/dL)", 100, 450, 200)
+            pulse  = st.number_input("Pouls (BPM)", 40, 160, 72)
+            height = st.number_input("Taille (cm)", 120, 220, 170)
+            weight = st.number_input("Poids (kg)", 30.0, 250.0, 70.0, step=0.5)
+        with c3:
+            st.markdown('<div class="section-label">Mode de Vie</div>', unsafe_allow_html=True)
+            smoke   = st.selectbox("Tabagisme", ["Jamais", "Ex-fumeur", "Fumeur"])
+            steps   = st.number_input("Pas / Jour", 0, 30000, 5000)
+            activity = st.number_input("Activite Physique (h/sem.)", 0.0, 40.0, 3.0, step=0.5)
+            sleep   = st.slider("Sommeil (H/nuit)", 3, 12, 7)
+            stress  = st.slider("Niveau de Stress (1-10)", 1, 10, 5)
+            alcohol = st.number_input("Alcool (verres/sem.)", 0, 50, 0)
+            diet    = st.slider("Qualite Alimentaire (1-10)", 1, 10, 7)
+
+        st.markdown("<br>", unsafe_allow_html=True)
+        submitted = st.form_submit_button("Lancer l'Analyse IA - Generer le Bilan Cardiaque")
+
+
+    # ── RESULTS ──
+    if submitted:
+        import pandas as pd
+        import report
+        m_smoke = {'Jamais': 0, 'Ex-fumeur': 1, 'Fumeur': 2}
+        # named inputs -> one validated float32 row in feat_cols order (bmi from height / weight)
+        with perf.timer("features"):
+            inputs = {
+                'age': age, 'height_cm': height, 'weight_kg': weight, 'systolic_bp': sys_bp,
+                'diastolic_bp': dia_bp, 'cholesterol_mg_dl': chol, 'resting_heart_rate': pulse,
+                'smoking_status': m_smoke[smoke], 'daily_steps': steps, 'stress_level': stress,
+                'physical_activity_hours_per_week': activity, 'sleep_hours': sleep,
+                'family_history_heart_disease': 1 if family == "Oui" else 0,
+                'diet_quality_score': diet, 'alcohol_units_per_week': alcohol,
+            }
+            try:
+                x = features.from_records([inputs], feat_cols)
+            except ValueError as e:
+                st.error(f"Donnees invalides : {e}")
+                st.stop()
+        bmi = float(x[0, feat_cols.index('bmi')])
+        probas, classes, scores = prediction_cache().predict(model, x)
+        with perf.timer("drift"):
+            drift.monitor(model).observe(x, classes)
+        proba, res_idx, risk_score = probas[0], int(classes[0]), scores[0]
+        st.session_state.last_x = x
+
+        cats   = ["RISQUE FAIBLE", "RISQUE MODERE", "RISQUE ELEVE"]
+        cls    = ["result-low", "result-medium", "result-high"]
+        colors = ["#28C76F", "#E6A000", "#C8102E"]
+        emojis = ["&#9989;", "&#9888;", "&#128680;"]
+
+        st.markdown(f"""
     <div class="result-wrap {cls[res_idx]}">
         <div style="font-size:2.8rem;margin-bottom:8px;">{emojis[res_idx]}</div>
         <div class="result-main-label" style="color:{colors[res_idx]};">{cats[res_idx]}</div>
         <div class="result-score-text" style="color:{colors[res_idx]};">Score de risque IA : {risk_score:.1f}%</div>
-        <div class="result-patient">Patient : {safe(prenom).capitalize()} {safe(nom).upper()} &nbsp;&#9829;&nbsp; Age : {age} ans</div>
+        <div class="result-patient">Patient : {report.safe(prenom).capitalize()} {report.safe(nom).upper()} &nbsp;&#9829;&nbsp; Age : {age} ans &nbsp;&#9829;&nbsp; IMC : {bmi:.1f}</div>
     </div>
     """, unsafe_allow_html=True)
 
-    # ── PRO PDF ──
-    tz  = pytz.timezone('Africa/Algiers')
-    now = datetime.now(tz)
-    heure_pdf = now.strftime("%d/%m/%Y  %H:%M:%S")
-    ref_num   = f"CIA-{now.strftime('%Y%m%d%H%M%S')}"
-
-    # Safe versions for PDF (latin-1 only)
-    nom_pdf    = safe(nom).upper()
-    prenom_pdf = safe(prenom).upper()
-    smoke_pdf  = safe(smoke)
-    family_pdf = safe(family)
-
-    cats_pdf = ["RISQUE FAIBLE", "RISQUE MODERE", "RISQUE ELEVE"]
-
-    pdf = FPDF()
-    pdf.add_page()
-    pdf.set_auto_page_break(auto=True, margin=18)
-
-    # ── TOP BAND ──
-    pdf.set_fill_color(11, 31, 58)
-    pdf.rect(0, 0, 210, 50, 'F')
-    pdf.set_fill_color(46, 109, 164)
-    pdf.rect(0, 50, 210, 3.5, 'F')
-    pdf.set_fill_color(184, 151, 42)
-    pdf.rect(0, 53.5, 210, 0.8, 'F')
-
-    pdf.set_y(8)
-    pdf.set_font("Arial", 'B', 23)
-    pdf.set_text_color(255, 255, 255)
-    pdf.cell(210, 11, "CARDIO IA PRO", align='C', ln=True)
-
-    pdf.set_font("Arial", 'I', 8.5)
-    pdf.set_text_color(140, 180, 220)
-    pdf.cell(210, 7, "RAPPORT MEDICAL DE DIAGNOSTIC CARDIAQUE PAR INTELLIGENCE ARTIFICIELLE", align='C', ln=True)
-
-    pdf.set_font("Arial", '', 7.5)
-    pdf.set_text_color(100, 140, 175)
-    pdf.cell(210, 6, f"Laboratoire de Cardiologie  |  Algerie  |  {heure_pdf}", align='C', ln=True)
-
-    pdf.set_font("Arial", '', 7)
-    pdf.set_text_color(80, 115, 155)
-    pdf.cell(180, 6, f"Reference : {ref_num}", align='R', ln=True)
-
-    pdf.set_y(60)
-
-    # ── HELPERS ──
-    def section_hdr(label):
-        pdf.set_fill_color(11, 31, 58)
-        pdf.set_draw_color(46, 109, 164)
-        pdf.set_line_width(0.5)
-        y = pdf.get_y()
-        pdf.rect(10, y, 190, 10, 'FD')
-        pdf.set_font("Arial", 'B', 10)
-        pdf.set_text_color(255, 255, 255)
-        pdf.set_x(15)
-        pdf.cell(185, 10, f"  {label}", ln=True)
-        pdf.ln(1)
-
-    def data_row(l1, v1, l2="", v2="", shade=False):
-        y = pdf.get_y()
-        if shade:
-            pdf.set_fill_color(232, 241, 252)
-        else:
-            pdf.set_fill_color(244, 248, 254)
-        pdf.set_draw_color(210, 222, 238)
-        pdf.set_line_width(0.15)
-        pdf.rect(10, y, 190, 9, 'FD')
-        pdf.set_font("Arial", '', 8.5)
-        pdf.set_text_color(80, 100, 130)
-        pdf.set_x(14)
-        pdf.cell(42, 9, safe(l1))
-        pdf.set_font("Arial", 'B', 8.5)
-        pdf.set_text_color(11, 31, 58)
-        pdf.cell(48, 9, safe(str(v1)))
-        if l2:
-            pdf.set_font("Arial", '', 8.5)
-            pdf.set_text_color(80, 100, 130)
-            pdf.cell(42, 9, safe(l2))
-            pdf.set_font("Arial", 'B', 8.5)
-            pdf.set_text_color(11, 31, 58)
-            pdf.cell(48, 9, safe(str(v2)))
-        pdf.ln(9)
-
-    # ── S1 — PATIENT ──
-    section_hdr("I.   INFORMATIONS DU PATIENT")
-    data_row("Nom",  nom_pdf,       "Prenom",             prenom_pdf)
-    data_row("Age",  f"{age} ans",  "Heredite Cardiaque", family_pdf, shade=True)
-    pdf.ln(5)
-
-    # ── S2 — CLINIQUE ──
-    section_hdr("II.  DONNEES CLINIQUES")
-    data_row("Tension Arterielle", f"{sys_bp}/{dia_bp} mmHg", "Cholesterol", f"{chol} mg/dL")
-    data_row("Pouls",              f"{pulse} BPM",             "Tabagisme",   smoke_pdf, shade=True)
-    pdf.ln(5)
-
-    # ── S3 — MODE DE VIE ──
-    section_hdr("III. MODE DE VIE & HABITUDES")
-    data_row("Pas / Jour",       str(steps),         "Sommeil",             f"{sleep} h/nuit")
-    data_row("Niveau de Stress", f"{stress} / 10",   "Qualite Alimentaire", f"{diet} / 10", shade=True)
-    data_row("Alcool",           f"{alcohol} v/sem.", "",                   "")
-    pdf.ln(5)
-
-    # ── S4 — RESULTAT IA ──
-    section_hdr("IV.  ANALYSE PAR INTELLIGENCE ARTIFICIELLE")
-
-    risk_fills   = {0: (215, 248, 228), 1: (255, 248, 215), 2: (255, 228, 234)}
-    risk_borders = {0: (40, 199, 111),  1: (220, 155, 0),   2: (200, 16, 46)}
-    risk_texts   = {0: (15, 110, 60),   1: (130, 85, 0),    2: (155, 10, 28)}
-
-    rf = risk_fills[res_idx]
-    rb = risk_borders[res_idx]
-    rt = risk_texts[res_idx]
-
-    y0 = pdf.get_y()
-    pdf.set_fill_color(*rf)
-    pdf.set_draw_color(*rb)
-    pdf.set_line_width(1.2)
-    pdf.rect(10, y0, 190, 28, 'FD')
-
-    pdf.set_font("Arial", 'B', 17)
-    pdf.set_text_color(*rt)
-    pdf.set_y(y0 + 5)
-    pdf.cell(210, 9, f"{cats_pdf[res_idx]}   |   Score IA : {risk_score:.1f}%", align='C', ln=True)
-    pdf.set_font("Arial", 'I', 8.5)
-    pdf.set_text_color(70, 85, 110)
-    pdf.cell(210, 7, f"Patient : {prenom_pdf} {nom_pdf}   |   Age : {age} ans", align='C', ln=True)
-    pdf.ln(5)
-
-    # probability bars
-    cat_lbl = ["Risque Faible", "Risque Modere", "Risque Eleve"]
-    bar_col = [(40, 199, 111), (220, 155, 0), (200, 16, 46)]
-    for i, (lbl, prob) in enumerate(zip(cat_lbl, proba)):
-        yb = pdf.get_y()
-        pdf.set_font("Arial", '', 8)
-        pdf.set_text_color(70, 90, 120)
-        pdf.set_x(14)
-        pdf.cell(48, 8, lbl)
-        pdf.set_fill_color(225, 234, 246)
-        pdf.rect(62, yb+2, 118, 4, 'F')
-        pdf.set_fill_color(*bar_col[i])
-        pdf.rect(62, yb+2, int(prob*118), 4, 'F')
-        pdf.set_font("Arial", 'B', 8)
-        pdf.set_text_color(11, 31, 58)
-        pdf.set_x(184)
-        pdf.cell(22, 8, f"{prob*100:.1f}%", align='R')
-        pdf.ln(8)
-    pdf.ln(4)
-
-    # ── S5 — RECOMMANDATIONS ──
-    section_hdr("V.   RECOMMANDATIONS MEDICALES")
-
-    reco_titre = {
-        0: "Profil Cardiovasculaire Optimal",
-        1: "Vigilance Cardiovasculaire Requise",
-        2: "ALERTE - Risque Cardiaque Eleve Detecte"
-    }
-    reco_corps = {
-        0: ("L'analyse par intelligence artificielle indique un profil cardiaque favorable. "
-            "Poursuivez vos bonnes habitudes de vie : alimentation equilibree riche en fibres, "
-            "activite physique reguliere d'au moins 30 min/jour, hydratation suffisante. "
-            "Bilan cardiaque annuel conseille. Surveillez tension et cholesterol periodiquement."),
-        1: ("Des facteurs de risque moderes ont ete detectes. Reduisez la consommation de sel, "
-            "de graisses saturees et de sucres raffines. Augmentez progressivement l'activite physique "
-            "(150 min/semaine). Limitez l'alcool et gerez le stress chronique. "
-            "Bilan sanguin complet recommande. Consultez votre medecin dans les 4 semaines."),
-        2: ("L'IA identifie un risque cardiovasculaire significativement eleve. "
-            "Consultation urgente chez un cardiologue imperative. Evitez tout effort physique intense. "
-            "Arretez le tabac immediatement, eliminez l'alcool, regime pauvre en sel et graisses. "
-            "Surveillance tensionnelle quotidienne obligatoire. En cas de douleur thoracique, "
-            "essoufflement ou palpitations, contactez les urgences sans delai.")
-    }
-
-    yr = pdf.get_y()
-    pdf.set_fill_color(*rf)
-    pdf.set_draw_color(*rb)
-    pdf.set_line_width(0.5)
-    pdf.set_font("Arial", 'B', 9.5)
-    pdf.set_text_color(*rt)
-    pdf.set_x(14)
-    pdf.multi_cell(182, 8, safe(reco_titre[res_idx]))
-    pdf.set_font("Arial", '', 8.5)
-    pdf.set_text_color(38, 52, 72)
-    pdf.set_x(14)
-    pdf.multi_cell(182, 6, safe(reco_corps[res_idx]))
-    pdf.rect(10, yr, 190, pdf.get_y() - yr + 2, 'D')
-    pdf.ln(5)
-
-    # ── S6 — SIGNATURE ──
-    section_hdr("VI.  VALIDATION & SIGNATURE MEDICALE")
-    ys = pdf.get_y()
-    pdf.set_fill_color(244, 248, 254)
-    pdf.set_draw_color(210, 222, 238)
-    pdf.set_line_width(0.2)
-    pdf.rect(10, ys, 190, 28, 'FD')
-    pdf.set_y(ys + 4)
-    pdf.set_font("Arial", '', 8)
-    pdf.set_text_color(80, 100, 130)
-    pdf.set_x(14)
-    pdf.cell(90, 6, "Medecin / Cardiologue Responsable :", ln=False)
-    pdf.set_x(120)
-    pdf.cell(80, 6, "Cachet & Signature :", ln=True)
-    pdf.set_draw_color(46, 109, 164)
-    pdf.set_line_width(0.4)
-    pdf.line(14, pdf.get_y() + 11, 104, pdf.get_y() + 11)
-    pdf.line(120, pdf.get_y() + 11, 200, pdf.get_y() + 11)
-    pdf.ln(18)
-    pdf.set_font("Arial", 'I', 7)
-    pdf.set_text_color(140, 155, 175)
-    pdf.set_x(14)
-    pdf.cell(182, 6, f"Ce rapport est genere electroniquement le {heure_pdf}  --  Ref. {ref_num}", align='C', ln=True)
-
-    # ── FOOTER BAND ──
-    pdf.set_y(-18)
-    pdf.set_fill_color(11, 31, 58)
-    pdf.rect(0, pdf.get_y()-1, 210, 22, 'F')
-    pdf.set_fill_color(184, 151, 42)
-    pdf.rect(0, pdf.get_y()-1, 210, 0.8, 'F')
-    pdf.set_font("Arial", '', 7.5)
-    pdf.set_text_color(100, 140, 180)
-    pdf.set_y(pdf.get_y() + 3)
-    pdf.cell(95, 6, "  CardioIA Pro  |  Laboratoire de Cardiologie  |  Algerie", align='L')
-    pdf.cell(95, 6, f"Page 1 / 1   |   {ref_num}  ", align='R')
-
-    # ── OUTPUT — compatible toutes versions FPDF ──
-    raw = pdf.output(dest='S')
-    # dest='S' retourne str (fpdf1) ou bytearray/bytes (fpdf2)
-    if isinstance(raw, (bytearray, bytes)):
-        st.session_state.pdf_bytes = bytes(raw)
-    else:
-        st.session_state.pdf_bytes = raw.encode('latin-1', errors='replace')
-    st.session_state.pdf_filename = f"CardioIA_Bilan_{safe(nom)}_{safe(prenom)}_{now.strftime('%Y%m%d')}.pdf"
-
-# ── BOUTON DOWNLOAD persistant (hors du bloc if submitted) ──
-if st.session_state.pdf_bytes is not None:
-    st.download_button(
-        label="Telecharger le Bilan PDF Professionnel",
-        data=st.session_state.pdf_bytes,
-        file_name=st.session_state.pdf_filename,
-        mime="application/pdf",
-        key="dl_pdf"
-    )
-
-# ── AUTO-REFRESH CLOCK (1 seconde) ──
-time.sleep(1)
-show_clock()
-st.rerun()
+        # ── FACTEURS (TreeSHAP contributions toward the predicted class) ──
+        t0 = time.perf_counter()
+        factors = cardio_model.top_factors(cardio_model.explain(model, x)[0], feat_cols, res_idx)
+        explain_ms = (time.perf_counter() - t0) * 1000
+        st.markdown('<div class="section-label">Facteurs determinants du risque</div>', unsafe_allow_html=True)
+        contrib = pd.DataFrame([{"Facteur": lbl, "Aggrave": max(v, 0.0), "Attenue": min(v, 0.0)}
+                                for lbl, v in factors])
+        st.bar_chart(contrib, x="Facteur", y=["Aggrave", "Attenue"], color=[colors[res_idx], "#8C9BAF"],
+                     horizontal=True, sort=False, x_label="Contribution (log-odds)", y_label="")
+        st.caption(f"Contribution de chaque facteur au resultat {cats[res_idx]}, "
+                   f"classee par importance (TreeSHAP, {explain_ms:.1f} ms)")
+
+        # ── PRO PDF (rendered only when the download is requested) ──
+        now = datetime.now(pytz.timezone('Africa/Algiers'))
+        patient = dict(nom=nom, prenom=prenom, age=age, family=family, sys_bp=sys_bp, dia_bp=dia_bp,
+                       chol=chol, pulse=pulse, smoke=smoke, steps=steps, sleep=sleep, stress=stress,
+                       alcohol=alcohol, diet=diet, height=height, weight=weight, bmi=round(bmi, 1),
+                       activity=activity)
+        st.session_state.report_args = (patient, proba, res_idx, risk_score, now, None,
+                                        factors[:report.N_FACTORS])
+        st.session_state.pdf_filename = report.report_filename(patient, now)
+
+        # ── HISTORIQUE (earlier bilans; this one is written by the background thread) ──
+        with perf.timer("history_lookup"):
+            previous = history_store().lookup(nom, prenom, dossier)
+        history_store().record(patient, proba, res_idx, risk_score, now,
+                               getattr(model, "fingerprint", None), dossier)
+        if previous:
+            st.markdown('<div class="section-label">Historique du patient</div>', unsafe_allow_html=True)
+            show_history(previous + [dict(created_at=now.timestamp(), risk_class=res_idx,
+                                          risk_score=risk_score, p_low=proba[0], p_medium=proba[1],
+                                          p_high=proba[2], age=age)])
+            st.caption(f"{len(previous)} bilan(s) precedent(s)")
+
+    # ── BOUTON DOWNLOAD persistant (hors du bloc if submitted) ──
+    if st.session_state.report_args is not None:
+        import report
+        st.download_button(
+            label="Telecharger le Bilan PDF Professionnel",
+            data=functools.partial(report.build_report, *st.session_state.report_args),
+            file_name=st.session_state.pdf_filename,
+            mime="application/pdf",
+            key="dl_pdf"
+        )
+
+    # ── SIMULATION WHAT-IF ──
+    if st.session_state.last_x is not None:
+        import pandas as pd
+        with st.expander("Simulation What-If - Impact des facteurs de risque"):
+            swept = st.multiselect("Facteurs a faire varier", list(what_if.SWEEPS),
+                                   default=what_if.DEFAULT_SWEEPS,
+                                   format_func=lambda f: what_if.SWEEPS[f][0])
+            t0 = time.perf_counter()
+            base, curves, scenarios = what_if.analyse(model, st.session_state.last_x, feat_cols, swept)
+            n_scen = 1 + sum(len(v) for v, _ in curves.values()) + len(scenarios)
+            st.caption(f"{n_scen} scenarios evalues en un seul appel au modele "
+                       f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+            st.table(pd.DataFrame([
+                {"Scenario": name,
+                 "Categorie": cardio_model.RISK_LABELS[int(p.argmax())],
+                 "Risque Eleve": f"{p[2] * 100:.1f}%",
+                 "Variation": f"{(p[2] - base[2]) * 100:+.1f} pts"}
+                for name, p in scenarios.items()
+            ]).set_index("Scenario"))
+
+            cols = st.columns(2)
+            for k, f in enumerate(swept):
+                values, proba_f = curves[f]
+                with cols[k % 2]:
+                    st.markdown(f'<div class="section-label">{what_if.SWEEPS[f][0]}</div>', unsafe_allow_html=True)
+                    st.line_chart(pd.DataFrame(proba_f * 100, index=values,
+                                               columns=["Faible %", "Modere %", "Eleve %"]),
+                                  color=["#28C76F", "#E6A000", "#C8102E"])
+
+    # ── ANALYSE DE POPULATION (aggregates of the training store, analytics.py) ──
+    # built once per store hash and saved next to the store; rows appended since
+    # are folded in incrementally. The panel only runs while it is open.
+    @st.cache_resource(max_entries=1)
+    def population(store_hash):
+        return analytics.refresh()[0]
+
+    population_box = st.expander("Analyse de Population - Donnees d'entrainement",
+                                 key="population", on_change="rerun")
+    with population_box:
+        if population_box.open:
+            import numpy as np
+            import pandas as pd
+            t0 = time.perf_counter()
+            with perf.timer("population"):
+                pop = population(data_store.open_store().hash)
+            load_ms = (time.perf_counter() - t0) * 1000
+            x_pat = st.session_state.last_x[0] if st.session_state.last_x is not None else None
+            pat_groups = pop.group_of(x_pat) if x_pat is not None else {}
+
+            group = st.selectbox("Repartition du risque par", list(analytics.GROUPS),
+                                 format_func=lambda g: analytics.GROUPS[g][0], key="population_group")
+            title, labels, _ = analytics.GROUPS[group]
+            counts = pop.groups[group]
+            shares = counts / counts.sum(axis=1, keepdims=True).clip(min=1) * 100
+            st.bar_chart(pd.DataFrame(shares, index=pd.Index(labels, name=title),
+                                      columns=["Faible %", "Modere %", "Eleve %"]),
+                         color=["#28C76F", "#E6A000", "#C8102E"], sort=False, y_label="% des dossiers")
+            if group in pat_groups:
+                k = pat_groups[group]
+                st.caption(f"Patient actuel : {title.lower()} {labels[k]} "
+                           f"({counts[k].sum()} dossiers, {shares[k, 2]:.1f}% a risque eleve)")
+
+            value_cols = [c for c in analytics.value_features(feat_cols) if c in pop.values]
+            hist_col = st.selectbox("Distribution de", value_cols, key="population_feature",
+                                    format_func=lambda c: cardio_model.FEATURE_LABELS.get(c, c))
+            edges, hist = pop.histogram(hist_col)
+            mids = pd.Index(((edges[:-1] + edges[1:]) / 2).round(1),
+                            name=cardio_model.FEATURE_LABELS.get(hist_col, hist_col))
+            hist_df = pd.DataFrame({"Dossiers": hist, "Patient actuel": 0}, index=mids)
+            if x_pat is not None and x_pat[feat_cols.index(hist_col)] == x_pat[feat_cols.index(hist_col)]:
+                k = int(np.clip(np.searchsorted(edges, x_pat[feat_cols.index(hist_col)], "right") - 1,
+                                0, len(hist) - 1))
+                hist_df.iloc[k] = [0, hist[k]]  # the patient's bin in its own colour
+            st.bar_chart(hist_df, color=["#2E6DA4", "#C8102E"], y_label="Dossiers")
+
+            if x_pat is not None:
+                st.markdown('<div class="section-label">Position du patient dans la population</div>',
+                            unsafe_allow_html=True)
+                st.table(pd.DataFrame([
+                    {"Variable": cardio_model.FEATURE_LABELS.get(c, c),
+                     "Patient": f"{round(float(x_pat[feat_cols.index(c)]), 1):g}",
+                     "Percentile": f"{pop.percentile(c, x_pat[feat_cols.index(c)]):.0f}e"}
+                    for c in analytics.value_features(feat_cols) if c in pop.values
+                ]).set_index("Variable"))
+            st.caption(f"{pop.rows:,} dossiers d'entrainement, agregats lus en {load_ms:.1f} ms")
+
+    # ── HISTORIQUE PATIENT (recherche) ──
+    with st.expander("Historique Patient - Bilans precedents"):
+        query = st.text_input("Nom (debut) ou N dossier", key="history_query")
+        if query:
+            t0 = time.perf_counter()
+            with perf.timer("history_search"):
+                matches = history_store().search(query)
+            if not matches:
+                st.info("Aucun bilan enregistre pour cette recherche.")
+            else:
+                pick = st.selectbox(
+                    "Patient", matches,
+                    format_func=lambda m: f"{(m['nom'] or '').upper()} {(m['prenom'] or '').capitalize()} "
+                                          f"{'- ' + m['dossier'] if m['dossier'] else ''} "
+                                          f"({m['n']} bilan(s), dernier le "
+                                          f"{datetime.fromtimestamp(m['last'], pytz.timezone('Africa/Algiers')):%d/%m/%Y})")
+                with perf.timer("history_lookup"):
+                    rows = (history_store().lookup(dossier=pick["dossier"]) if query.strip() == pick["dossier"]
+                            else history_store().lookup(pick["nom"], pick["prenom"]))
+                lookup_ms = (time.perf_counter() - t0) * 1000
+                show_history(rows)
+                st.caption(f"{len(rows)} bilan(s), recherche et lecture en {lookup_ms:.1f} ms")
+
+    # ── DEPISTAGE DE COHORTE (batch) ──
+    with st.expander("Depistage de Cohorte - Analyse d'un fichier CSV / Parquet"):
+        cohort = st.file_uploader("Fichier patients (memes colonnes que le jeu d'entrainement)",
+                                  type=["csv", "parquet"])
+        if cohort is not None and st.button("Analyser la cohorte"):
+            import batch_score
+            out = io.BytesIO()
+            try:
+                n_rows, secs = batch_score.score_file(cohort, out, model, feat_cols)
+            except ValueError as e:
+                st.error(f"Fichier invalide : {e}")
+            else:
+                st.success(f"{n_rows} patients analyses en {secs:.2f}s "
+                           f"({n_rows / max(secs, 1e-9):,.0f} patients/s)")
+                st.download_button(
+                    label="Telecharger les resultats (CSV)",
+                    data=out.getvalue(),
+                    file_name=f"CardioIA_Cohorte_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv",
+                    key="dl_cohort"
+                )
+finally:
+    perf_run.finish()
+startup_profile.mark("first render")
+startup_profile.dump()
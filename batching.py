@@ -0,0 +1,163 @@
+"""Micro-batching of concurrent predictions inside one process.
+
+Every Streamlit session runs in its own thread of the server process. Scored
+one by one, simultaneous submits each pay the full per-call overhead and
+contend for the cores. A MicroBatcher thread takes the first waiting request,
+collects the ones that arrive within max_wait_ms (up to max_batch rows),
+scores them in one cardio_model.predict call and hands every caller back its
+own rows:
+
+    batcher = batching.MicroBatcher(max_batch=64, max_wait_ms=0)
+    proba, idx, score = batcher.predict(model, x)        # blocks, like cardio_model.predict
+
+The wait is counted from the first request's arrival. With the default 0, a
+batch is whatever queued up while the previous one was scored: a lone submit
+is not delayed and batches grow with the load (python -m
+benchmarks.bench_batching: a fixed wait of a few ms cost more than it saved).
+CARDIO_BATCH_MAX / CARDIO_BATCH_WAIT_MS set the defaults. With n_features,
+predict() rejects rows of another width before they join a batch; a batch
+that fails raises in each of its callers and the thread goes on.
+
+BatchStats keeps the batch-size distribution and the queueing delays; it is
+shared with the asyncio batcher of inference_server.py. summary() lists the
+batchers of the process (page ?admin=perf); with CARDIO_PERF=1 the delays
+also feed the "batch_wait" perf histogram.
+"""
+import bisect
+import collections
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+import cardio_model
+import perf
+
+MAX_BATCH    = int(os.environ.get("CARDIO_BATCH_MAX", "64"))
+MAX_WAIT_MS  = float(os.environ.get("CARDIO_BATCH_WAIT_MS", "0"))
+SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 1024, 4096)  # requests per batch
+
+_batchers = {}
+log = logging.getLogger("cardio.batching")
+
+
+class BatchStats:
+    """Thread-safe batch-size distribution and queueing delay (seconds) of one batcher."""
+
+    def __init__(self):
+        self.requests = self.rows = self.batches = 0
+        self.sizes = [0] * (len(SIZE_BUCKETS) + 1)  # last one is larger
+        self.wait_total = 0.0
+        self.waits = collections.deque(maxlen=perf.WINDOW)
+        self._lock = threading.Lock()
+
+    def record(self, rows, waits):
+        """One batch of len(waits) requests and `rows` rows."""
+        with self._lock:
+            self.requests += len(waits)
+            self.rows += rows
+            self.batches += 1
+            self.sizes[bisect.bisect_left(SIZE_BUCKETS, len(waits))] += 1
+            self.wait_total += sum(waits)
+            self.waits.extend(waits)
+        if perf.ENABLED:
+            h = perf.histogram("batch_wait")
+            for w in waits:
+                h.observe(w)
+
+    def snapshot(self):
+        with self._lock:
+            waits = sorted(self.waits)
+            sizes = {f"<={b}": c for b, c in zip(SIZE_BUCKETS, self.sizes)}
+            sizes[f">{SIZE_BUCKETS[-1]}"] = self.sizes[-1]
+            return {
+                "requests":     self.requests,
+                "rows":         self.rows,
+                "batches":      self.batches,
+                "mean_batch":   round(self.requests / self.batches, 2) if self.batches else 0.0,
+                "batch_sizes":  {k: c for k, c in sizes.items() if c},
+                "wait_mean_ms": round(self.wait_total / self.requests * 1000, 3) if self.requests else 0.0,
+                "wait_p50_ms":  round(_percentile(waits, 0.50) * 1000, 3),
+                "wait_p99_ms":  round(_percentile(waits, 0.99) * 1000, 3),
+            }
+
+
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+class MicroBatcher:
+    """Scores the predict() calls of concurrent threads in shared batches."""
+
+    def __init__(self, max_batch=MAX_BATCH, max_wait_ms=MAX_WAIT_MS, name="predict", n_features=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000
+        self.n_features = n_features
+        self.stats = BatchStats()
+        self._queue = queue.SimpleQueue()
+        threading.Thread(target=self._run, name=f"batcher-{name}", daemon=True).start()
+        _batchers[name] = self
+
+    def predict(self, model, x):
+        """Same result as cardio_model.predict(model, x), scored along with other callers."""
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        if x.ndim == 1:
+            x = x[None, :]
+        if x.ndim != 2 or (self.n_features is not None and x.shape[1] != self.n_features):
+            raise ValueError(f"expected rows of {self.n_features or 'n'} features, got shape {x.shape}")
+        fut = Future()
+        self._queue.put((model, x, time.perf_counter(), fut))
+        return fut.result()
+
+    def _run(self):
+        while True:
+            batch = [self._queue.get()]
+            try:
+                rows = len(batch[0][1])
+                deadline = batch[0][2] + self.max_wait
+                while rows < self.max_batch:
+                    timeout = deadline - time.perf_counter()
+                    try:
+                        item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    batch.append(item)
+                    rows += len(item[1])
+                self._score(batch, rows)
+            except BaseException as e:  # the only scoring thread: fail this batch, keep serving
+                log.exception("batch of %d requests failed", len(batch))
+                for it in batch:
+                    if not it[3].done():
+                        it[3].set_exception(e)
+
+    def _score(self, batch, rows):
+        start = time.perf_counter()
+        groups = {}  # a model swap (or a caller with other columns) splits a batch
+        for item in batch:
+            groups.setdefault((id(item[0]), item[1].shape[1]), []).append(item)
+        for items in groups.values():
+            try:
+                proba, idx, score = cardio_model.predict(items[0][0], np.concatenate([it[1] for it in items]))
+            except Exception as e:
+                for it in items:
+                    it[3].set_exception(e)
+                continue
+            i = 0
+            for _, x, _, fut in items:
+                fut.set_result((proba[i:i + len(x)], idx[i:i + len(x)], score[i:i + len(x)]))
+                i += len(x)
+        self.stats.record(rows, [start - it[2] for it in batch])
+
+
+def summary():
+    """[{batcher, max_batch, max_wait_ms, requests, ..., wait_p99_ms}] of this process."""
+    rows = []
+    for name, b in sorted(_batchers.items()):
+        snap = b.stats.snapshot()
+        snap["batch_sizes"] = ", ".join(f"{k}: {c}" for k, c in snap["batch_sizes"].items())
+        rows.append({"batcher": name, "max_batch": b.max_batch, "max_wait_ms": b.max_wait * 1000, **snap})
+    return rows
@@ -0,0 +1,82 @@
+"""Population analytics: precomputed aggregates vs scanning the full frame.
+
+    python -m benchmarks.bench_analytics [--sizes 5500 1000000 5000000] [--new 0.01]
+
+For each size, synthetic rows are bootstrapped from the training store.
+"frame" is what the page would do without analytics.py: pandas crosstabs of
+the three groupings and a percentile as a comparison over the whole column.
+"aggregates" builds analytics.compute once, then answers from the compact
+arrays. "incremental" folds --new x size appended rows into them.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import analytics
+import data_store
+from benchmarks.suite import synthetic_rows
+
+LOOKUPS = [('age', 45), ('bmi', 29.3), ('systolic_bp', 142), ('cholesterol_mg_dl', 230),
+           ('daily_steps', 6500), ('sleep_hours', 6.5)]
+
+
+def timed(fn, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - t0)
+    return best, out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_500, 1_000_000, 5_000_000])
+    parser.add_argument("--new", type=float, default=0.01, help="appended rows as a fraction")
+    args = parser.parse_args(argv)
+
+    store = data_store.open_store()
+    feat_cols = store.feat_cols
+    base_X, base_y = np.asarray(store.X), np.asarray(store.y)
+    print(f"{'rows':>10}{'frame build ms':>16}{'aggr. build ms':>16}{'incremental ms':>16}"
+          f"{'frame pct us':>14}{'aggr. pct us':>14}{'aggr. KiB':>11}")
+    for size in args.sizes:
+        n_new = max(1, int(size * args.new))
+        idx = np.random.default_rng(size).integers(0, len(base_y), size + n_new)
+        X = synthetic_rows(base_X, size + n_new, seed=size)
+        y = base_y[idx]
+
+        df = pd.DataFrame(X[:size], columns=feat_cols).assign(risk_category=y[:size])
+
+        def frame_build():
+            out = {}
+            for g, (_, _, fn) in analytics.GROUPS.items():
+                group, missing = fn(lambda c: df[c].to_numpy())
+                out[g] = pd.crosstab(group[~missing], df["risk_category"].to_numpy()[~missing])
+            return out
+
+        frame_s, _ = timed(frame_build)
+        agg_s, agg = timed(lambda: analytics.compute(X[:size], y[:size], feat_cols))
+
+        def incremental():
+            a = analytics.Aggregates(feat_cols)
+            a.add(agg)
+            t0 = time.perf_counter()
+            a.add(analytics.compute(X[size:], y[size:], feat_cols))
+            return time.perf_counter() - t0
+
+        inc_s = min(incremental() for _ in range(3))
+        frame_pct, _ = timed(lambda: [((df[c] < v).mean() + (df[c] <= v).mean()) / 2 for c, v in LOOKUPS])
+        agg.percentile('age', 45)  # cumulative counts are built on the first lookup
+        agg_pct, _ = timed(lambda: [agg.percentile(c, v) for c, v in LOOKUPS], repeat=20)
+        size_kib = (sum(a.nbytes for a in agg.groups.values())
+                    + sum(v.nbytes + n.nbytes for v, n in agg.values.values())) / 1024
+        print(f"{size:>10,}{frame_s * 1000:>16.1f}{agg_s * 1000:>16.1f}{inc_s * 1000:>16.1f}"
+              f"{frame_pct / len(LOOKUPS) * 1e6:>14,.0f}{agg_pct / len(LOOKUPS) * 1e6:>14.1f}"
+              f"{size_kib:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
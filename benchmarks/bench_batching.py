@@ -0,0 +1,74 @@
+"""Concurrent single-patient submits: direct predict calls vs a MicroBatcher.
+
+    python -m benchmarks.bench_batching [--threads 1 8 32] [--seconds 3]
+                                        [--wait-ms 0 1 2] [--engine numpy]
+
+--threads threads (one per Streamlit session) score one distinct row each in
+a closed loop. "direct" calls cardio_model.predict from every thread (the
+old submit path); "batched, N ms" goes through batching.MicroBatcher with
+max_wait_ms=N. Reports requests/s, caller latency, mean batch size and the
+queueing delay inside the batcher.
+"""
+import argparse
+import threading
+import time
+
+import numpy as np
+
+import batching
+import cardio_model
+import data_store
+from benchmarks.suite import synthetic_rows
+
+
+def run(score, threads, seconds, X):
+    latencies = [[] for _ in range(threads)]
+    start = threading.Barrier(threads + 1)
+    end = [0.0]
+
+    def session(k):
+        out, x = latencies[k], X[k % len(X)][None, :]
+        start.wait()
+        while time.perf_counter() < end[0]:
+            t0 = time.perf_counter()
+            score(x)
+            out.append(time.perf_counter() - t0)
+
+    workers = [threading.Thread(target=session, args=(k,)) for k in range(threads)]
+    for w in workers:
+        w.start()
+    end[0] = time.perf_counter() + seconds
+    start.wait()
+    for w in workers:
+        w.join()
+    lat = np.concatenate([np.asarray(l) for l in latencies]) * 1000
+    return len(lat) / seconds, np.percentile(lat, 50), np.percentile(lat, 99)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--wait-ms", type=float, nargs="+", default=[0, 1, 2])
+    parser.add_argument("--max-batch", type=int, default=batching.MAX_BATCH)
+    parser.add_argument("--engine", choices=["numpy", "xgboost"], default=cardio_model.ENGINE)
+    args = parser.parse_args(argv)
+
+    model, _ = cardio_model.load_model(engine=args.engine)
+    X = synthetic_rows(np.asarray(data_store.open_store().X), 1024, seed=1)
+    print(f"engine {args.engine}, {args.seconds:g} s per run")
+    print(f"{'threads':>8}  {'mode':<15}{'req/s':>9}{'p50 ms':>9}{'p99 ms':>9}"
+          f"{'batch':>8}{'wait p50':>10}{'wait p99':>10}")
+    for threads in args.threads:
+        rps, p50, p99 = run(lambda x: cardio_model.predict(model, x), threads, args.seconds, X)
+        print(f"{threads:>8}  {'direct':<15}{rps:>9,.0f}{p50:>9.2f}{p99:>9.2f}")
+        for wait in args.wait_ms:
+            batcher = batching.MicroBatcher(args.max_batch, wait, name=f"bench-{threads}-{wait:g}")
+            rps, p50, p99 = run(lambda x: batcher.predict(model, x), threads, args.seconds, X)
+            s = batcher.stats.snapshot()
+            print(f"{threads:>8}  {f'batched, {wait:g} ms':<15}{rps:>9,.0f}{p50:>9.2f}{p99:>9.2f}"
+                  f"{s['mean_batch']:>8.1f}{s['wait_p50_ms']:>10.2f}{s['wait_p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
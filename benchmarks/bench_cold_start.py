@@ -0,0 +1,58 @@
+"""Cold start: time from a fresh interpreter to the first prediction.
+
+    python -m benchmarks.bench_cold_start [--repeat 5]
+
+"before" refits the booster from the CSV as app.py used to do on every
+process start; "after" loads the persisted artifact.
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+
+import cardio_model
+
+BEFORE = """
+import pandas as pd, xgboost as xgb
+df = pd.read_csv({data!r})
+df['smoking_status'] = df['smoking_status'].map({{'Never': 0, 'Former': 1, 'Current': 2}})
+X = df.drop(['Patient_ID', 'heart_disease_risk_score', 'risk_category'], axis=1)
+mdl = xgb.XGBClassifier(n_estimators=100, max_depth=5, learning_rate=0.1)
+mdl.fit(X, df['risk_category'])
+mdl.predict_proba(X.iloc[:1])
+"""
+
+AFTER = """
+import numpy as np, cardio_model
+mdl, feat_cols = cardio_model.load_model()
+mdl.predict_proba(np.array([[62, 25, 142, 93, 247, 72, 0, 11565, 3, 5.6, 8.2, 0, 7, 0.7]]))
+"""
+
+
+def run(code, repeat):
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], check=True, cwd=cardio_model.BASE_DIR)
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # make sure the artifact exists so "after" measures a pure load
+    cardio_model.load_model()
+
+    rows = [("before (fit on start)", run(BEFORE.format(data=cardio_model.DATA_PATH), args.repeat)),
+            ("after  (load artifact)", run(AFTER, args.repeat))]
+    print(f"{'mode':<24}{'median s':>10}{'min s':>10}")
+    for name, times in rows:
+        print(f"{name:<24}{statistics.median(times):>10.3f}{min(times):>10.3f}")
+
+
+if __name__ == "__main__":
+    main()
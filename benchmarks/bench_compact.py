@@ -0,0 +1,108 @@
+"""Heap vs compact tree export: parity, model bytes, worker RSS and latency.
+
+    python -m benchmarks.bench_compact [--repeat 3]
+
+Both exports of the published booster are written to a temporary directory.
+Parity and accuracy are measured on cardiovascular_risk_numeric.csv (also
+with a seventh of the values blanked, for the missing-value directions)
+against xgboost. RSS is the peak of a fresh interpreter that loads the model
+the way a serving worker does and scores one row; "model" is the growth
+over the same interpreter before the load. Latency is the median of
+cardio_model.predict per batch size.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import cardio_model
+import data_store
+import features
+import tree_predictor
+
+PROBE = """
+import json, sys
+def rss():
+    return int(next(l for l in open("/proc/self/status") if l.startswith("VmRSS")).split()[1]) / 1024
+import numpy as np, cardio_model, tree_predictor
+before = rss()
+if {path!r}:
+    model = tree_predictor.TreeEnsemble.load({path!r})
+else:
+    model, _ = cardio_model.load_model(engine="xgboost")
+cardio_model.predict(model, np.zeros((1, {n_features}), dtype=np.float32))
+hwm = int(next(l for l in open("/proc/self/status") if l.startswith("VmHWM")).split()[1]) / 1024
+print(json.dumps({{"rss_mb": hwm, "model_mb": rss() - before}}))
+"""
+BATCHES = [1, 100, 5500]
+
+
+def probe(path, n_features, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(path=path, n_features=n_features)],
+                             check=True, capture_output=True, text=True, cwd=cardio_model.BASE_DIR)
+        runs.append(json.loads(out.stdout))
+    return statistics.median(r["rss_mb"] for r in runs), statistics.median(r["model_mb"] for r in runs)
+
+
+def latency_us(model, X, min_secs=0.3):
+    times = []
+    t_end = time.perf_counter() + min_secs
+    while time.perf_counter() < t_end or len(times) < 5:
+        t0 = time.perf_counter()
+        cardio_model.predict(model, X)
+        times.append(time.perf_counter() - t0)
+    return statistics.median(times) * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    xgb_model, feat_cols = cardio_model.load_model(engine="xgboost")
+    booster = xgb_model.get_booster()
+    df = pd.read_csv(data_store.CSV_PATH)
+    X = features.prepare(df, feat_cols)
+    y = df["risk_category"].to_numpy()
+    X_missing = X.copy()
+    X_missing[::7, ::3] = np.nan
+    ref = booster.inplace_predict(X)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"heap": os.path.join(tmp, "heap.npz"), "compact": os.path.join(tmp, "compact.npz")}
+        for name, path in paths.items():
+            tree_predictor.export(booster, path, compact=name == "compact")
+        models = {"xgboost": xgb_model, **{n: tree_predictor.TreeEnsemble.load(p) for n, p in paths.items()}}
+
+        print(f"{len(X)} rows of {os.path.basename(data_store.CSV_PATH)}, {models['heap'].n_trees} trees "
+              f"of depth {models['heap'].depth}")
+        print(f"{'format':<9}{'file KiB':>9}{'arrays KiB':>11}{'RSS MB':>8}{'model MB':>9}"
+              f"{'max |dp|':>10}{'accuracy':>9}{'same class':>11}"
+              + "".join(f"{f'us @{b}':>11}" for b in BATCHES))
+        for name, model in models.items():
+            path = paths.get(name)
+            file_kib = os.path.getsize(path or os.path.join(cardio_model.MODEL_DIR, model.model_file)) / 1024
+            arrays_kib = f"{model.nbytes / 1024:.1f}" if path else "-"
+            rss, model_mb = probe(path, len(feat_cols), args.repeat)
+            proba = cardio_model.predict(model, X)[0]
+            diff = max(float(np.abs(proba - ref).max()),
+                       float(np.abs(cardio_model.predict(model, X_missing)[0]
+                                    - booster.inplace_predict(X_missing)).max()))
+            lat = [latency_us(model, X[:b]) for b in BATCHES]
+            print(f"{name:<9}{file_kib:>9.1f}{arrays_kib:>11}{rss:>8.1f}{model_mb:>9.2f}"
+                  f"{diff:>10.1e}{(proba.argmax(axis=1) == y).mean():>9.4f}"
+                  f"{(proba.argmax(axis=1) == ref.argmax(axis=1)).mean():>11.4f}"
+                  + "".join(f"{v:>11,.0f}" for v in lat))
+
+
+if __name__ == "__main__":
+    main()
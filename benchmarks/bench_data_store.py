@@ -0,0 +1,96 @@
+"""Training data load: pandas CSV parse vs the memory-mapped store.
+
+    python -m benchmarks.bench_data_store [--rows 500000] [--repeat 3]
+
+Each load runs in a fresh interpreter and reports wall time (imports
+included) and peak RSS. "csv" is what load_training_data did before the
+store: read_csv, encode smoking_status, drop the target columns, to_numpy.
+"store" opens the store and reads every value of X and y once. Both are run
+on the training CSV and on --rows synthetic rows bootstrapped from it.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+import cardio_model
+import data_store
+from benchmarks.suite import synthetic_rows
+
+PROBES = {
+    "csv": """
+import pandas as pd
+df = pd.read_csv({src!r})
+df["smoking_status"] = df["smoking_status"].map({{"Never": 0, "Former": 1, "Current": 2}})
+y = df["risk_category"].to_numpy()
+X = df.drop(columns=["Patient_ID", "risk_category", "heart_disease_risk_score"]).to_numpy(dtype="float32")
+total = float(X.sum()) + float(y.sum())
+""",
+    "store": """
+import data_store
+store = data_store.Store({src!r})
+total = float(store.X.sum(dtype="float64")) + float(store.y.sum())
+""",
+}
+WRAPPER = """
+import json, time
+t0 = time.perf_counter()
+{body}
+secs = time.perf_counter() - t0
+hwm = next(l for l in open("/proc/self/status") if l.startswith("VmHWM"))
+print(json.dumps({{"secs": secs, "rss_mb": int(hwm.split()[1]) / 1024}}))
+"""
+
+
+def probe(method, src, repeat):
+    code = WRAPPER.format(body=PROBES[method].format(src=src))
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", code], check=True, capture_output=True,
+                             text=True, cwd=cardio_model.BASE_DIR)
+        runs.append(json.loads(out.stdout))
+    return statistics.median(r["secs"] for r in runs), statistics.median(r["rss_mb"] for r in runs)
+
+
+def synthetic_csv(path, n):
+    """Write `n` synthetic rows with the training CSV's columns."""
+    import pandas as pd
+    store = data_store.open_store()
+    X = synthetic_rows(np.asarray(store.X), n)
+    df = pd.DataFrame(X, columns=store.feat_cols)
+    df["smoking_status"] = pd.Series(["Never", "Former", "Current"]).iloc[
+        np.clip(df["smoking_status"].round(), 0, 2).astype(int)].to_numpy()
+    df.insert(0, "Patient_ID", np.arange(1, n + 1))
+    df["heart_disease_risk_score"] = np.float32(0)
+    df["risk_category"] = np.random.default_rng(0).integers(0, 3, n)
+    df.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        datasets = [("training", data_store.CSV_PATH)]
+        if args.rows:
+            datasets.append((f"synthetic {args.rows:,}", os.path.join(tmp, "synthetic.csv")))
+            synthetic_csv(datasets[-1][1], args.rows)
+
+        print(f"{'dataset':<20}{'rows':>10}{'method':>8}{'load s':>9}{'peak RSS MB':>13}")
+        for name, csv in datasets:
+            store_dir = os.path.join(tmp, name.split()[0])
+            store = data_store.ingest(csv, store_dir, rebuild=True)
+            for method, src in [("csv", csv), ("store", store_dir)]:
+                secs, rss = probe(method, src, args.repeat)
+                print(f"{name:<20}{store.rows:>10,}{method:>8}{secs:>9.3f}{rss:>13.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Drift monitor: submit-path cost, memory and accuracy of the binned statistics.
+
+    python -m benchmarks.bench_drift [--rows 1000 100000 1000000] [--shift 10]
+
+Scored rows are bootstrapped from the training store, with --shift mmHg added
+to systolic_bp. "observe us" is drift.Monitor.observe for one submitted row
+(and per row for a batch of 1,000, as an API call would send); "report ms"
+is drift.compare over the counts. The binned KS distances are compared with
+the exact two-sample KS of the same rows ("max KS error", over all features).
+Keeping the rows instead grows at n_features x 4 bytes per patient.
+"""
+import argparse
+import time
+
+import numpy as np
+
+import data_store
+import drift
+from benchmarks.suite import synthetic_rows
+
+
+def exact_ks(a, b):
+    a, b = np.sort(a[~np.isnan(a)]), np.sort(b[~np.isnan(b)])
+    grid = np.concatenate([a, b])
+    return float(np.abs(np.searchsorted(a, grid, "right") / len(a)
+                        - np.searchsorted(b, grid, "right") / len(b)).max())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--shift", type=float, default=10.0, help="mmHg added to systolic_bp")
+    args = parser.parse_args(argv)
+
+    store = data_store.open_store()
+    ref = drift.compute_reference(store)
+    train_X, train_y = np.asarray(store.X), np.asarray(store.y)
+    sbp = store.feat_cols.index("systolic_bp")
+    print(f"reference: {ref.rows} rows, {(ref.edges.nbytes + ref.counts.nbytes) / 1024:.1f} KiB")
+    print(f"{'rows':>10}{'observe us':>12}{'us/row @1000':>14}{'report ms':>11}{'monitor KiB':>13}"
+          f"{'rows KiB':>10}{'PSI sbp':>9}{'KS sbp':>8}{'max KS error':>14}")
+    for n in args.rows:
+        X = synthetic_rows(train_X, n, seed=n)
+        X[:, sbp] += args.shift
+        y = train_y[np.random.default_rng(n).integers(0, len(train_y), n)]
+        one = min(n, 2_000)
+        mon = drift.Monitor(ref, export_every=0)
+        t0 = time.perf_counter()
+        for i in range(one):
+            mon.observe(X[i:i + 1], y[i:i + 1])
+        single = (time.perf_counter() - t0) / one * 1e6
+        mon = drift.Monitor(ref, export_every=0)
+        t0 = time.perf_counter()
+        for i in range(0, n, 1_000):
+            mon.observe(X[i:i + 1_000], y[i:i + 1_000])
+        batch = (time.perf_counter() - t0) / n * 1e6
+        t0 = time.perf_counter()
+        report = mon.report()
+        report_ms = (time.perf_counter() - t0) * 1000
+        ks_err = max(abs(r["ks"] - exact_ks(train_X[:, j], X[:, j])) for j, r in enumerate(report["features"]))
+        r_sbp = report["features"][sbp]
+        kib = (mon.counts.nbytes + mon.classes.nbytes) / 1024
+        print(f"{n:>10,}{single:>12.1f}{batch:>14.2f}{report_ms:>11.2f}{kib:>13.1f}"
+              f"{X.nbytes / 1024:>10,.0f}{r_sbp['psi']:>9.3f}{r_sbp['ks']:>8.3f}{ks_err:>14.4f}")
+
+
+if __name__ == "__main__":
+    main()
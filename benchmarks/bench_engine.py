@@ -0,0 +1,73 @@
+"""xgboost vs NumPy serving engine: startup, memory and throughput.
+
+    python -m benchmarks.bench_engine [--repeat 3]
+
+Startup and peak RSS are measured in a fresh interpreter that imports
+cardio_model, loads the model with the given engine and scores one row.
+Throughput is rows/s of cardio_model.predict for several batch sizes.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+import cardio_model
+
+PROBE = """
+import json, sys, time
+t0 = time.perf_counter()
+import numpy as np, cardio_model
+mdl, feat_cols = cardio_model.load_model(engine={engine!r})
+cardio_model.predict(mdl, np.zeros((1, len(feat_cols)), dtype=np.float32))
+secs = time.perf_counter() - t0
+hwm = next(l for l in open("/proc/self/status") if l.startswith("VmHWM"))  # ru_maxrss would count the forking parent
+print(json.dumps({{"secs": secs, "rss_mb": int(hwm.split()[1]) / 1024,
+                  "xgboost": "xgboost" in sys.modules, "pandas": "pandas" in sys.modules}}))
+"""
+BATCHES = [1, 100, 10_000]
+
+
+def probe(engine, repeat):
+    runs = []
+    for _ in range(repeat):
+        out = subprocess.run([sys.executable, "-c", PROBE.format(engine=engine)], check=True,
+                             capture_output=True, text=True, cwd=cardio_model.BASE_DIR)
+        runs.append(json.loads(out.stdout))
+    return runs
+
+
+def rows_per_second(model, X, min_secs=0.5):
+    n, t0 = 0, time.perf_counter()
+    while time.perf_counter() - t0 < min_secs:
+        cardio_model.predict(model, X)
+        n += len(X)
+    return n / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    cardio_model.load_model()  # make sure both artifacts exist
+    X, _ = cardio_model.load_training_data()
+    X = np.resize(X, (max(BATCHES), X.shape[1]))
+
+    print(f"{'engine':<9}{'start s':>9}{'RSS MB':>8}{'xgboost':>9}{'pandas':>8}"
+          + "".join(f"{f'rows/s @{b}':>16}" for b in BATCHES))
+    for engine in ["xgboost", "numpy"]:
+        runs = probe(engine, args.repeat)
+        model, _ = cardio_model.load_model(engine=engine)
+        rates = [rows_per_second(model, X[:b]) for b in BATCHES]
+        print(f"{engine:<9}{statistics.median(r['secs'] for r in runs):>9.2f}"
+              f"{statistics.median(r['rss_mb'] for r in runs):>8.0f}"
+              f"{'yes' if runs[0]['xgboost'] else 'no':>9}{'yes' if runs[0]['pandas'] else 'no':>8}"
+              + "".join(f"{r:>16,.0f}" for r in rates))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Cost of the per-prediction explanations (TreeSHAP contributions).
+
+    python -m benchmarks.bench_explain [--n 500] [--rows 5000]
+
+Single patient: p50 / p99 of cardio_model.explain on one row, checked
+against EXPLAIN_BUDGET_MS (exit status 1 when p99 is over budget). Batch:
+rows/s of one vectorized call over the first --rows training rows, exact
+TreeSHAP and the approximate variant.
+"""
+import argparse
+import sys
+import time
+
+import numpy as np
+
+import cardio_model
+from benchmarks.bench_inference import ROW, latencies
+
+EXPLAIN_BUDGET_MS = 20  # added to every form submission
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    model, feat_cols = cardio_model.load_model(engine="xgboost")
+    x = np.array([ROW], dtype=np.float32)
+
+    # contributions + bias add up to the margin the probabilities come from
+    margin = model.get_booster().inplace_predict(x, predict_type="margin")
+    assert np.allclose(cardio_model.explain(model, x).sum(axis=2), margin, atol=1e-4)
+
+    predict = latencies(lambda: cardio_model.predict(model, x), args.n) / 1000
+    explain = latencies(lambda: cardio_model.explain(model, x), args.n) / 1000
+    print(f"{'one patient':<14}{'p50 ms':>10}{'p99 ms':>10}")
+    print(f"{'predict':<14}{np.percentile(predict, 50):>10.2f}{np.percentile(predict, 99):>10.2f}")
+    print(f"{'explain':<14}{np.percentile(explain, 50):>10.2f}{np.percentile(explain, 99):>10.2f}")
+
+    X, _ = cardio_model.load_training_data()
+    X = X[:args.rows]
+    print(f"\n{'batch':<14}{'rows':>10}{'rows/s':>10}")
+    for name, approx in [("exact", False), ("approx", True)]:
+        t0 = time.perf_counter()
+        cardio_model.explain(model, X, approx=approx)
+        secs = time.perf_counter() - t0
+        print(f"{name:<14}{len(X):>10}{len(X) / secs:>10,.0f}")
+
+    p99 = np.percentile(explain, 99)
+    print(f"\nbudget {EXPLAIN_BUDGET_MS} ms per patient: {'OK' if p99 <= EXPLAIN_BUDGET_MS else 'OVER'}")
+    return 0 if p99 <= EXPLAIN_BUDGET_MS else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,82 @@
+"""Feature preparation: old per-path code vs the shared features module.
+
+    python -m benchmarks.bench_features [--n 2000]
+
+"before" is the old code of each path: the form's one-row DataFrame, the
+per-patient loop of api.py and the pandas selection of batch_score.py, none
+of which checked ranges. "features" is features.from_records /
+features.prepare, which also validate every value.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import cardio_model
+import data_store
+import features
+from benchmarks.bench_inference import ROW
+from benchmarks.suite import synthetic_rows
+
+
+def to_matrix_before(patients, feat_cols):
+    X = np.empty((len(patients), len(feat_cols)), dtype=np.float32)
+    smoking = feat_cols.index('smoking_status')
+    for i, p in enumerate(patients):
+        row = [p[c] for c in feat_cols]
+        if isinstance(row[smoking], str):
+            row[smoking] = cardio_model.SMOKING_MAP[row[smoking]]
+        X[i] = row
+    return X
+
+
+def to_features_before(chunk, feat_cols):
+    X = chunk[list(feat_cols)]
+    if not pd.api.types.is_numeric_dtype(X['smoking_status']):
+        X = X.assign(smoking_status=X['smoking_status'].map(cardio_model.SMOKING_MAP))
+    return X.to_numpy(dtype=np.float32)
+
+
+def per_call_us(fn, n):
+    fn()  # warm-up
+    t0 = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - t0) / n * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000, help="calls per measure")
+    args = parser.parse_args(argv)
+
+    store = data_store.open_store()
+    feat_cols = store.feat_cols
+    names = {v: k for k, v in cardio_model.SMOKING_MAP.items()}
+    X = synthetic_rows(np.asarray(store.X), 50_000, seed=0)
+    X[:, feat_cols.index('smoking_status')] = np.round(X[:, feat_cols.index('smoking_status')])
+    records = [dict(zip(feat_cols, map(float, row)), smoking_status=names[int(row[6])]) for row in X]
+    records[0] = dict(zip(feat_cols, ROW))
+
+    print(f"{'path':<26}{'before us':>11}{'features us':>13}")
+    row = records[0]
+    before = per_call_us(lambda: pd.DataFrame([list(row.values())], columns=feat_cols), args.n)
+    after = per_call_us(lambda: features.from_records([row], feat_cols), args.n)
+    print(f"{'form, one-row DataFrame':<26}{before:>11,.1f}{after:>13,.1f}")
+    for size in (1, 100, 10_000):
+        batch = records[:size]
+        n = max(3, args.n // size)
+        before = per_call_us(lambda: to_matrix_before(batch, feat_cols), n)
+        after = per_call_us(lambda: features.from_records(batch, feat_cols), n)
+        print(f"{f'api, {size:,} record(s)':<26}{before:>11,.1f}{after:>13,.1f}")
+
+    chunk = pd.DataFrame(X, columns=feat_cols).assign(
+        smoking_status=[names[int(v)] for v in X[:, 6]])
+    before = per_call_us(lambda: to_features_before(chunk, feat_cols), 20)
+    after = per_call_us(lambda: features.prepare(chunk, feat_cols), 20)
+    print(f"{'batch, 50,000-row chunk':<26}{before:>11,.0f}{after:>13,.0f}")
+
+
+if __name__ == "__main__":
+    main()
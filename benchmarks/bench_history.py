@@ -0,0 +1,107 @@
+"""Bilan history: lookup latency on a large table and write cost on the submit path.
+
+    python -m benchmarks.bench_history [--rows 300000] [--patients 50000]
+
+Fills a temporary database with synthetic bilans, then measures:
+  - lookup of one patient's history (by name and by file number), p50 / p99
+  - prefix search on the name
+  - History.record() as seen by the caller (queue only), and the rows/s the
+    background writer sustains, against one INSERT + COMMIT per bilan.
+"""
+import argparse
+import contextlib
+import os
+import random
+import statistics
+import tempfile
+import time
+
+import history
+
+NAMES = ["BENALI", "BOUZID", "HADDAD", "KACI", "MANSOURI", "SAIDI", "TOUATI", "ZERROUKI"]
+
+
+def synthetic_bilans(n_rows, n_patients, seed=0):
+    rng = random.Random(seed)
+    t0 = time.time() - 5 * 365 * 86400
+    for i in range(n_rows):
+        p = rng.randrange(n_patients)
+        nom, prenom = f"{NAMES[p % len(NAMES)]}{p}", f"P{p}"
+        probas = [rng.random() for _ in range(3)]
+        s = sum(probas)
+        probas = [q / s for q in probas]
+        k = max(range(3), key=probas.__getitem__)
+        yield (history.patient_key(nom, prenom), f"D{p:06d}", nom, prenom, 30 + p % 50,
+               t0 + i * 500, k, probas[k] * 100, *probas, None, "{}")
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return statistics.median(samples), samples[int(0.99 * (len(samples) - 1))]
+
+
+def timed_each(fn, args):
+    out = []
+    for a in args:
+        t0 = time.perf_counter()
+        fn(*a)
+        out.append((time.perf_counter() - t0) * 1000)
+    return percentiles(out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=300_000)
+    parser.add_argument("--patients", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=1_000)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "history.db")
+        hist = history.History(path)
+        t0 = time.perf_counter()
+        with contextlib.closing(history.connect(path)) as db, db:
+            db.executemany(history.INSERT, synthetic_bilans(args.rows, args.patients))
+        print(f"filled {args.rows:,} bilans for {args.patients:,} patients in "
+              f"{time.perf_counter() - t0:.1f}s ({os.path.getsize(path) / 1e6:.0f} MB)\n")
+
+        rng = random.Random(1)
+        ids = [rng.randrange(args.patients) for _ in range(args.queries)]
+        by_name = [(f"{NAMES[p % len(NAMES)]}{p}", f"P{p}") for p in ids]
+        n_found = sum(len(hist.lookup(*a)) for a in by_name[:100]) / 100
+        print(f"{'operation':<34}{'p50 ms':>9}{'p99 ms':>9}")
+        for label, fn, a in [
+            ("lookup by name", hist.lookup, by_name),
+            ("lookup by file number", lambda d: hist.lookup(dossier=d), [(f"D{p:06d}",) for p in ids]),
+            ("prefix search (20 patients)", hist.search, [(f"{NAMES[p % len(NAMES)]}{p % 100}",) for p in ids]),
+        ]:
+            p50, p99 = timed_each(fn, a)
+            print(f"{label:<34}{p50:>9.3f}{p99:>9.3f}")
+        print(f"({n_found:.1f} bilans per patient on average)\n")
+
+        patient = dict(nom="DURAND", prenom="Anne", age=58, sys_bp=140)
+        n = 5_000
+        t0 = time.perf_counter()
+        lat = timed_each(lambda: hist.record(patient, [0.2, 0.3, 0.5], 2, 50.0), [()] * n)
+        hist.flush()
+        bg_rate = n / (time.perf_counter() - t0)
+
+        rows = list(synthetic_bilans(n, 10, seed=2))
+        with contextlib.closing(history.connect(path)) as db:
+            sync = []
+            t0 = time.perf_counter()
+            for r in rows:
+                t1 = time.perf_counter()
+                with db:
+                    db.execute(history.INSERT, r)
+                sync.append((time.perf_counter() - t1) * 1000)
+            sync_rate = n / (time.perf_counter() - t0)
+        print(f"{'write path':<34}{'p50 ms':>9}{'p99 ms':>9}{'rows/s':>11}")
+        print(f"{'record() + background writer':<34}{lat[0]:>9.3f}{lat[1]:>9.3f}{bg_rate:>11,.0f}")
+        s50, s99 = percentiles(sync)
+        print(f"{'INSERT + COMMIT per bilan':<34}{s50:>9.3f}{s99:>9.3f}{sync_rate:>11,.0f}")
+        hist.close()
+
+
+if __name__ == "__main__":
+    main()
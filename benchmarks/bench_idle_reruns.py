@@ -0,0 +1,56 @@
+"""Script executions per minute for one idle browser session.
+
+    python -m benchmarks.bench_idle_reruns [--seconds 10] [--app app.py]
+
+Runs the app headless with streamlit's AppTest, leaves the session idle
+and counts how many times the script body executed.
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from streamlit.testing.v1 import AppTest
+
+import cardio_model
+
+WRAPPER = """
+with open({counter!r}, "a") as f:
+    f.write(".")
+exec(compile(open({app!r}).read(), {app!r}, "exec"))
+"""
+
+
+def count_runs(app, seconds):
+    with tempfile.TemporaryDirectory() as tmp:
+        counter = os.path.join(tmp, "runs")
+        wrapper = os.path.join(tmp, "wrapper.py")
+        with open(wrapper, "w") as f:
+            f.write(WRAPPER.format(counter=counter, app=app))
+        at = AppTest.from_file(wrapper, default_timeout=seconds)
+        t0 = time.perf_counter()
+        try:
+            at.run()
+        except RuntimeError:
+            pass  # the script never settled: it kept rerunning until the timeout
+        # stay idle for the rest of the window
+        time.sleep(max(0.0, seconds - (time.perf_counter() - t0)))
+        with open(counter) as f:
+            return len(f.read()) - 1  # minus the initial render
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--app", default=os.path.join(cardio_model.BASE_DIR, "app.py"))
+    args = parser.parse_args(argv)
+
+    cardio_model.load_model()  # keep training out of the measured window
+    os.chdir(os.path.dirname(os.path.abspath(args.app)))
+    runs = count_runs(os.path.abspath(args.app), args.seconds)
+    print(f"{runs} reruns in {args.seconds:.0f}s idle "
+          f"-> {runs * 60 / args.seconds:.1f} runs/min per session")
+
+
+if __name__ == "__main__":
+    main()
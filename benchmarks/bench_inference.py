@@ -0,0 +1,53 @@
+"""Per-request inference latency for one patient.
+
+    python -m benchmarks.bench_inference [--n 2000]
+
+"before" is the old submit block: a one-row DataFrame, predict_proba and
+then predict. "xgboost" and "numpy" are cardio_model.predict on a float32
+row with either engine.
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+import cardio_model
+
+ROW = [62, 25, 142, 93, 247, 72, 0, 11565, 3, 5.6, 8.2, 0, 7, 0.7]
+
+
+def latencies(fn, n):
+    fn()  # warm-up
+    out = np.empty(n)
+    for i in range(n):
+        t0 = time.perf_counter()
+        fn()
+        out[i] = time.perf_counter() - t0
+    return out * 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=2000)
+    args = parser.parse_args(argv)
+
+    model, feat_cols = cardio_model.load_model(engine="xgboost")
+    ensemble, _ = cardio_model.load_model(engine="numpy")
+
+    def before():
+        input_data = pd.DataFrame([ROW], columns=feat_cols)
+        model.predict_proba(input_data)[0]
+        model.predict(input_data)[0]
+
+    def after(m):
+        return lambda: cardio_model.predict(m, np.array([ROW], dtype=np.float32))
+
+    print(f"{'path':<8}{'p50 us':>10}{'p99 us':>10}")
+    for name, fn in [("before", before), ("xgboost", after(model)), ("numpy", after(ensemble))]:
+        lat = latencies(fn, args.n)
+        print(f"{name:<8}{np.percentile(lat, 50):>10.0f}{np.percentile(lat, 99):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Bytes the server sends to the browser per script run.
+
+    python -m benchmarks.bench_page_bytes [--app app.py] [--runs-per-minute 60]
+
+Sums the serialized size of every ForwardMsg of one AppTest run (what goes
+over the websocket), then scales it to a session-minute at the given rerun
+rate. 60 runs/min was the rate of the old one-second clock loop.
+"""
+import argparse
+import os
+
+from streamlit.testing.v1 import AppTest
+from streamlit.testing.v1 import local_script_runner
+
+import cardio_model
+
+
+def bytes_per_run(app):
+    sizes = []
+    original = local_script_runner.LocalScriptRunner.forward_msgs
+
+    def forward_msgs(self):
+        msgs = original(self)
+        sizes.append(sum(m.ByteSize() for m in msgs))
+        return msgs
+
+    local_script_runner.LocalScriptRunner.forward_msgs = forward_msgs
+    try:
+        AppTest.from_file(app, default_timeout=60).run()
+    finally:
+        local_script_runner.LocalScriptRunner.forward_msgs = original
+    return sizes[-1]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--app", default=os.path.join(cardio_model.BASE_DIR, "app.py"))
+    parser.add_argument("--runs-per-minute", type=float, default=60.0)
+    args = parser.parse_args(argv)
+
+    cardio_model.load_model()
+    os.chdir(os.path.dirname(os.path.abspath(args.app)))
+    n = bytes_per_run(os.path.abspath(args.app))
+    print(f"{n:,} bytes per run -> {n * args.runs_per_minute / 1024:,.0f} KiB "
+          f"per session-minute at {args.runs_per_minute:.0f} runs/min")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+"""PDF bilan rendering throughput.
+
+    python -m benchmarks.bench_report [--n 300]
+
+"full" draws the whole layout for every report, as the submit block used
+to. "template" reuses the per-class template and only fills the slots.
+"""
+import argparse
+import time
+from datetime import datetime
+
+import numpy as np
+
+import report
+
+PATIENT = dict(nom="Benali", prenom="Yasmine", age=54, family="Oui", sys_bp=150, dia_bp=95,
+               chol=260, pulse=80, smoke="Fumeur", steps=3000, sleep=6, stress=8, alcohol=2, diet=4)
+PROBA = np.array([0.02, 0.10, 0.88])
+
+
+def rate(n, cold):
+    now = datetime.now()
+    t0 = time.perf_counter()
+    for i in range(n):
+        if cold:
+            report._templates.clear()
+        report.build_report(PATIENT, PROBA, i % 3, 88.0, now)
+    return n / (time.perf_counter() - t0)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--n", type=int, default=300)
+    args = parser.parse_args(argv)
+
+    print(f"{'mode':<10}{'reports/s':>12}{'ms/report':>12}")
+    for name, cold in [("full", True), ("template", False)]:
+        r = rate(args.n, cold)
+        print(f"{name:<10}{r:>12.0f}{1000 / r:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Incremental update (xgb_model continuation) vs full refit, by store size.
+
+    python -m benchmarks.bench_retrain [--sizes 5500 100000 500000] [--new 0.05] [--rounds 20]
+
+For each size, a base model with the published hyperparameters is fit on
+synthetic rows bootstrapped from the training store, then --new x size more
+rows arrive. "incremental" adds --rounds rounds on the new rows only (what
+retrain.py does); "full refit" fits the same total number of rounds on every
+row. Nothing is written to models/.
+"""
+import argparse
+import time
+
+import numpy as np
+import xgboost as xgb
+
+import cardio_model
+import data_store
+import retrain
+from benchmarks.suite import synthetic_rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[5_500, 100_000, 500_000])
+    parser.add_argument("--new", type=float, default=0.05, help="new rows as a fraction of the store")
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    store = data_store.open_store()
+    meta = cardio_model.read_meta()
+    base_params = dict(meta["params"]) if meta else dict(cardio_model.PARAMS)
+    label = cardio_model.load_model(engine="numpy")[0]  # labels the synthetic rows
+    names = store.feat_cols
+    params = retrain.booster_params(base_params)
+
+    print(f"{'rows':>9}{'new':>8}{'rounds':>8}{'full refit s':>14}{'incremental s':>15}{'saved':>8}")
+    for size in args.sizes:
+        n_new = max(1, int(size * args.new))
+        X = synthetic_rows(np.asarray(store.X), size + n_new, seed=size)
+        y = label.predict_proba(X).argmax(axis=1)
+        base = cardio_model.fit(X[:size], y[:size], base_params, names).get_booster()
+        total = base.num_boosted_rounds() + args.rounds
+
+        t0 = time.perf_counter()
+        xgb.train(params, xgb.DMatrix(X[size:], label=y[size:], feature_names=names),
+                  num_boost_round=args.rounds, xgb_model=base)
+        incremental = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        cardio_model.fit(X, y, dict(base_params, n_estimators=total), names)
+        full = time.perf_counter() - t0
+        print(f"{size:>9,}{n_new:>8,}{args.rounds:>8}{full:>14.2f}{incremental:>15.3f}"
+              f"{full / incremental:>7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""Load test for the HTTP scoring API: p50/p99 latency and throughput.
+
+    python -m benchmarks.load_test_api [--url http://127.0.0.1:8000]
+                                       [--concurrency 16] [--seconds 10] [--batch 1]
+
+Without --url a local `uvicorn api:app` is started for the run.
+"""
+import argparse
+import http.client
+import json
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import numpy as np
+
+import cardio_model
+
+PATIENT = {
+    "age": 62, "bmi": 25.0, "systolic_bp": 142, "diastolic_bp": 93,
+    "cholesterol_mg_dl": 247, "resting_heart_rate": 72, "smoking_status": "Never",
+    "daily_steps": 11565, "stress_level": 3, "physical_activity_hours_per_week": 5.6,
+    "sleep_hours": 8.2, "family_history_heart_disease": 0, "diet_quality_score": 7,
+    "alcohol_units_per_week": 0.7,
+}
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _wait_ready(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request("GET", "/health")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError("API did not start")
+
+
+def worker(host, port, body, stop, latencies, errors):
+    conn = http.client.HTTPConnection(host, port)
+    headers = {"Content-Type": "application/json"}
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        try:
+            conn.request("POST", "/predict", body, headers)
+            resp = conn.getresponse()
+            resp.read()
+            ok = resp.status == 200
+        except OSError:
+            conn.close()
+            conn = http.client.HTTPConnection(host, port)
+            ok = False
+        if ok:
+            latencies.append(time.perf_counter() - t0)
+        else:
+            errors.append(1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--batch", type=int, default=1, help="patients per request")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.url:
+        u = urlparse(args.url)
+        host, port = u.hostname, u.port or 80
+    else:
+        cardio_model.load_model()
+        host, port = "127.0.0.1", _free_port()
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--host", host,
+                                   "--port", str(port), "--log-level", "warning"],
+                                  cwd=cardio_model.BASE_DIR)
+    try:
+        _wait_ready(host, port)
+        payload = PATIENT if args.batch == 1 else {"patients": [PATIENT] * args.batch}
+        body = json.dumps(payload)
+        stop, latencies, errors = threading.Event(), [], []
+        threads = [threading.Thread(target=worker, args=(host, port, body, stop, latencies, errors))
+                   for _ in range(args.concurrency)]
+        t0 = time.perf_counter()
+        for t in threads:
+            t.start()
+        time.sleep(args.seconds)
+        stop.set()
+        for t in threads:
+            t.join()
+        elapsed = time.perf_counter() - t0
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    lat = np.array(latencies) * 1000
+    print(f"requests {len(lat)}  errors {len(errors)}  concurrency {args.concurrency}  batch {args.batch}")
+    print(f"throughput {len(lat) / elapsed:,.0f} req/s  ({len(lat) * args.batch / elapsed:,.0f} patients/s)")
+    if len(lat):
+        print(f"latency p50 {np.percentile(lat, 50):.2f} ms  p99 {np.percentile(lat, 99):.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
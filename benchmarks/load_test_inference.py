@@ -0,0 +1,91 @@
+"""Load test for the inference worker pool: throughput vs number of workers.
+
+    python -m benchmarks.load_test_inference [--workers 1 2 4] [--clients 16]
+                                             [--seconds 5] [--batch 1] [--window-ms 0]
+
+For each worker count a fresh `inference_server.py` is started on a
+temporary socket. --clients processes (think one Streamlit server each) send
+predict requests of --batch rows in a closed loop over their own connection.
+Reports requests/s, latency percentiles and the mean rows per predict call.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import cardio_model
+import inference_server
+from benchmarks.bench_inference import ROW
+
+
+def _wait_ready(path, server, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError("inference server exited")
+        try:
+            return inference_server.RemoteModel(path)
+        except ConnectionError:
+            time.sleep(0.2)
+    raise RuntimeError("inference server did not start")
+
+
+def client(path, batch, start_at, seconds):
+    remote = inference_server.RemoteModel(path)
+    X = np.repeat(np.array([ROW], dtype=np.float32), batch, axis=0)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    latencies = []
+    end = start_at + seconds
+    while time.time() < end:
+        t0 = time.perf_counter()
+        remote.predict_proba(X)
+        latencies.append(time.perf_counter() - t0)
+    return latencies, remote.info()
+
+
+def run(workers, clients, seconds, batch, window_ms):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "inference.sock")
+        server = subprocess.Popen([sys.executable, "inference_server.py", "--socket", path,
+                                   "--workers", str(workers), "--window-ms", str(window_ms)],
+                                  cwd=cardio_model.BASE_DIR, stdout=subprocess.DEVNULL)
+        try:
+            _wait_ready(path, server)
+            start_at = time.time() + 1.0  # every client connected before the clock starts
+            with multiprocessing.Pool(clients) as pool:
+                results = pool.starmap(client, [(path, batch, start_at, seconds)] * clients)
+        finally:
+            server.terminate()
+            server.wait()
+    lat = np.concatenate([r[0] for r in results]) * 1000
+    stats = {r[1]["pid"]: r[1] for r in results}  # latest stats of every worker reached
+    rows_per_call = sum(s["rows"] for s in stats.values()) / max(1, sum(s["batches"] for s in stats.values()))
+    return len(lat) / seconds, np.percentile(lat, 50), np.percentile(lat, 99), rows_per_call
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--batch", type=int, default=1, help="rows per request")
+    parser.add_argument("--window-ms", type=float, default=inference_server.WINDOW_MS)
+    args = parser.parse_args(argv)
+
+    cardio_model.load_model()  # make sure the artifact exists
+    print(f"{os.cpu_count()} CPUs, {args.clients} clients, {args.batch} row(s) per request, "
+          f"window {args.window_ms} ms")
+    print(f"{'workers':>8}{'req/s':>10}{'rows/s':>11}{'p50 ms':>9}{'p99 ms':>9}{'rows/call':>11}")
+    for w in args.workers:
+        rps, p50, p99, per_call = run(w, args.clients, args.seconds, args.batch, args.window_ms)
+        print(f"{w:>8}{rps:>10,.0f}{rps * args.batch:>11,.0f}{p50:>9.2f}{p99:>9.2f}{per_call:>11.1f}")
+
+
+if __name__ == "__main__":
+    main()
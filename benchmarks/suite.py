@@ -0,0 +1,179 @@
+"""Reproducible benchmark suite with JSON output and regression check.
+
+    python -m benchmarks.suite [-o bench.json] [--baseline old.json] [--threshold 0.15]
+                               [--repeat 5] [--only NAME ...]
+
+Runs headless against the training store (built from the CSV):
+
+    train_fit          cardio_model.fit with the default PARAMS
+    single_<engine>    one patient as in the submit block (float32 row + predict)
+    explain_single     TreeSHAP contributions of one patient
+    batch_1k_<engine>  predict on 1,000 synthetic rows
+    batch_100k_<engine>
+    pdf_report         build_report from the per-class templates
+
+Synthetic rows are bootstrapped from the CSV with a little Gaussian jitter
+on the continuous columns, clipped to the observed range, with a fixed seed.
+Each metric is the median of --repeat runs after a warm-up. With --baseline,
+any metric more than --threshold (relative) worse than the baseline makes
+the exit status 1.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import cardio_model
+from benchmarks.bench_inference import ROW
+from benchmarks.bench_report import PATIENT, PROBA
+
+SEED    = 20240601
+JITTER  = 0.05   # fraction of the column std added to continuous columns
+ENGINES = ["numpy", "xgboost"]
+
+
+def synthetic_rows(X, n, seed=SEED):
+    """`n` rows drawn from the empirical distribution of `X` (float32)."""
+    rng = np.random.default_rng(seed)
+    out = X[rng.integers(0, len(X), n)].copy()
+    continuous = [j for j in range(X.shape[1]) if not np.all(X[:, j] == np.round(X[:, j]))]
+    noise = rng.normal(0, JITTER, (n, len(continuous))) * X[:, continuous].std(axis=0)
+    out[:, continuous] = np.clip(out[:, continuous] + noise,
+                                 X[:, continuous].min(axis=0), X[:, continuous].max(axis=0))
+    return out.astype(np.float32)
+
+
+def timed(fn, repeat, inner=1):
+    """Median seconds per call of `fn` over `repeat` runs of `inner` calls."""
+    fn()  # warm-up
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        for _ in range(inner):
+            fn()
+        runs.append((time.perf_counter() - t0) / inner)
+    return statistics.median(runs)
+
+
+# ── BENCHMARKS ──
+def run_suite(repeat, only=None):
+    X, y = cardio_model.load_training_data()
+    models = {e: cardio_model.load_model(engine=e)[0] for e in ENGINES}
+    batches = {"1k": synthetic_rows(X, 1_000), "100k": synthetic_rows(X, 100_000)}
+    results = {}
+
+    def add(name, value, unit, better="lower"):
+        results[name] = {"value": round(value, 6), "unit": unit, "better": better}
+
+    def wanted(name):
+        return not only or any(name.startswith(o) for o in only)
+
+    if wanted("train_fit"):
+        add("train_fit", timed(lambda: cardio_model.fit(X, y, cardio_model.PARAMS),
+                               max(1, repeat // 2)), "s")
+
+    for engine, model in models.items():
+        name = f"single_{engine}"
+        if wanted(name):
+            add(name, timed(lambda: cardio_model.predict(
+                model, np.array([ROW], dtype=np.float32)), repeat, inner=200) * 1e6, "us")
+
+    if wanted("explain_single"):
+        x = np.array([ROW], dtype=np.float32)
+        add("explain_single",
+            timed(lambda: cardio_model.explain(models["xgboost"], x), repeat, inner=50) * 1e3, "ms")
+
+    for size, rows in batches.items():
+        for engine, model in models.items():
+            name = f"batch_{size}_{engine}"
+            if wanted(name):
+                secs = timed(lambda: cardio_model.predict(model, rows), repeat)
+                add(name, len(rows) / secs, "rows/s", better="higher")
+
+    if wanted("pdf_report"):
+        import report
+        now = datetime(2024, 6, 1, 12, 0)
+        secs = timed(lambda: report.build_report(PATIENT, PROBA, 2, 88.0, now), repeat, inner=50)
+        add("pdf_report", secs * 1e3, "ms")
+    return results
+
+
+def environment():
+    versions = {}
+    for mod in ("numpy", "pandas", "xgboost", "fpdf", "sklearn"):
+        try:
+            versions[mod] = getattr(__import__(mod), "__version__", "?")
+        except ImportError:
+            versions[mod] = None
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                                text=True, cwd=cardio_model.BASE_DIR).stdout.strip()
+    except OSError:
+        commit = ""
+    return {
+        "commit":   commit,
+        "date":     datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python":   platform.python_version(),
+        "platform": platform.platform(),
+        "cpus":     os.cpu_count(),
+        "model":    (cardio_model.read_meta() or {}).get("fingerprint", "")[:12],
+        "versions": versions,
+    }
+
+
+# ── COMPARISON ──
+def compare(results, baseline, threshold):
+    """[(name, base, new, change, regressed)]; change > 0 means slower/worse."""
+    rows = []
+    for name, new in results.items():
+        old = baseline.get(name)
+        if not old or not old["value"]:
+            continue
+        change = (new["value"] - old["value"]) / old["value"]
+        if new["better"] == "higher":
+            change = -change
+        rows.append((name, old["value"], new["value"], change, change > threshold))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-o", "--output", help="write the results as JSON")
+    parser.add_argument("--baseline", help="JSON results of a previous run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.15,
+                        help="relative slowdown counted as a regression (default 0.15)")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--only", nargs="+", help="benchmark name prefixes to run")
+    args = parser.parse_args(argv)
+
+    results = run_suite(args.repeat, args.only)
+    record = {"environment": environment(), "results": results}
+    print(f"{'benchmark':<22}{'value':>14}  unit")
+    for name, r in results.items():
+        print(f"{name:<22}{r['value']:>14,.3f}  {r['unit']}")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(record, f, indent=2)
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    rows = compare(results, baseline["results"], args.threshold)
+    print(f"\nvs {args.baseline} ({baseline['environment'].get('commit') or '?'}), "
+          f"threshold {args.threshold:.0%}")
+    print(f"{'benchmark':<22}{'baseline':>14}{'now':>14}{'change':>9}")
+    for name, old, new, change, regressed in rows:
+        print(f"{name:<22}{old:>14,.3f}{new:>14,.3f}{change:>+9.1%}{'  REGRESSION' if regressed else ''}")
+    return 1 if any(r[-1] for r in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
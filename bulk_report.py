@@ -0,0 +1,171 @@
+"""Print the PDF bilans of a whole screening cohort.
+
+Usage:
+    python bulk_report.py cohort.csv -o bilans.zip [--workers 4]
+    python bulk_report.py cohort.csv --merged bilans.pdf [--workers 4]
+
+The cohort is scored with the batch path, then rendered across a process
+pool: one PDF per patient streamed into a ZIP, or one merged document with
+global "Page n / N" footers. Optional `nom` / `prenom` columns name the
+patients; otherwise Patient_ID (or the row number) is used.
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import pytz
+
+import batch_score
+import cardio_model
+import features
+import report
+
+SMOKE_FR    = ["Jamais", "Ex-fumeur", "Fumeur"]
+MERGE_CHUNK = 64  # patients per worker task in merged mode
+
+
+def _num(v):
+    v = float(v)
+    if v != v:   # missing in the cohort file
+        return "-"
+    return int(v) if v.is_integer() else round(v, 1)
+
+
+def _label(labels, v):
+    return "-" if v != v else labels[int(v)]
+
+
+def cohort_items(src, model, feat_cols, now, chunksize=batch_score.CHUNKSIZE):
+    """Yield (patient, proba, res_idx, score, now, ref, factors) for every row of `src`."""
+    row_no = 0
+    stamp = now.strftime('%Y%m%d%H%M%S')
+    col = {c: i for i, c in enumerate(feat_cols)}
+    for chunk in batch_score.iter_chunks(src, chunksize):
+        X = features.prepare(chunk, feat_cols, offset=row_no)
+        probas, classes, scores = cardio_model.predict(model, X)
+        contribs = cardio_model.explain(model, X)
+        for k, rec in enumerate(chunk.to_dict('records')):
+            row_no += 1
+            x = X[k]
+            pid = rec.get('Patient_ID', row_no)
+            patient = dict(
+                nom=rec.get('nom', pid), prenom=rec.get('prenom', ""),
+                age=_num(x[col['age']]),
+                family=_label(["Non", "Oui"], x[col['family_history_heart_disease']]),
+                sys_bp=_num(x[col['systolic_bp']]), dia_bp=_num(x[col['diastolic_bp']]),
+                chol=_num(x[col['cholesterol_mg_dl']]), pulse=_num(x[col['resting_heart_rate']]),
+                smoke=_label(SMOKE_FR, x[col['smoking_status']]),
+                steps=_num(x[col['daily_steps']]), sleep=_num(x[col['sleep_hours']]),
+                stress=_num(x[col['stress_level']]), alcohol=_num(x[col['alcohol_units_per_week']]),
+                diet=_num(x[col['diet_quality_score']]), bmi=_num(x[col['bmi']]),
+                activity=_num(x[col['physical_activity_hours_per_week']]),
+            )
+            res_idx = int(classes[k])
+            factors = cardio_model.top_factors(contribs[k], feat_cols, res_idx, report.N_FACTORS)
+            yield patient, probas[k], res_idx, float(scores[k]), now, f"CIA-{stamp}-{pid}", factors
+
+
+def _imap(pool, fn, items, window):
+    """Ordered map over `items` with at most `window` tasks in flight."""
+    pending = collections.deque()
+    for item in items:
+        pending.append(pool.submit(fn, item))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+
+def _chunks(items, size):
+    buf = []
+    for item in items:
+        buf.append(item)
+        if len(buf) == size:
+            yield buf
+            buf = []
+    if buf:
+        yield buf
+
+
+# ── WORKERS ──
+def _render_one(item):
+    patient, _, _, _, now, ref, _ = item
+    name = f"{ref}_{report.report_filename(patient, now)}"
+    return name, report.build_report(*item)
+
+
+def _render_pages(task):
+    """Draw a run of patients and return their raw page streams."""
+    items, offset = task
+    pdf = report.ReportPDF()
+    pdf.page_offset = offset
+    for item in items:
+        report.draw_report(pdf, report.report_values(*item), item[2])
+    return len(items), [report.page_stream(pdf, n) for n in range(1, pdf.page + 1)]
+
+
+# ── BULK MODES ──
+def write_zip(items, dst, workers):
+    """Stream one PDF per patient into a ZIP; return the number of reports."""
+    n = 0
+    with ProcessPoolExecutor(workers) as pool, zipfile.ZipFile(dst, "w", zipfile.ZIP_STORED) as zf:
+        for name, data in _imap(pool, _render_one, items, window=workers * 8):
+            zf.writestr(name, data)
+            n += 1
+    return n
+
+
+def write_merged(items, dst, workers):
+    """Render every patient into one multi-page PDF; return the number of reports."""
+    def tasks():
+        pages = 0
+        for chunk in _chunks(items, MERGE_CHUNK):
+            yield chunk, pages
+            pages += sum(len(report.get_template(it[2]).pages) for it in chunk)
+
+    pdf = report.ReportPDF()
+    n = 0
+    with ProcessPoolExecutor(workers) as pool:
+        for count, streams in _imap(pool, _render_pages, tasks(), window=workers * 2):
+            for stream in streams:
+                pdf.add_page()
+                pdf._out(stream)
+            n += count
+    pdf.output(dst, 'F')
+    return n
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA bulk PDF bilans")
+    parser.add_argument("src", help="cohort CSV or Parquet file")
+    parser.add_argument("-o", "--output", help="ZIP of per-patient PDFs (default: <src>_bilans.zip)")
+    parser.add_argument("--merged", metavar="PDF", help="write one merged PDF instead of a ZIP")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args(argv)
+
+    # xgboost has the better throughput on large batches (and explains them anyway)
+    model, feat_cols = cardio_model.load_model(engine="xgboost")
+    now = datetime.now(pytz.timezone('Africa/Algiers'))
+    items = cohort_items(args.src, model, feat_cols, now)
+
+    t0 = time.perf_counter()
+    dst = args.merged or args.output or f"{os.path.splitext(args.src)[0]}_bilans.zip"
+    try:
+        n = (write_merged if args.merged else write_zip)(items, dst, args.workers)
+    except ValueError as e:   # rejected by features.prepare
+        print(f"{args.src}: {e}", file=sys.stderr)
+        return 1
+    secs = time.perf_counter() - t0
+    rate = n / max(secs, 1e-9)
+    print(f"{n} bilans in {secs:.2f}s -> {dst}")
+    print(f"{rate:,.0f} reports/s, {rate / args.workers:,.0f} reports/s per core ({args.workers} workers)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,387 @@
+"""Model training, persistence and loading for CardioIA.
+
+Usage:
+    python cardio_model.py train [--force]
+    python cardio_model.py info
+
+`train` is a quick fit with the default PARAMS; train.py runs the full
+cross-validated search. Either way the artifact records its own
+hyperparameters and the hash of the memory-mapped store of data_store.py
+it was trained on (built from the CSV on first use). Serving keeps using it
+after rows are appended to the store, until train.py or retrain.py
+publishes a new one; it is never refit behind a published artifact.
+
+Next to the booster, every artifact carries a NumPy export of its trees
+(tree_predictor.py). Serving loads that one by default (ENGINE="numpy") and
+only imports xgboost and pandas when training or explaining. With
+CARDIO_COMPACT_TREES=1 the export is written in the compact form
+(tree_predictor.compress: uint8 / uint16 nodes, same predictions).
+"""
+import argparse
+import contextlib
+import functools
+import glob
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+import data_store
+import perf
+import tree_predictor
+
+# --- CONFIGURATION ---
+BASE_DIR  = os.path.dirname(os.path.abspath(__file__))
+DATA_PATH = data_store.CSV_PATH   # seed of the training store
+STORE_DIR = data_store.STORE_DIR
+MODEL_DIR = os.path.join(BASE_DIR, "models")
+META_PATH = os.path.join(MODEL_DIR, "cardio_xgb.meta.json")
+
+ARTIFACT_VERSION = 1
+COMPACT_TREES    = os.environ.get("CARDIO_COMPACT_TREES") == "1"  # tree export format
+ENGINE      = os.environ.get("CARDIO_ENGINE", "numpy")  # or "xgboost"
+PARAMS      = {"n_estimators": 100, "max_depth": 5, "learning_rate": 0.1}
+SMOKING_MAP = {'Never': 0, 'Former': 1, 'Current': 2}
+RISK_LABELS = ["RISQUE FAIBLE", "RISQUE MODERE", "RISQUE ELEVE"]
+
+# report / chart label of every feature column
+FEATURE_LABELS = {
+    'age':                              "Age",
+    'bmi':                              "IMC",
+    'systolic_bp':                      "Tension Systolique",
+    'diastolic_bp':                     "Tension Diastolique",
+    'cholesterol_mg_dl':                "Cholesterol",
+    'resting_heart_rate':               "Pouls au Repos",
+    'smoking_status':                   "Tabagisme",
+    'daily_steps':                      "Pas / Jour",
+    'stress_level':                     "Niveau de Stress",
+    'physical_activity_hours_per_week': "Activite Physique",
+    'sleep_hours':                      "Sommeil",
+    'family_history_heart_disease':     "Heredite Cardiaque",
+    'diet_quality_score':               "Qualite Alimentaire",
+    'alcohol_units_per_week':           "Alcool",
+}
+
+
+# ── FINGERPRINT ──
+def fingerprint(data_sha, params):
+    """Identify a model by its training data and hyperparameters."""
+    payload = json.dumps({"version": ARTIFACT_VERSION, "data": data_sha, "params": params},
+                         sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+# ── TRAINING ──
+def load_training_data(store_dir=STORE_DIR):
+    """(X, y) of the training store, memory-mapped (float32 features, int8 target)."""
+    store = data_store.open_store(store_dir)
+    return store.X, store.y
+
+
+def fit(X, y, params=PARAMS, feat_cols=None):
+    import xgboost as xgb
+    mdl = xgb.XGBClassifier(**params)
+    mdl.fit(X, y)
+    if feat_cols is not None:
+        mdl.get_booster().feature_names = list(feat_cols)
+    return mdl
+
+
+# ── ARTIFACT ──
+def read_meta(meta_path=META_PATH):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_json(path, obj):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f, indent=2)
+    os.replace(tmp, path)
+
+
+def export_trees(booster, meta, compact=None):
+    """Write the NumPy export of `booster` and record it in the metadata."""
+    compact = COMPACT_TREES if compact is None else compact
+    meta = dict(meta, tree_file=meta["model_file"].replace(".ubj", ".npz"),
+                tree_format="compact" if compact else "heap")
+    tree_predictor.export(booster, os.path.join(MODEL_DIR, meta["tree_file"]), compact)
+    _write_json(META_PATH, meta)
+    return meta
+
+
+def save_artifact(mdl, feat_cols, data_sha, params, train_seconds, metrics=None, extra=None):
+    """Write the booster and its tree export under a versioned name, then
+    point the metadata at them (`extra` is merged into the metadata)."""
+    import xgboost as xgb
+    os.makedirs(MODEL_DIR, exist_ok=True)
+    fp = fingerprint(data_sha, params)
+    model_file = f"cardio_xgb-{fp[:12]}.ubj"
+    tree_file = f"cardio_xgb-{fp[:12]}.npz"
+    tmp = os.path.join(MODEL_DIR, f".{model_file}.tmp.ubj")
+    mdl.save_model(tmp)
+    os.replace(tmp, os.path.join(MODEL_DIR, model_file))
+    tree_predictor.export(mdl.get_booster(), os.path.join(MODEL_DIR, tree_file), COMPACT_TREES)
+
+    meta = {
+        "artifact_version": ARTIFACT_VERSION,
+        "model_file":       model_file,
+        "tree_file":        tree_file,
+        "tree_format":      "compact" if COMPACT_TREES else "heap",
+        "fingerprint":      fp,
+        "data_sha256":      data_sha,
+        "params":           params,
+        "feat_cols":        list(feat_cols),
+        "xgboost_version":  xgb.__version__,
+        "train_seconds":    round(train_seconds, 3),
+        "n_trees":          mdl.get_booster().num_boosted_rounds(),
+        "metrics":          metrics or {},
+        "trained_at":       datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        **(extra or {}),
+    }
+    _write_json(META_PATH, meta)
+
+    # keep the current and the previous booster, drop older ones
+    files = sorted(glob.glob(os.path.join(MODEL_DIR, "cardio_xgb-*.ubj")),
+                   key=os.path.getmtime, reverse=True)
+    for old in files[2:]:
+        os.remove(old)
+        with contextlib.suppress(FileNotFoundError):
+            os.remove(old.replace(".ubj", ".npz"))
+    return meta
+
+
+def is_fresh(meta, data_sha, params=None):
+    """True if the artifact matches the data (and `params`, when given)."""
+    if meta is None:
+        return False
+    if params is None:
+        params = meta.get("params")
+    return (meta.get("artifact_version") == ARTIFACT_VERSION
+            and meta.get("fingerprint") == fingerprint(data_sha, params)
+            and os.path.exists(os.path.join(MODEL_DIR, meta["model_file"])))
+
+
+def train(store_dir=STORE_DIR, params=PARAMS):
+    """Fit on the training store and persist the artifact."""
+    store = data_store.open_store(store_dir)
+    t0 = time.perf_counter()
+    mdl = fit(store.X, store.y, params, store.feat_cols)
+    meta = save_artifact(mdl, store.feat_cols, store.hash, params, time.perf_counter() - t0)
+    mdl.fingerprint = meta["fingerprint"]
+    return mdl, meta
+
+
+_xgb_lock = threading.Lock()
+
+
+@functools.lru_cache(maxsize=2)
+def _read_xgb(model_file):
+    import xgboost as xgb
+    mdl = xgb.XGBClassifier()
+    mdl.load_model(os.path.join(MODEL_DIR, model_file))
+    return mdl
+
+
+def _load_xgb(model_file):
+    """The booster of `model_file`, loaded once: a caller arriving while
+    another thread (warm_explainer) loads it waits for that load."""
+    with _xgb_lock:
+        return _read_xgb(model_file)
+
+
+def is_servable(meta, store):
+    """True if the artifact exists and was trained on the store or on an
+    earlier state of it: rows appended since do not retire a published model
+    (retrain.py folds them in)."""
+    return (meta is not None
+            and meta.get("artifact_version") == ARTIFACT_VERSION
+            and os.path.exists(os.path.join(MODEL_DIR, meta["model_file"]))
+            and store.rows_at(meta.get("data_sha256")) is not None)
+
+
+def load_model(store_dir=STORE_DIR, params=None, fit_missing=True, engine=None):
+    """Return (model, feat_cols) of the published artifact.
+
+    With params=None any artifact trained on the store, or on a prefix of it
+    (rows appended since), is accepted whatever its hyperparameters; with
+    `params` the fingerprint must match. A model is fit with PARAMS only when
+    no artifact was ever published and `fit_missing` is True: a published
+    artifact that does not match raises FileNotFoundError rather than being
+    replaced.
+
+    `engine` ("numpy" or "xgboost", default ENGINE) picks a
+    tree_predictor.TreeEnsemble or an XGBClassifier. Either carries its
+    artifact fingerprint as `model.fingerprint` and its booster file as
+    `model.model_file`.
+    """
+    with perf.timer("model_load"):
+        engine = engine or ENGINE
+        meta = read_meta()
+        store = data_store.open_store(store_dir)
+        if is_fresh(meta, store.hash, params) if params is not None else is_servable(meta, store):
+            return _load_artifact(meta, engine)
+        if meta is not None or not fit_missing:
+            raise FileNotFoundError("no model artifact for the current training data; "
+                                    "run `python train.py`")
+        _, meta = train(store_dir, params or PARAMS)
+        return _load_artifact(meta, engine)
+
+
+def _load_artifact(meta, engine):
+    if engine == "xgboost":
+        mdl = _load_xgb(meta["model_file"])
+    else:
+        tree_file = meta.get("tree_file")
+        if not tree_file or not os.path.exists(os.path.join(MODEL_DIR, tree_file)):
+            meta = export_trees(_load_xgb(meta["model_file"]).get_booster(), meta)
+        mdl = tree_predictor.TreeEnsemble.load(os.path.join(MODEL_DIR, meta["tree_file"]))
+    mdl.fingerprint = meta["fingerprint"]
+    mdl.model_file = meta["model_file"]
+    return mdl, meta["feat_cols"]
+
+
+class ServingModel:
+    """The model behind the app and the API, swapped when a new artifact is published.
+
+    get() returns the current (model, feat_cols) pair. At most every
+    CHECK_SECONDS it stats the metadata file; when that changed (retrain.py,
+    train.py) it loads the artifact the metadata points to and replaces the
+    pair in one assignment. Requests already holding the old pair finish with
+    it; a failed load keeps the old model.
+    """
+
+    CHECK_SECONDS = 2.0
+
+    def __init__(self, engine=None, fit_missing=False):
+        self.engine = engine or ENGINE
+        self.current = load_model(fit_missing=fit_missing, engine=self.engine)
+        self.swaps = 0
+        self._stamp = self._meta_stamp()
+        self._checked = time.monotonic()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _meta_stamp():
+        try:
+            st = os.stat(META_PATH)
+            return st.st_mtime_ns, st.st_ino
+        except OSError:
+            return None
+
+    def get(self):
+        now = time.monotonic()
+        if now - self._checked >= self.CHECK_SECONDS and self._lock.acquire(blocking=False):
+            try:
+                self._checked = now
+                stamp = self._meta_stamp()
+                if stamp != self._stamp:
+                    self._stamp = stamp
+                    self._swap()
+            finally:
+                self._lock.release()
+        return self.current
+
+    def _swap(self):
+        meta = read_meta()
+        if meta is None or meta.get("fingerprint") == self.current[0].fingerprint:
+            return
+        try:
+            with perf.timer("model_swap"):
+                self.current = _load_artifact(meta, self.engine)
+            self.swaps += 1
+        except Exception as e:  # keep serving the previous model
+            print(f"model swap to {meta.get('model_file')} failed: {e}", file=sys.stderr)
+
+
+# ── INFERENCE ──
+def predict(model, X):
+    """Score rows of a float32 (n, n_features) array in one booster call.
+
+    Returns (proba, class index, score in %). Every inference path (form,
+    batch, API) goes through here.
+    """
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X[None, :]
+    with perf.timer("predict"):
+        if hasattr(model, "get_booster"):
+            proba = model.get_booster().inplace_predict(X)
+        else:
+            proba = model.predict_proba(X)
+    idx = proba.argmax(axis=1)
+    return proba, idx, proba[np.arange(len(idx)), idx] * 100
+
+
+def warm_explainer(model):
+    """Load the booster behind explain() in the background for a NumPy-engine model."""
+    if isinstance(model, tree_predictor.TreeEnsemble):
+        threading.Thread(target=_load_xgb, args=(model.model_file,), daemon=True).start()
+
+
+def explain(model, X, approx=False):
+    """Per-feature contributions from the booster's TreeSHAP, in one call.
+
+    Returns an (n, n_classes, n_features + 1) float32 array of log-odds
+    contributions; the last column is the bias and each row sums to the
+    class margin. `approx=True` uses the much cheaper Saabas attribution.
+    A NumPy-engine model is explained with its booster, loaded on first use;
+    a model with its own explain() (inference_server.RemoteModel) is asked.
+    """
+    if hasattr(model, "explain"):
+        return model.explain(X, approx)
+    import xgboost as xgb
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    if X.ndim == 1:
+        X = X[None, :]
+    if not hasattr(model, "get_booster"):
+        model = _load_xgb(model.model_file)
+    booster = model.get_booster()
+    with perf.timer("explain"):
+        dm = xgb.DMatrix(X, feature_names=booster.feature_names)
+        return booster.predict(dm, pred_contribs=True, approx_contribs=approx)
+
+
+def top_factors(contribs, feat_cols, res_idx, k=None):
+    """[(label, contribution)] toward class `res_idx` of one row, largest |contribution| first."""
+    row = contribs[res_idx, :len(feat_cols)]
+    order = np.argsort(-np.abs(row), kind="stable")[:k]
+    return [(FEATURE_LABELS.get(feat_cols[i], feat_cols[i]), float(row[i])) for i in order]
+
+
+# ── CLI ──
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA model artifact")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_train = sub.add_parser("train", help="fit and persist the model")
+    p_train.add_argument("--force", action="store_true", help="retrain even if the artifact is fresh")
+    p_train.add_argument("--store", default=STORE_DIR)
+    sub.add_parser("info", help="show the current artifact metadata")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "info":
+        meta = read_meta()
+        if meta is None:
+            print("No model artifact found.", file=sys.stderr)
+            return 1
+        print(json.dumps(meta, indent=2))
+        return 0
+
+    if not args.force and is_fresh(read_meta(), data_store.open_store(args.store).hash):
+        print("Model artifact is up to date.")
+        return 0
+    _, meta = train(args.store)
+    print(f"Saved {meta['model_file']} ({meta['train_seconds']:.2f}s fit)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
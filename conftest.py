@@ -0,0 +1 @@
+"""pytest: puts the repository root on sys.path so tests import the flat modules."""
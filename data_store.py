@@ -0,0 +1,281 @@
+"""Memory-mapped columnar store of the training records.
+
+Usage:
+    python data_store.py ingest [cardiovascular_risk_numeric.csv] [--rebuild]
+    python data_store.py append screening_2024.csv [screening_2025.parquet ...]
+    python data_store.py info
+
+The CSV is parsed once; every column is kept as a raw little-endian array in
+data/ next to a meta.json (row count, dtypes, feature order, sources):
+
+    X.f4             float32 (rows, n_features), feature order of feat_cols,
+                     smoking_status already encoded 0/1/2
+    y.i1             int8 risk_category
+    patient_id.i8    int64 Patient_ID
+    risk_score.f4    float32 heart_disease_risk_score (NaN when absent)
+
+Readers np.memmap the arrays: opening costs one small JSON read whatever the
+size, and X feeds xgboost or the NumPy engine without a copy. `append` adds
+the rows of new CSV / Parquet files (same columns as the training CSV). The
+store's hash chains the SHA-256 of every source file, so a store made of the
+original CSV alone has exactly the CSV's hash and model fingerprints carry
+over.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+BASE_DIR  = os.path.dirname(os.path.abspath(__file__))
+STORE_DIR = os.path.join(BASE_DIR, "data")
+CSV_PATH  = os.path.join(BASE_DIR, "cardiovascular_risk_numeric.csv")
+FORMAT    = 1
+
+# file name, dtype, source column of the one-dimensional arrays
+COLUMNS = {
+    "y":          ("y.i1", np.int8, "risk_category"),
+    "patient_id": ("patient_id.i8", np.int64, "Patient_ID"),
+    "risk_score": ("risk_score.f4", np.float32, "heart_disease_risk_score"),
+}
+X_FILE = "X.f4"
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def chain(prev, sha):
+    """Hash of a store after adding a source with digest `sha`."""
+    return sha if prev is None else hashlib.sha256(f"{prev}:{sha}".encode()).hexdigest()
+
+
+class Store:
+    """Read-only view of the store; arrays are memory-mapped on first access."""
+
+    def __init__(self, path=STORE_DIR):
+        self.path = path
+        with open(os.path.join(path, "meta.json")) as f:
+            self.meta = json.load(f)
+        if self.meta.get("format") != FORMAT:
+            raise ValueError(f"unsupported store format {self.meta.get('format')}")
+        self.rows = self.meta["rows"]
+        self.feat_cols = self.meta["feat_cols"]
+        self.hash = self.meta["hash"]
+        self._arrays = {}
+
+    def _map(self, name, dtype, shape):
+        if name not in self._arrays:
+            if self.rows == 0:
+                self._arrays[name] = np.empty(shape, dtype=dtype)
+            else:
+                self._arrays[name] = np.memmap(os.path.join(self.path, name), dtype=dtype,
+                                               mode="r", shape=shape)
+        return self._arrays[name]
+
+    @property
+    def X(self):
+        return self._map(X_FILE, np.float32, (self.rows, len(self.feat_cols)))
+
+    def column(self, name):
+        """One feature column (strided view of X) or one of COLUMNS."""
+        if name in COLUMNS:
+            file, dtype, _ = COLUMNS[name]
+            return self._map(file, dtype, (self.rows,))
+        return self.X[:, self.feat_cols.index(name)]
+
+    @property
+    def y(self):
+        return self.column("y")
+
+    def rows_at(self, hash):
+        """Row count of the store when its hash was `hash` (None if it never was)."""
+        prev, rows = None, 0
+        for src in self.meta["sources"]:
+            prev, rows = chain(prev, src["sha256"]), rows + src["rows"]
+            if prev == hash:
+                return rows
+        return None
+
+
+def exists(path=STORE_DIR):
+    return os.path.exists(os.path.join(path, "meta.json"))
+
+
+def _write_meta(path, meta):
+    tmp = os.path.join(path, "meta.json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(meta, f, indent=2)
+    os.replace(tmp, os.path.join(path, "meta.json"))
+
+
+def create(path, feat_cols):
+    """Start an empty store with the given feature order."""
+    os.makedirs(path, exist_ok=True)
+    for file in [X_FILE] + [c[0] for c in COLUMNS.values()]:
+        open(os.path.join(path, file), "wb").close()
+    meta = {"format": FORMAT, "feat_cols": list(feat_cols), "rows": 0, "hash": None, "sources": []}
+    _write_meta(path, meta)
+    return Store(path)
+
+
+def _labels(values, n_classes, offset=0):
+    """risk_category -> int8 codes; ValueError naming the rows that are
+    missing or not one of 0..n_classes-1."""
+    import features
+    import pandas as pd
+
+    raw = pd.Series(values)
+    y = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64)
+    bad = np.flatnonzero(~np.isin(y, np.arange(n_classes)))
+    if len(bad):
+        msgs = [f"row {i + offset}: risk_category is missing" if pd.isna(raw.iloc[i]) else
+                f"row {i + offset}: risk_category="
+                f"{f'{y[i]:g}' if not np.isnan(y[i]) else repr(raw.iloc[i])} not in 0..{n_classes - 1}"
+                for i in bad[:features.MAX_ERRORS]]
+        more = f" (and {len(bad) - features.MAX_ERRORS} more)" if len(bad) > features.MAX_ERRORS else ""
+        raise ValueError("; ".join(msgs) + more)
+    return y.astype(np.int8)
+
+
+def _patient_ids(values, next_id):
+    """int64 Patient_ID, missing ones numbered one per row after the largest
+    id seen so far; returns the ids and the next free id."""
+    import pandas as pd
+
+    ids = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, copy=True)
+    missing = np.isnan(ids)
+    next_id = max(next_id, int(np.nanmax(ids, initial=0)) + 1)
+    ids[missing] = np.arange(next_id, next_id + missing.sum())
+    return ids.astype(np.int64), next_id + int(missing.sum())
+
+
+def append(src, path=STORE_DIR, chunksize=None, allow_duplicate=False):
+    """Add every row of a CSV / Parquet file; return the number of rows added.
+
+    Each chunk is checked (features.prepare, risk_category in 0..2) before
+    any of its bytes are written; a missing Patient_ID gets the next free id.
+    Arrays are written first and meta.json last, so an interrupted or
+    rejected append leaves the store at its previous row count (the tail is
+    overwritten by the next append).
+    """
+    import batch_score
+    import cardio_model
+    import features
+
+    store = Store(path)
+    meta = store.meta
+    sha = file_sha256(src)
+    if not allow_duplicate and any(s["sha256"] == sha for s in meta["sources"]):
+        raise ValueError(f"{src} is already in the store")
+
+    files = {name: open(os.path.join(path, name), "r+b") for name in
+             [X_FILE] + [c[0] for c in COLUMNS.values()]}
+    added = 0
+    next_id = int(store.column("patient_id").max()) + 1 if store.rows else 1
+    try:
+        # drop anything past the committed rows (an interrupted append)
+        files[X_FILE].truncate(store.rows * len(store.feat_cols) * 4)
+        for file, dtype, _ in COLUMNS.values():
+            files[file].truncate(store.rows * np.dtype(dtype).itemsize)
+        for f in files.values():
+            f.seek(0, os.SEEK_END)
+
+        for chunk in batch_score.iter_chunks(src, chunksize or batch_score.CHUNKSIZE):
+            if "risk_category" not in chunk.columns:
+                raise ValueError("missing column: risk_category")
+            n = len(chunk)
+            X = features.prepare(chunk, store.feat_cols, offset=added)
+            values = {"risk_category": _labels(chunk["risk_category"], len(cardio_model.RISK_LABELS), added)}
+            values["Patient_ID"], next_id = _patient_ids(
+                chunk["Patient_ID"] if "Patient_ID" in chunk.columns else np.full(n, np.nan), next_id)
+            files[X_FILE].write(X.tobytes())
+            for file, dtype, col in COLUMNS.values():
+                if col in values:
+                    column = values[col]
+                elif col in chunk.columns:
+                    column = chunk[col].to_numpy(dtype=dtype)
+                else:
+                    column = np.full(n, np.nan, dtype=dtype)
+                files[file].write(column.tobytes())
+            added += n
+        for f in files.values():
+            f.flush()
+            os.fsync(f.fileno())
+    finally:
+        for f in files.values():
+            f.close()
+
+    meta["rows"] += added
+    meta["hash"] = chain(meta["hash"], sha)
+    meta["sources"].append({"file": os.path.basename(str(src)), "sha256": sha, "rows": added,
+                            "added_at": datetime.now(timezone.utc).isoformat(timespec="seconds")})
+    _write_meta(path, meta)
+    return added
+
+
+def ingest(csv_path=CSV_PATH, path=STORE_DIR, rebuild=False):
+    """Build the store from the training CSV (once) and return it."""
+    if exists(path) and not rebuild:
+        return Store(path)
+    import pandas as pd
+    other = {col for _, _, col in COLUMNS.values()}
+    feat_cols = [c for c in pd.read_csv(csv_path, nrows=0).columns if c not in other]
+    create(path, feat_cols)
+    append(csv_path, path)
+    return Store(path)
+
+
+def open_store(path=STORE_DIR, csv_path=CSV_PATH):
+    """The store at `path`, ingested from the training CSV on first use."""
+    return Store(path) if exists(path) else ingest(csv_path, path)
+
+
+# ── CLI ──
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA training data store")
+    parser.add_argument("--store", default=STORE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_ingest = sub.add_parser("ingest", help="build the store from the training CSV")
+    p_ingest.add_argument("csv", nargs="?", default=CSV_PATH)
+    p_ingest.add_argument("--rebuild", action="store_true", help="replace an existing store")
+    p_append = sub.add_parser("append", help="add new records (CSV or Parquet)")
+    p_append.add_argument("files", nargs="+")
+    sub.add_parser("info", help="show the store metadata")
+    args = parser.parse_args(argv)
+
+    if args.cmd == "ingest":
+        if exists(args.store) and not args.rebuild:
+            print(f"{args.store} already exists (use --rebuild to replace it)", file=sys.stderr)
+            return 1
+        store = ingest(args.csv, args.store, rebuild=True)
+        print(f"Ingested {store.rows} rows into {args.store}")
+    elif args.cmd == "append":
+        open_store(args.store)
+        for src in args.files:
+            try:
+                n = append(src, args.store)
+            except ValueError as e:
+                print(f"{src}: {e}", file=sys.stderr)
+                return 1
+            print(f"Appended {n} rows from {src}")
+    elif not exists(args.store):
+        print("No data store; run `python data_store.py ingest`.", file=sys.stderr)
+        return 1
+    else:
+        print(json.dumps(Store(args.store).meta, indent=2))
+        return 0
+    store = Store(args.store)
+    print(f"{store.rows} rows, hash {store.hash[:12]}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,430 @@
+"""Drift of the scored patients against the population the model was trained on.
+
+Usage:
+    python drift.py reference [--rebuild]    # refresh data/drift_reference.npz
+    python drift.py report [--hours 24]      # PSI / KS of the exported windows
+
+The reference is computed once per training set (the store rows behind the
+published model's data_sha256): for every feature, the percentiles P0..P100
+of the training values (distinct values only, so a code or an integer score
+keeps one bin per value) and the training count in each bin, plus the mix of
+the training labels. A value is binned by counting the edges at or below it:
+bin 0 is below the training minimum, the last inner bin above its maximum,
+and missing values have a column of their own.
+
+Monitor.observe() bins the scored rows against those edges (one comparison
+with the padded edge matrix, then one add) into a (n_features, bins) count
+array and counts the predicted classes: the submit path does a fixed amount of
+work per feature and the memory does not grow with the traffic. From the
+counts:
+
+    psi    population stability index over the reference deciles (bins
+           grouped by the training share below them) and the missing values
+    ks     largest gap between the training and scored CDFs at the edges:
+           the Kolmogorov-Smirnov distance at percentile resolution
+    p50    medians interpolated inside the bins, on both sides
+
+Every CARDIO_DRIFT_EXPORT_S seconds (300) and at exit, each process appends
+the counts scored since its previous export to data/drift.jsonl
+(CARDIO_DRIFT_LOG to move it). Lines add up, so `report` and the ?admin=drift
+page combine all the app and API processes over any period.
+"""
+import argparse
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+
+import cardio_model
+import data_store
+
+REF_PATH     = os.path.join(data_store.STORE_DIR, "drift_reference.npz")
+LOG_PATH     = os.environ.get("CARDIO_DRIFT_LOG", os.path.join(data_store.STORE_DIR, "drift.jsonl"))
+EXPORT_SECS  = float(os.environ.get("CARDIO_DRIFT_EXPORT_S", "300"))
+FORMAT       = 1
+PERCENTILES  = np.linspace(0, 100, 101)
+EDGE_SAMPLE  = 1_000_000   # rows used for the percentiles of a larger store
+CHUNK_ROWS   = 1_000_000
+SMALL_BATCH  = 64          # up to this many rows, bins by comparison with the edge matrix
+PSI_BINS     = 10
+PSI_FLOOR    = 1e-4        # share given to an empty bin in the PSI
+PSI_MODERATE = 0.1
+PSI_MAJOR    = 0.25
+MIN_ROWS     = 50          # below this, no status
+N_CLASSES    = len(cardio_model.RISK_LABELS)
+
+log = logging.getLogger("cardio.drift")
+
+
+# ── REFERENCE ──
+class Reference:
+    """Bin edges and training counts of every feature, and the training class mix.
+
+    edges   (n_features, max_edges) float32, padded with +inf
+    counts  (n_features, max_edges + 2) int64: bins 0..n_edges, missing last
+    """
+
+    def __init__(self, feat_cols, hash, rows, edges, n_edges, counts, classes):
+        self.feat_cols = list(feat_cols)
+        self.hash = hash
+        self.rows = rows
+        self.edges = edges
+        self.n_edges = n_edges
+        self.counts = counts
+        self.classes = classes
+
+    @property
+    def width(self):
+        return self.counts.shape[1]
+
+    def bins(self, X):
+        """(n, n_features) bin of every value: the number of edges <= value,
+        missing values in the last column."""
+        X = np.asarray(X, dtype=np.float32)
+        if len(X) <= SMALL_BATCH:
+            idx = (X[:, :, None] >= self.edges).sum(axis=2)
+        else:
+            idx = np.stack([np.searchsorted(e, X[:, j], "right") for j, e in enumerate(self.edges)], axis=1)
+        return np.where(np.isnan(X), self.width - 1, idx)
+
+    def count(self, X):
+        """Bin counts of the rows X, shaped like self.counts."""
+        flat = self.bins(X) + np.arange(len(self.feat_cols)) * self.width
+        return np.bincount(flat.ravel(), minlength=self.counts.size).reshape(self.counts.shape)
+
+
+def _edges(values):
+    """Distinct P0..P100 of the non-missing values; the maximum is nudged up
+    so that it falls in the last inner bin."""
+    values = values[~np.isnan(values)]
+    if not len(values):
+        return np.empty(0, dtype=np.float32)
+    q = np.unique(np.percentile(values, PERCENTILES, method="lower").astype(np.float32))
+    q[-1] = np.nextafter(q[-1], np.float32(np.inf))
+    return q
+
+
+def compute_reference(store, rows=None, hash=None):
+    """Reference of the first `rows` rows of the store (default: all of them)."""
+    rows = store.rows if rows is None else rows
+    X = store.X[:rows]
+    if rows > EDGE_SAMPLE:
+        X = X[np.sort(np.random.default_rng(0).choice(rows, EDGE_SAMPLE, replace=False))]
+    per_feature = [_edges(np.asarray(X[:, j])) for j in range(len(store.feat_cols))]
+    n_edges = np.array([len(e) for e in per_feature])
+    edges = np.full((len(per_feature), n_edges.max(initial=0)), np.inf, dtype=np.float32)
+    for j, e in enumerate(per_feature):
+        edges[j, :len(e)] = e
+    ref = Reference(store.feat_cols, hash or store.hash, rows, edges, n_edges,
+                    np.zeros((len(per_feature), edges.shape[1] + 2), dtype=np.int64),
+                    np.zeros(N_CLASSES, dtype=np.int64))
+    for i in range(0, rows, CHUNK_ROWS):
+        j = min(i + CHUNK_ROWS, rows)
+        ref.counts += ref.count(store.X[i:j])
+        ref.classes += np.bincount(np.asarray(store.y[i:j], dtype=np.int64), minlength=N_CLASSES)
+    return ref
+
+
+def save_reference(ref, path=REF_PATH):
+    meta = {"format": FORMAT, "feat_cols": ref.feat_cols, "hash": ref.hash, "rows": ref.rows}
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, meta=np.array(json.dumps(meta)), edges=ref.edges, n_edges=ref.n_edges,
+                 counts=ref.counts, classes=ref.classes)
+    os.replace(tmp, path)
+
+
+def load_reference(path=REF_PATH):
+    """The saved reference, or None if missing or from another format."""
+    try:
+        with np.load(path) as f:
+            meta = json.loads(str(f["meta"]))
+            if meta.get("format") != FORMAT:
+                return None
+            return Reference(meta["feat_cols"], meta["hash"], meta["rows"], f["edges"], f["n_edges"],
+                             f["counts"], f["classes"])
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+def reference(data_sha=None, store_dir=cardio_model.STORE_DIR, path=None, rebuild=False):
+    """Reference of the training rows of `data_sha` (default: the published
+    model's), from the saved file when it matches."""
+    if data_sha is None:
+        data_sha = (cardio_model.read_meta() or {}).get("data_sha256")
+    path = path or os.path.join(store_dir, os.path.basename(REF_PATH))
+    ref = None if rebuild else load_reference(path)
+    if ref is not None and data_sha is not None and ref.hash == data_sha:
+        return ref
+    store = data_store.open_store(store_dir)
+    rows = store.rows_at(data_sha) if data_sha else None
+    if rows is None:
+        log.warning("training data %s not found in %s: reference from the whole store",
+                    (data_sha or "?")[:12], store_dir)
+        rows, data_sha = store.rows, store.hash
+    ref = compute_reference(store, rows, data_sha)
+    try:
+        save_reference(ref, path)
+    except OSError:
+        log.exception("could not save the drift reference to %s", path)
+    return ref
+
+
+# ── MONITOR ──
+class Monitor:
+    """Streaming bin counts of the scored rows and their predicted classes.
+
+    observe() is thread-safe. With `export_every` > 0, a background thread
+    appends the counts of each period to `log_path`.
+    """
+
+    def __init__(self, ref, log_path=LOG_PATH, export_every=EXPORT_SECS, fingerprint=None):
+        self.ref = ref
+        self.fingerprint = fingerprint
+        self.log_path = log_path
+        self.started = time.time()
+        self.rows = 0
+        self.counts = np.zeros_like(ref.counts)
+        self.classes = np.zeros(N_CLASSES, dtype=np.int64)
+        self.exported = None     # time of the last export
+        self._exported = (self.counts.copy(), self.classes.copy(), 0)
+        self._lock = threading.Lock()
+        self._export_lock = threading.Lock()
+        self._stop = threading.Event()
+        if export_every > 0 and log_path:
+            threading.Thread(target=self._export_loop, args=(export_every,), name="cardio-drift",
+                             daemon=True).start()
+            atexit.register(self.close)
+
+    def observe(self, X, classes):
+        """Count the scored rows X (n, n_features) and their predicted classes."""
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(self.ref.feat_cols))
+        flat = (self.ref.bins(X) + np.arange(X.shape[1]) * self.ref.width).ravel()
+        classes = np.asarray(classes, dtype=np.int64).ravel()
+        with self._lock:
+            np.add.at(self.counts.reshape(-1), flat, 1)
+            np.add.at(self.classes, classes, 1)
+            self.rows += len(X)
+
+    def snapshot(self):
+        """(counts, classes, rows) since the monitor started."""
+        with self._lock:
+            return self.counts.copy(), self.classes.copy(), self.rows
+
+    def report(self):
+        return compare(self.ref, *self.snapshot()[:2])
+
+    # ── EXPORT ──
+    def export(self):
+        """Append the counts since the previous export to the log; False if
+        nothing was scored in between."""
+        with self._export_lock:
+            counts, classes, rows = self.snapshot()
+            prev_counts, prev_classes, prev_rows = self._exported
+            if rows == prev_rows:
+                return False
+            delta = counts - prev_counts
+            line = {
+                "time":      round(time.time(), 3),
+                "pid":       os.getpid(),
+                "reference": self.ref.hash,
+                "rows":      rows - prev_rows,
+                "classes":   (classes - prev_classes).tolist(),
+                # per feature, the non-empty bins then their counts
+                "counts":    {c: np.flatnonzero(d).tolist() + d[d > 0].tolist()
+                              for c, d in zip(self.ref.feat_cols, delta)},
+            }
+            with open(self.log_path, "a") as f:
+                f.write(json.dumps(line, separators=(",", ":")) + "\n")
+            self._exported = (counts, classes, rows)
+            self.exported = line["time"]
+            return True
+
+    def _export_loop(self, every):
+        while not self._stop.wait(every):
+            self._safe_export()
+
+    def _safe_export(self):
+        try:
+            self.export()
+        except OSError:
+            log.exception("could not write the drift counts to %s", self.log_path)
+
+    def close(self):
+        if not self._stop.is_set():
+            self._stop.set()
+            self._safe_export()
+
+
+_monitor = None
+_monitor_lock = threading.Lock()
+
+
+def monitor(model):
+    """The monitor of this process for the training data of `model`; a newly
+    published model gets a new one (the previous one exports and stops)."""
+    global _monitor
+    fp = getattr(model, "fingerprint", None)
+    current = _monitor
+    if current is not None and current.fingerprint == fp:
+        return current
+    with _monitor_lock:
+        if _monitor is None or _monitor.fingerprint != fp:
+            meta = cardio_model.read_meta() or {}
+            ref = reference(meta.get("data_sha256"))
+            if _monitor is not None:
+                _monitor.close()
+            _monitor = Monitor(ref, fingerprint=fp)
+        return _monitor
+
+
+def current():
+    """The monitor of this process, or None before the first prediction."""
+    return _monitor
+
+
+# ── STATISTICS ──
+def _quantile(edges, counts, q):
+    """Quantile q of the values binned by `edges`, linear inside a bin."""
+    n = counts.sum()
+    if not n or not len(edges):
+        return float("nan")
+    cum = np.cumsum(counts) / n
+    b = int(np.searchsorted(cum, q, "left"))
+    if b == 0 or b >= len(edges):   # outside the training range: its bound
+        return float(edges[min(b, len(edges) - 1)])
+    below = cum[b - 1]
+    frac = (q - below) / (cum[b] - below)
+    return float(edges[b - 1] + frac * (edges[b] - edges[b - 1]))
+
+
+def _psi(expected, actual):
+    p = np.maximum(expected / max(expected.sum(), 1), PSI_FLOOR)
+    q = np.maximum(actual / max(actual.sum(), 1), PSI_FLOOR)
+    return float(((q - p) * np.log(q / p)).sum())
+
+
+def status(psi, rows):
+    if rows < MIN_ROWS:
+        return "insuffisant"
+    return "forte" if psi >= PSI_MAJOR else "moderee" if psi >= PSI_MODERATE else "stable"
+
+
+def compare(ref, counts, classes):
+    """Drift of the scored counts against the reference.
+
+    {"rows", "features": [{feature, n, missing_pct, out_of_range_pct,
+    ref_p50, p50, psi, ks, status}], "classes": [{classe, ref_pct, pct}],
+    "class_psi"}
+    """
+    rows = int(classes.sum())
+    out = []
+    for j, feature in enumerate(ref.feat_cols):
+        k = ref.n_edges[j]
+        edges = ref.edges[j, :k]
+        r, c = ref.counts[j, :k + 1], counts[j, :k + 1]
+        r_missing, c_missing = ref.counts[j, -1], counts[j, -1]
+        n = int(c.sum() + c_missing)
+        # deciles of the reference: every bin goes to the decile of the training share below it
+        below = np.concatenate([[0], np.cumsum(r)[:-1]]) / max(r.sum(), 1)
+        decile = np.minimum((below * PSI_BINS).astype(np.int64), PSI_BINS - 1)
+        psi = _psi(np.append(np.bincount(decile, r, PSI_BINS), r_missing),
+                   np.append(np.bincount(decile, c, PSI_BINS), c_missing))
+        ks = float(np.abs(np.cumsum(r) / max(r.sum(), 1) - np.cumsum(c) / max(c.sum(), 1)).max()) \
+            if c.sum() else 0.0
+        out.append({
+            "feature":          feature,
+            "n":                n,
+            "missing_pct":      round(float(c_missing / n * 100), 1) if n else 0.0,
+            "out_of_range_pct": round(float((c[0] + c[k]) / n * 100), 1) if n else 0.0,
+            "ref_p50":          round(_quantile(edges, r, 0.5), 2),
+            "p50":              round(_quantile(edges, c, 0.5), 2),
+            "psi":              round(psi, 4) if n else 0.0,
+            "ks":               round(ks, 4),
+            "status":           status(psi, n),
+        })
+    ref_share = ref.classes / max(ref.classes.sum(), 1) * 100
+    share = classes / max(rows, 1) * 100
+    return {
+        "rows":      rows,
+        "features":  out,
+        "classes":   [{"classe": label, "ref_pct": round(float(a), 1), "pct": round(float(b), 1)}
+                      for label, a, b in zip(cardio_model.RISK_LABELS, ref_share, share)],
+        "class_psi": round(_psi(ref.classes, classes), 4) if rows else 0.0,
+    }
+
+
+def read_log(ref, since=0.0, path=LOG_PATH):
+    """(counts, classes) of the exported lines of this reference since `since`
+    (epoch seconds), all processes together."""
+    counts = np.zeros_like(ref.counts)
+    classes = np.zeros(N_CLASSES, dtype=np.int64)
+    try:
+        f = open(path)
+    except FileNotFoundError:
+        return counts, classes
+    col = {c: j for j, c in enumerate(ref.feat_cols)}
+    with f:
+        for text in f:
+            try:
+                line = json.loads(text)
+            except ValueError:   # a line cut short by a crash
+                continue
+            if line.get("reference") != ref.hash or line["time"] < since:
+                continue
+            classes += line["classes"]
+            for feature, pairs in line["counts"].items():
+                half = len(pairs) // 2
+                counts[col[feature], pairs[:half]] += pairs[half:]
+    return counts, classes
+
+
+# ── CLI ──
+def _print(report):
+    print(f"{'feature':<34}{'n':>8}{'missing %':>10}{'out %':>7}{'ref p50':>9}{'p50':>9}"
+          f"{'PSI':>8}{'KS':>7}  status")
+    for r in report["features"]:
+        print(f"{r['feature']:<34}{r['n']:>8}{r['missing_pct']:>10.1f}{r['out_of_range_pct']:>7.1f}"
+              f"{r['ref_p50']:>9.1f}{r['p50']:>9.1f}{r['psi']:>8.3f}{r['ks']:>7.3f}  {r['status']}")
+    print(f"\npredicted classes (PSI {report['class_psi']:.3f}, "
+          f"{status(report['class_psi'], report['rows'])})")
+    for r in report["classes"]:
+        print(f"  {r['classe']:<16}{r['ref_pct']:>6.1f}% -> {r['pct']:5.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA drift monitoring")
+    parser.add_argument("--store", default=cardio_model.STORE_DIR)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_ref = sub.add_parser("reference", help="compute the reference of the published model")
+    p_ref.add_argument("--rebuild", action="store_true", help="ignore the saved reference")
+    p_rep = sub.add_parser("report", help="drift of the exported counts")
+    p_rep.add_argument("--hours", type=float, default=24.0)
+    p_rep.add_argument("--log", default=LOG_PATH)
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    ref = reference(store_dir=args.store, rebuild=getattr(args, "rebuild", False))
+    if args.cmd == "reference":
+        size = ref.edges.nbytes + ref.counts.nbytes
+        print(f"reference {ref.hash[:12]}: {ref.rows} rows, {len(ref.feat_cols)} features, "
+              f"{ref.n_edges.min()}-{ref.n_edges.max()} edges, {size / 1024:.1f} KiB "
+              f"({(time.perf_counter() - t0) * 1000:.1f} ms)")
+        return 0
+    report = compare(ref, *read_log(ref, time.time() - args.hours * 3600, args.log))
+    if not report["rows"]:
+        print(f"No exported predictions for reference {ref.hash[:12]} in the last {args.hours:g} h",
+              file=sys.stderr)
+        return 1
+    print(f"{report['rows']} predictions in the last {args.hours:g} h vs {ref.rows} training rows\n")
+    _print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,223 @@
+"""Named patient inputs -> validated float32 feature rows in feat_cols order.
+
+Shared by the form (app.py), the batch tools (batch_score.py, data_store.py)
+and the API. Every path builds the matrix column by column and checks all
+values against RANGES at once:
+
+    X = features.prepare(df, feat_cols)                  # DataFrame / dict of columns
+    X = features.from_records(patients, feat_cols)       # list of dicts (API, form)
+
+bmi can be given directly or as height_cm + weight_kg; smoking_status as
+Never/Former/Current or its 0/1/2 code. NaN in a column is kept and scored
+as a missing value by the trees; anything outside RANGES raises ValueError
+naming the first offending rows.
+"""
+import numpy as np
+
+import cardio_model
+
+HEIGHT, WEIGHT = "height_cm", "weight_kg"
+
+# accepted (min, max) of every input: wide clinical limits, not the training ranges
+RANGES = {
+    'age':                              (10, 110),
+    'bmi':                              (10.0, 70.0),
+    'systolic_bp':                      (70, 250),
+    'diastolic_bp':                     (40, 150),
+    'cholesterol_mg_dl':                (80, 500),
+    'resting_heart_rate':               (30, 200),
+    'smoking_status':                   (0, 2),
+    'daily_steps':                      (0, 50000),
+    'stress_level':                     (1, 10),
+    'physical_activity_hours_per_week': (0.0, 80.0),
+    'sleep_hours':                      (0.0, 16.0),
+    'family_history_heart_disease':     (0, 1),
+    'diet_quality_score':               (1, 10),
+    'alcohol_units_per_week':           (0.0, 100.0),
+    HEIGHT:                             (100, 250),
+    WEIGHT:                             (20, 300),
+}
+CODES = ('smoking_status', 'family_history_heart_disease')  # must be whole numbers
+MAX_ERRORS = 5
+
+
+def _named(col):
+    return f"bmi (or {HEIGHT} and {WEIGHT})" if col == 'bmi' else col
+
+
+def bmi(height_cm, weight_kg):
+    h = np.asarray(height_cm, dtype=np.float32) / 100
+    return np.asarray(weight_kg, dtype=np.float32) / (h * h)
+
+
+def _numeric(values, name, label):
+    try:
+        return np.asarray(values, dtype=np.float32)
+    except (TypeError, ValueError):
+        for i, v in enumerate(values):
+            try:
+                float(v)
+            except (TypeError, ValueError):
+                raise ValueError(f"{label} {i}: {name} must be a number, got {v!r}") from None
+        raise
+
+
+def _is_number(v):
+    try:
+        float(v)
+        return True
+    except (TypeError, ValueError):
+        return False
+
+
+def _smoking(values, label, offset=0):
+    """Names or 0/1/2 codes (numbers or numeric strings) -> float32 codes."""
+    if hasattr(values, "factorize") and values.dtype.kind not in "biuf":
+        codes, uniques = values.factorize()  # pandas: hash once, map the few distinct values
+        try:
+            mapped = _smoking(np.asarray(uniques, dtype=object), label)
+        except ValueError:  # again row by row, to name the offending rows
+            return _smoking(np.asarray(values, dtype=object), label, offset)
+        return np.append(mapped, np.float32(np.nan))[codes]
+    arr = np.asarray(values)
+    if arr.dtype.kind not in "OUS":
+        return arr.astype(np.float32)
+    out = np.full(len(arr), np.nan, dtype=np.float32)
+    known = np.zeros(len(arr), dtype=bool)
+    for name, code in cardio_model.SMOKING_MAP.items():
+        hit = arr == name
+        out[hit] = code
+        known |= hit
+    if not known.all():
+        try:  # numeric codes mixed with names
+            out[~known] = arr[~known].astype(np.float32)
+        except (TypeError, ValueError):
+            bad = [i for i in np.flatnonzero(~known) if not _is_number(arr[i])]
+            msgs = [f"{label} {i + offset}: unknown smoking_status {arr[i]!r}" for i in bad[:MAX_ERRORS]]
+            more = f" (and {len(bad) - MAX_ERRORS} more)" if len(bad) > MAX_ERRORS else ""
+            raise ValueError("; ".join(msgs) + more) from None
+    return out
+
+
+_bounds = {}
+
+
+def _limits(names):
+    key = tuple(names)
+    if key not in _bounds:
+        _bounds[key] = (np.array([RANGES[c][0] for c in names], dtype=np.float32),
+                        np.array([RANGES[c][1] for c in names], dtype=np.float32),
+                        [j for j, c in enumerate(names) if c in CODES])
+    return _bounds[key]
+
+
+def validate(X, names, label="row", offset=0):
+    """Raise ValueError if any non-NaN value of X (columns `names`) is outside RANGES.
+
+    Rows are numbered from `offset` in the message.
+    """
+    lo, hi, codes = _limits(names)
+    bad = (X < lo) | (X > hi)  # NaN compares False: missing values pass
+    if codes:
+        bad[:, codes] |= X[:, codes] % 1 > 0
+    if not bad.any():
+        return
+    where = np.argwhere(bad)
+    msgs = []
+    for i, j in where[:MAX_ERRORS]:
+        c, v = names[j], X[i, j]
+        rule = "is not a valid code" if c in CODES and v != round(v) else \
+            f"outside [{RANGES[c][0]}, {RANGES[c][1]}]"
+        msgs.append(f"{label} {i + offset}: {c}={v:g} {rule}")
+    more = f" (and {len(where) - MAX_ERRORS} more)" if len(where) > MAX_ERRORS else ""
+    raise ValueError("; ".join(msgs) + more)
+
+
+def prepare(columns, feat_cols, label="row", offset=0):
+    """float32 (n, len(feat_cols)) matrix from a DataFrame or a dict of equal-length columns.
+
+    A bmi column that is absent or NaN is computed from height_cm and
+    weight_kg when those columns are there.
+    """
+    has_hw = HEIGHT in columns and WEIGHT in columns
+    missing = [c for c in feat_cols if c not in columns and not (c == 'bmi' and has_hw)]
+    if missing:
+        raise ValueError(f"missing columns: {', '.join(map(_named, missing))}")
+    n = len(columns[next(c for c in (*feat_cols, HEIGHT) if c in columns)])
+    X = np.empty((n, len(feat_cols)), dtype=np.float32)
+    for j, c in enumerate(feat_cols):
+        if c not in columns:
+            X[:, j] = np.nan
+        elif c == 'smoking_status':
+            X[:, j] = _smoking(columns[c], label, offset)
+        else:
+            X[:, j] = _numeric(columns[c], c, label)
+    if 'bmi' in feat_cols and has_hw:
+        j = feat_cols.index('bmi')
+        gap = np.isnan(X[:, j])
+        if gap.any():
+            hw = np.stack([_numeric(columns[HEIGHT], HEIGHT, label),
+                           _numeric(columns[WEIGHT], WEIGHT, label)], axis=1)
+            hw[~gap] = np.nan  # only check the rows that need them
+            validate(hw, [HEIGHT, WEIGHT], label, offset)
+            X[gap, j] = bmi(hw[gap, 0], hw[gap, 1])
+    validate(X, feat_cols, label, offset)
+    return X
+
+
+def _not_number(rows, names, label):
+    for i, row in rows:
+        for c, v in zip(names, row):
+            try:
+                if v is None:
+                    raise TypeError
+                float(v)
+            except (TypeError, ValueError):
+                return ValueError(f"{label} {i}: {c} must be a number, got {v!r}")
+    return None
+
+
+def from_records(records, feat_cols, label="patient"):
+    """Same as prepare() for a list of dicts, one per patient (bmi or height_cm + weight_kg).
+
+    One Python pass builds the rows, then a single float32 conversion and
+    the bulk range check.
+    """
+    smoking = feat_cols.index('smoking_status') if 'smoking_status' in feat_cols else -1
+    rows, hw = [], {}
+    for i, r in enumerate(records):
+        if not isinstance(r, dict):
+            raise ValueError(f"{label} {i}: expected an object")
+        try:
+            row = [r[c] for c in feat_cols]
+        except KeyError:
+            missing = [c for c in feat_cols if c not in r]
+            if missing != ['bmi'] or HEIGHT not in r or WEIGHT not in r:
+                raise ValueError(f"{label} {i}: missing {', '.join(map(_named, missing))}") from None
+            row = [r.get(c, np.nan) for c in feat_cols]
+            hw[i] = (r[HEIGHT], r[WEIGHT])
+            if None in hw[i]:
+                raise _not_number([(i, hw[i])], [HEIGHT, WEIGHT], label)
+        if None in row:  # numpy would take null as NaN
+            raise _not_number([(i, row)], feat_cols, label)
+        if smoking >= 0 and isinstance(row[smoking], str):
+            if row[smoking] in cardio_model.SMOKING_MAP:
+                row[smoking] = cardio_model.SMOKING_MAP[row[smoking]]
+            elif not _is_number(row[smoking]):  # "1" is a code, as in prepare()
+                raise ValueError(f"{label} {i}: unknown smoking_status {row[smoking]!r}")
+        rows.append(row)
+    try:
+        X = np.array(rows, dtype=np.float32).reshape(len(rows), len(feat_cols))
+    except (TypeError, ValueError):
+        raise _not_number(enumerate(rows), feat_cols, label) from None
+    if hw:
+        H = np.full((len(rows), 2), np.nan, dtype=np.float32)
+        idx = list(hw)
+        try:
+            H[idx] = list(hw.values())
+        except (TypeError, ValueError):
+            raise _not_number(hw.items(), [HEIGHT, WEIGHT], label) from None
+        validate(H, [HEIGHT, WEIGHT], label)
+        X[idx, feat_cols.index('bmi')] = bmi(H[idx, 0], H[idx, 1])
+    validate(X, feat_cols, label)
+    return X
@@ -0,0 +1,61 @@
+"""Bundle the theme fonts locally so pages load without fonts.googleapis.com.
+
+Usage (once, on a machine with internet access):
+    python fetch_fonts.py
+
+Downloads the latin woff2 files of the theme fonts into static/fonts/ and
+writes static/fonts.css, which app.py links instead of the Google Fonts
+stylesheet when present. Commit both.
+"""
+import os
+import re
+import sys
+import urllib.request
+
+FAMILIES = ("family=Cormorant+Garamond:ital,wght@0,400;0,600;0,700;1,400"
+            "&family=Montserrat:wght@300;400;500;600;700"
+            "&family=Playfair+Display:wght@700;900&display=swap")
+CSS_URL    = f"https://fonts.googleapis.com/css2?{FAMILIES}"
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/120.0 Safari/537.36"
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+FONT_DIR   = os.path.join(STATIC_DIR, "fonts")
+
+
+def _get(url):
+    req = urllib.request.Request(url, headers={"User-Agent": USER_AGENT})
+    with urllib.request.urlopen(req, timeout=30) as resp:
+        return resp.read()
+
+
+def main():
+    css = _get(CSS_URL).decode()
+    # keep only the latin subset: the UI text is French without exotic glyphs
+    blocks = re.findall(r"/\* latin \*/\s*(@font-face \{.*?\})", css, re.S)
+    if not blocks:
+        print("No latin @font-face blocks found in the Google Fonts response.", file=sys.stderr)
+        return 1
+
+    os.makedirs(FONT_DIR, exist_ok=True)
+    local = {}
+    out = []
+    for block in blocks:
+        url = re.search(r"url\((.*?)\)", block).group(1)
+        if url not in local:
+            family = re.search(r"font-family: '(.*?)'", block).group(1).replace(" ", "")
+            style = re.search(r"font-style: (\w+)", block).group(1)
+            name = f"{family}-{style}-{len(local)}.woff2"
+            with open(os.path.join(FONT_DIR, name), "wb") as f:
+                f.write(_get(url))
+            local[url] = name
+        out.append(block.replace(url, f"fonts/{local[url]}"))
+
+    with open(os.path.join(STATIC_DIR, "fonts.css"), "w") as f:
+        f.write("/* Theme fonts bundled by fetch_fonts.py (SIL Open Font License) */\n\n")
+        f.write("\n\n".join(out) + "\n")
+    print(f"Wrote {len(local)} font files and static/fonts.css")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,239 @@
+"""Persistent history of the scored bilans (SQLite, WAL).
+
+Usage:
+    python history.py info
+    python history.py show DUPONT [Jean]
+    python history.py show --dossier 2024-00123
+
+Every submit in the app is queued to a background writer thread that commits
+whatever has accumulated in one transaction, so the request never waits on
+disk. Patients are found by normalised name (upper case, no accents) or by
+file number; both are indexed together with the date, so a patient's history
+is one index range scan whatever the size of the table.
+
+The database is data/history.db (CARDIO_HISTORY_DB to move it).
+"""
+import argparse
+import atexit
+import contextlib
+import json
+import logging
+import os
+import queue
+import sqlite3
+import sys
+import threading
+import time
+import unicodedata
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+DB_PATH  = os.environ.get("CARDIO_HISTORY_DB", os.path.join(BASE_DIR, "data", "history.db"))
+BATCH    = 512   # max rows per transaction
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bilans (
+    id          INTEGER PRIMARY KEY,
+    patient_key TEXT NOT NULL,
+    dossier     TEXT,
+    nom         TEXT,
+    prenom      TEXT,
+    age         INTEGER,
+    created_at  REAL NOT NULL,
+    risk_class  INTEGER NOT NULL,
+    risk_score  REAL NOT NULL,
+    p_low       REAL,
+    p_medium    REAL,
+    p_high      REAL,
+    model       TEXT,
+    inputs      TEXT
+);
+CREATE INDEX IF NOT EXISTS bilans_patient ON bilans (patient_key, created_at);
+CREATE INDEX IF NOT EXISTS bilans_dossier ON bilans (dossier, created_at) WHERE dossier IS NOT NULL;
+CREATE INDEX IF NOT EXISTS bilans_date    ON bilans (created_at);
+"""
+INSERT = """INSERT INTO bilans (patient_key, dossier, nom, prenom, age, created_at, risk_class,
+    risk_score, p_low, p_medium, p_high, model, inputs) VALUES (?,?,?,?,?,?,?,?,?,?,?,?,?)"""
+FIELDS = "created_at, risk_class, risk_score, p_low, p_medium, p_high, age, dossier, nom, prenom"
+
+log = logging.getLogger("cardio.history")
+_STOP = object()
+
+
+def normalise(text):
+    """Upper case, accents stripped, single spaces: 'Benaissa  Zohra' -> 'BENAISSA ZOHRA'."""
+    text = unicodedata.normalize("NFKD", text or "")
+    return " ".join("".join(c for c in text if not unicodedata.combining(c)).upper().split())
+
+
+def patient_key(nom, prenom=""):
+    """Lookup key of a patient: 'NOM|PRENOM' (empty for an anonymous bilan)."""
+    nom, prenom = normalise(nom), normalise(prenom)
+    return f"{nom}|{prenom}" if nom or prenom else ""
+
+
+def connect(path=DB_PATH):
+    db = sqlite3.connect(path, timeout=30, check_same_thread=False)
+    db.execute("PRAGMA journal_mode=WAL")
+    db.execute("PRAGMA synchronous=NORMAL")  # durable at checkpoints; WAL keeps it consistent
+    db.row_factory = sqlite3.Row
+    return db
+
+
+class History:
+    """Append-only bilan store with a background writer.
+
+    record() only queues the row; the writer thread drains the queue and
+    commits everything pending in one transaction (group commit), so a burst
+    of submits costs one fsync. Reads use a connection per thread.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with contextlib.closing(connect(path)) as db:
+            db.executescript(SCHEMA)
+        self.written = self.failed = 0
+        self._queue = queue.Queue()
+        self._local = threading.local()
+        self._writer = threading.Thread(target=self._write_loop, name="cardio-history", daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ── WRITES ──
+    def record(self, patient, proba, res_idx, risk_score, when=None, model=None, dossier=None):
+        """Queue one scored bilan (the app's patient dict) and return immediately."""
+        when = when or datetime.now(timezone.utc)
+        inputs = {k: v for k, v in patient.items() if k not in ("nom", "prenom")}
+        self._queue.put((
+            patient_key(patient.get("nom"), patient.get("prenom")), (dossier or "").strip() or None,
+            patient.get("nom"), patient.get("prenom"), patient.get("age"), when.timestamp(),
+            int(res_idx), float(risk_score), *map(float, proba), model, json.dumps(inputs),
+        ))
+
+    def _write_loop(self):
+        db = connect(self.path)
+        stop = False
+        while not stop:
+            rows = [self._queue.get()]
+            while len(rows) < BATCH:
+                try:
+                    rows.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            if _STOP in rows:
+                stop = True
+            batch = [r for r in rows if r is not _STOP]
+            try:
+                if batch:
+                    with db:
+                        db.executemany(INSERT, batch)
+                    self.written += len(batch)
+            except sqlite3.Error:
+                self.failed += len(batch)
+                log.exception("could not write %d bilans", len(batch))
+            for _ in rows:
+                self._queue.task_done()
+        db.close()
+
+    def flush(self):
+        """Block until every queued bilan is committed."""
+        self._queue.join()
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+
+    # ── READS ──
+    def _db(self):
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = self._local.db = connect(self.path)
+        return db
+
+    def lookup(self, nom="", prenom="", dossier=None, limit=200):
+        """The patient's last `limit` bilans, oldest first, as dicts.
+
+        By file number when given, otherwise by normalised name.
+        """
+        dossier = (dossier or "").strip()
+        if dossier:
+            where, arg = "dossier = ?", dossier
+        else:
+            where, arg = "patient_key = ?", patient_key(nom, prenom)
+            if not arg:
+                return []
+        rows = self._db().execute(
+            f"SELECT {FIELDS} FROM bilans WHERE {where} ORDER BY created_at DESC LIMIT ?",
+            (arg, limit)).fetchall()
+        return [dict(r) for r in reversed(rows)]
+
+    def search(self, text, limit=20):
+        """Patients whose file number is `text` or whose name starts with `text`.
+
+        [{nom, prenom, dossier, n, last}] with `last` the date of the latest bilan,
+        one entry per patient.
+        """
+        prefix = normalise(text)
+        if not prefix:
+            return []
+        # the exact file number first, then the name prefix as an index range:
+        # "DUP" -> ["DUP", "DUP\uffff"); a patient found both ways is listed once
+        rows = self._db().execute(
+            "SELECT patient_key, nom, prenom, dossier, COUNT(*) AS n, MAX(created_at) AS last "
+            "FROM bilans WHERE dossier = ? GROUP BY dossier", (text.strip(),)).fetchall()
+        rows += self._db().execute(
+            "SELECT patient_key, nom, prenom, dossier, COUNT(*) AS n, MAX(created_at) AS last "
+            "FROM bilans WHERE patient_key >= ? AND patient_key < ? GROUP BY patient_key LIMIT ?",
+            (prefix, prefix + "\uffff", limit)).fetchall()
+        out, seen = [], set()
+        for r in rows:
+            if r["patient_key"] not in seen:
+                seen.add(r["patient_key"])
+                out.append({k: r[k] for k in r.keys() if k != "patient_key"})
+        return out
+
+    def count(self):
+        return self._db().execute("SELECT COUNT(*) FROM bilans").fetchone()[0]
+
+
+# ── CLI ──
+def _fmt(ts):
+    """Algiers time, as the app shows it."""
+    return datetime.fromtimestamp(ts, ZoneInfo("Africa/Algiers")).strftime("%d/%m/%Y %H:%M")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA bilan history")
+    parser.add_argument("--db", default=DB_PATH)
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("info", help="row count and date range")
+    p_show = sub.add_parser("show", help="bilans of one patient")
+    p_show.add_argument("nom", nargs="?", default="")
+    p_show.add_argument("prenom", nargs="?", default="")
+    p_show.add_argument("--dossier")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.db):
+        print(f"No history at {args.db}", file=sys.stderr)
+        return 1
+    hist = History(args.db)
+    if args.cmd == "info":
+        first, last = hist._db().execute("SELECT MIN(created_at), MAX(created_at) FROM bilans").fetchone()
+        n = hist.count()
+        print(f"{n} bilans" + (f", {_fmt(first)} -> {_fmt(last)}" if n else ""))
+        return 0
+    t0 = time.perf_counter()
+    rows = hist.lookup(args.nom, args.prenom, args.dossier)
+    ms = (time.perf_counter() - t0) * 1000
+    for r in rows:
+        print(f"{_fmt(r['created_at'])}  {r['risk_score']:5.1f}%  class {r['risk_class']}  "
+              f"P(eleve) {r['p_high'] * 100:5.1f}%  age {r['age']}")
+    print(f"{len(rows)} bilans ({ms:.2f} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
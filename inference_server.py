@@ -0,0 +1,313 @@
+"""Local inference worker pool shared by several UI processes (Unix socket).
+
+Usage:
+    python inference_server.py [--socket /tmp/cardio-inference.sock] [--workers 4]
+                               [--window-ms 0] [--max-batch 4096]
+    CARDIO_INFERENCE_SOCKET=/tmp/cardio-inference.sock streamlit run app.py --server.port 8501
+    CARDIO_INFERENCE_SOCKET=/tmp/cardio-inference.sock streamlit run app.py --server.port 8502
+
+The server loads the model once, then forks --workers processes that all
+accept on the same listening socket: the NumPy export is shared copy-on-write
+and the Streamlit servers (and the API) hold no model at all. In a worker,
+predict requests arriving within --window-ms of the first pending one are
+stacked into a single predict call; with the default 0, that is every
+request read while the previous call ran, which batches under load without
+delaying a lone request. Workers follow newly published artifacts through
+cardio_model.ServingModel; a worker that dies is replaced.
+
+Frames, little-endian:
+    request   op:1s  n:u4  payload   n x n_features float32 for "P" (predict),
+                                     "E" (TreeSHAP) and "A" (approximate
+                                     contributions); empty for "I" (info)
+    response  status:1s  fingerprint:32s  size:u4  payload (size bytes)
+                                     "P": n x 3 float32 probabilities
+                                     "E"/"A": n x 3 x (n_features + 1) float32
+                                     "I": JSON, "!": error message
+"""
+import argparse
+import asyncio
+import json
+import os
+import queue
+import signal
+import socket
+import struct
+import sys
+import threading
+import time
+
+import numpy as np
+
+import batching
+import cardio_model
+
+SOCKET      = os.environ.get("CARDIO_INFERENCE_SOCKET")  # set: the app scores through the pool
+SOCKET_PATH = SOCKET or "/tmp/cardio-inference.sock"
+WINDOW_MS   = 0.0
+MAX_BATCH   = 4096      # rows; a fuller batch is scored at once
+MAX_ROWS    = 100_000   # per request
+N_CLASSES   = len(cardio_model.RISK_LABELS)
+
+REQUEST  = struct.Struct("<cI")
+RESPONSE = struct.Struct("<c32sI")
+
+
+# ── WORKER ──
+class _Batcher:
+    """Stacks the predict requests of one worker's event loop."""
+
+    def __init__(self, serving, window, max_batch):
+        self.serving = serving
+        self.window = window
+        self.max_batch = max_batch
+        self.pending = []
+        self.rows = 0
+        self.timer = None
+        self.stats = batching.BatchStats()
+
+    def submit(self, X):
+        fut = asyncio.get_running_loop().create_future()
+        self.pending.append((X, fut, time.perf_counter()))
+        self.rows += len(X)
+        if self.rows >= self.max_batch:
+            self.flush()
+        elif self.timer is None:
+            # window 0: the requests read in this event-loop iteration
+            self.timer = asyncio.get_running_loop().call_later(self.window, self.flush)
+        return fut
+
+    def flush(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        batch, self.pending, self.rows = self.pending, [], 0
+        if not batch:
+            return
+        model, _ = self.serving.get()
+        t0 = time.perf_counter()
+        try:
+            proba, _, _ = cardio_model.predict(model, np.concatenate([x for x, _, _ in batch]))
+        except Exception as e:
+            for _, fut, _ in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        self.stats.record(len(proba), [t0 - t for _, _, t in batch])
+        start = 0
+        for x, fut, _ in batch:
+            if not fut.done():  # the client may be gone
+                fut.set_result((proba[start:start + len(x)], model.fingerprint))
+            start += len(x)
+
+
+async def _handle(reader, writer, batcher, n_features):
+    try:
+        while True:
+            op, n = REQUEST.unpack(await reader.readexactly(REQUEST.size))
+            if n > MAX_ROWS:  # refuse before reading the payload, then hang up
+                msg = f"at most {MAX_ROWS} rows per request".encode()
+                writer.write(RESPONSE.pack(b"!", b"", len(msg)) + msg)
+                await writer.drain()
+                break
+            payload = await reader.readexactly(n * n_features * 4) if op != b"I" else b""
+            try:
+                X = np.frombuffer(payload, dtype=np.float32).reshape(n, n_features)
+                if op == b"P":
+                    out, fp = await batcher.submit(X)
+                elif op in (b"E", b"A"):
+                    model, _ = batcher.serving.get()
+                    out, fp = cardio_model.explain(model, X, approx=op == b"A"), model.fingerprint
+                elif op == b"I":
+                    model, feat_cols = batcher.serving.get()
+                    out = json.dumps({"feat_cols": feat_cols, "model_file": model.model_file,
+                                      "pid": os.getpid(), **batcher.stats.snapshot()}).encode()
+                    fp = model.fingerprint
+                else:
+                    raise ValueError(f"unknown op {op!r}")
+                status = op
+                if op != b"I":
+                    out = np.ascontiguousarray(out, dtype=np.float32).tobytes()
+            except Exception as e:
+                status, fp, out = b"!", "", str(e).encode()
+            writer.write(RESPONSE.pack(status, bytes.fromhex(fp), len(out)) + out)
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _run_worker(sock, serving, window, max_batch):
+    batcher = _Batcher(serving, window, max_batch)
+    model, feat_cols = serving.get()
+    n_features = len(feat_cols)
+    cardio_model.warm_explainer(model)  # xgboost for "E" requests, off the request path
+    server = await asyncio.start_unix_server(
+        lambda r, w: _handle(r, w, batcher, n_features), sock=sock)
+    async with server:
+        await server.serve_forever()
+
+
+def serve(path=SOCKET_PATH, workers=4, window_ms=WINDOW_MS, max_batch=MAX_BATCH, engine=None):
+    """Bind `path`, fork the workers and keep them alive until SIGTERM / SIGINT."""
+    serving = cardio_model.ServingModel(engine=engine)  # loaded once, shared by the forks
+    if os.path.exists(path):
+        os.unlink(path)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(path)
+    sock.listen(512)
+    sock.setblocking(False)
+
+    children = set()
+    stopping = False
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                asyncio.run(_run_worker(sock, serving, window_ms / 1000, max_batch))
+            finally:
+                os._exit(1)
+        children.add(pid)
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for _ in range(workers):
+        spawn()
+    print(f"Serving {serving.current[0].fingerprint[:12]} on {path} with {workers} workers "
+          f"(window {window_ms} ms)", flush=True)
+    try:
+        while children:
+            pid, status = os.wait()
+            children.discard(pid)
+            if not stopping:
+                print(f"worker {pid} exited ({status}), restarting", file=sys.stderr, flush=True)
+                time.sleep(0.5)
+                spawn()
+    finally:
+        sock.close()
+        if os.path.exists(path):
+            os.unlink(path)
+
+
+# ── CLIENT ──
+class RemoteModel:
+    """Stands in for a model in cardio_model.predict / explain; the pool scores.
+
+    Thread-safe: each call borrows a connection from a small pool (one per
+    concurrent caller) and a broken connection is retried once on a new one.
+    get() mirrors cardio_model.ServingModel: at most every CHECK_SECONDS it
+    asks the pool for its current model, so that fingerprint, feat_cols and
+    model_file follow a swap before the caller looks anything up by them
+    (prediction_cache.PredictionCache, drift.monitor).
+    """
+
+    CHECK_SECONDS = cardio_model.ServingModel.CHECK_SECONDS
+
+    def __init__(self, path=SOCKET_PATH, timeout=30):
+        self.path = path
+        self.timeout = timeout
+        self.fingerprint = None
+        self._conns = queue.LifoQueue()
+        self._lock = threading.Lock()
+        try:
+            self._refresh()
+        except OSError as e:
+            raise ConnectionError(f"inference server not reachable at {path}: {e}") from None
+
+    def _connect(self):
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        conn.settimeout(self.timeout)
+        conn.connect(self.path)
+        return conn
+
+    @staticmethod
+    def _recv(conn, n):
+        buf = bytearray(n)
+        view, got = memoryview(buf), 0
+        while got < n:
+            k = conn.recv_into(view[got:])
+            if not k:
+                raise ConnectionError("inference server closed the connection")
+            got += k
+        return buf
+
+    def _call(self, op, X=None):
+        payload = b"" if X is None else np.ascontiguousarray(X, dtype=np.float32).tobytes()
+        frame = REQUEST.pack(op, 0 if X is None else len(X)) + payload
+        for attempt in (0, 1):
+            try:
+                conn = self._conns.get_nowait()
+            except queue.Empty:
+                conn = self._connect()
+            try:
+                conn.sendall(frame)
+                status, fp, size = RESPONSE.unpack(self._recv(conn, RESPONSE.size))
+                body = self._recv(conn, size)
+            except OSError:
+                conn.close()
+                if attempt:
+                    raise
+                continue
+            self._conns.put(conn)
+            if status == b"!":
+                raise ValueError(body.decode())
+            self.fingerprint = fp.hex()
+            return body
+
+    def info(self):
+        return json.loads(bytes(self._call(b"I")))
+
+    def _refresh(self):
+        info = self.info()  # also sets self.fingerprint
+        self.feat_cols = info["feat_cols"]
+        self.model_file = info["model_file"]
+        self._checked = time.monotonic()
+
+    def _rows(self, op, X, shape):
+        X = np.asarray(X, dtype=np.float32).reshape(-1, len(self.feat_cols))
+        parts = [np.frombuffer(self._call(op, X[i:i + MAX_ROWS]), dtype=np.float32).reshape(-1, *shape)
+                 for i in range(0, max(len(X), 1), MAX_ROWS)]
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def predict_proba(self, X):
+        return self._rows(b"P", X, (N_CLASSES,))
+
+    def explain(self, X, approx=False):
+        return self._rows(b"A" if approx else b"E", X, (N_CLASSES, len(self.feat_cols) + 1))
+
+    def get(self):
+        if time.monotonic() - self._checked >= self.CHECK_SECONDS and self._lock.acquire(blocking=False):
+            try:
+                self._refresh()
+            except (OSError, ValueError) as e:  # keep the last known model; calls will report it
+                self._checked = time.monotonic()
+                print(f"inference server info failed: {e}", file=sys.stderr)
+            finally:
+                self._lock.release()
+        return self, self.feat_cols
+
+
+# ── CLI ──
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA inference worker pool")
+    parser.add_argument("--socket", default=SOCKET_PATH)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--window-ms", type=float, default=WINDOW_MS)
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH)
+    parser.add_argument("--engine", choices=["numpy", "xgboost"])
+    args = parser.parse_args(argv)
+    serve(args.socket, args.workers, args.window_ms, args.max_batch, args.engine)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""Per-stage timings for the submit, model-load and API paths.
+
+Enabled with CARDIO_PERF=1; otherwise every timer is a shared no-op.
+
+    with perf.timer("predict"):
+        ...
+
+    with perf.request("submit"):      # total + stage breakdown of one request
+        ...
+
+Each stage feeds a histogram: cumulative Prometheus buckets since the process
+started, plus the last WINDOW samples for rolling percentiles. Requests slower
+than CARDIO_PERF_SLOW_MS are logged to "cardio.perf" with their stages.
+"""
+import bisect
+import collections
+import contextvars
+import logging
+import os
+import threading
+import time
+
+ENABLED = os.environ.get("CARDIO_PERF") == "1"
+SLOW_MS = float(os.environ.get("CARDIO_PERF_SLOW_MS", "500"))
+WINDOW  = 1024
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+log = logging.getLogger("cardio.perf")
+
+
+class Histogram:
+    """Thread-safe latency histogram (seconds)."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)  # last one is +Inf
+        self.total = 0.0
+        self.recent = collections.deque(maxlen=WINDOW)
+        self._lock = threading.Lock()
+
+    def observe(self, secs):
+        with self._lock:
+            self.counts[bisect.bisect_left(BUCKETS, secs)] += 1
+            self.total += secs
+            self.recent.append(secs)
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.counts), self.total, sorted(self.recent)
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+_gauges = {}   # family: {labels: snapshot function}
+_stages = contextvars.ContextVar("cardio_perf_stages", default=None)
+
+
+def histogram(stage):
+    h = _histograms.get(stage)
+    if h is None:
+        with _histograms_lock:
+            h = _histograms.setdefault(stage, Histogram())
+    return h
+
+
+class _Timer:
+    __slots__ = ("stage", "t0")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        secs = time.perf_counter() - self.t0
+        histogram(self.stage).observe(secs)
+        stages = _stages.get()
+        if stages is not None:
+            stages.append((self.stage, secs))
+
+
+class _Request(_Timer):
+    """Times a whole request and collects the stages run inside it."""
+
+    __slots__ = ("token", "stages")
+
+    def __enter__(self):
+        self.stages = []
+        self.token = _stages.set(self.stages)
+        return super().__enter__()
+
+    def __exit__(self, *exc):
+        secs = time.perf_counter() - self.t0
+        _stages.reset(self.token)
+        histogram(self.stage).observe(secs)
+        if secs * 1000 >= SLOW_MS:
+            log.warning("slow %s: %.1f ms (%s)", self.stage, secs * 1000,
+                        ", ".join(f"{s} {t * 1000:.1f} ms" for s, t in self.stages))
+
+    start = __enter__
+
+    def finish(self):
+        self.__exit__(None, None, None)
+
+
+class _Null:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+    def start(self):
+        return self
+
+    def finish(self):
+        pass
+
+
+_NULL = _Null()
+
+
+def timer(stage):
+    """Context manager timing one stage."""
+    return _Timer(stage) if ENABLED else _NULL
+
+
+def request(name):
+    """Context manager (or .start() / .finish()) timing a request and its stages."""
+    return _Request(name) if ENABLED else _NULL
+
+
+# ── EXPORT ──
+def _percentile(values, q):
+    return values[min(len(values) - 1, int(q * len(values)))] if values else 0.0
+
+
+def summary():
+    """[{stage, count, mean_ms, p50_ms, p95_ms, p99_ms}] over the rolling window."""
+    rows = []
+    for stage in sorted(_histograms):
+        counts, total, recent = _histograms[stage].snapshot()
+        n = sum(counts)
+        rows.append({
+            "stage":   stage,
+            "count":   n,
+            "mean_ms": round(total / n * 1000, 3) if n else 0.0,
+            "p50_ms":  round(_percentile(recent, 0.50) * 1000, 3),
+            "p95_ms":  round(_percentile(recent, 0.95) * 1000, 3),
+            "p99_ms":  round(_percentile(recent, 0.99) * 1000, 3),
+        })
+    return rows
+
+
+def prometheus_text():
+    """All histograms in the Prometheus text exposition format."""
+    lines = ["# HELP cardio_stage_seconds Time spent per stage.",
+             "# TYPE cardio_stage_seconds histogram"]
+    for stage in sorted(_histograms):
+        counts, total, _ = _histograms[stage].snapshot()
+        cumulative = 0
+        for le, c in zip([*map(str, BUCKETS), "+Inf"], counts):
+            cumulative += c
+            lines.append(f'cardio_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+        lines.append(f'cardio_stage_seconds_sum{{stage="{stage}"}} {total:.6f}')
+        lines.append(f'cardio_stage_seconds_count{{stage="{stage}"}} {cumulative}')
+    for family, sources in sorted(_gauges.items()):
+        lines.append(f"# TYPE cardio_{family} gauge")
+        for labels, snapshot in sorted(sources.items()):
+            for stat, value in snapshot().items():
+                lines.append(f'cardio_{family}{{{labels},stat="{stat}"}} {value}')
+    return "\n".join(lines) + "\n"
+
+
+def register_gauges(family, labels, snapshot):
+    """Export the numbers of snapshot() -> {stat: value} as cardio_<family>{labels,stat}
+    (exported whether or not CARDIO_PERF is set)."""
+    _gauges.setdefault(family, {})[labels] = snapshot
+
+
+def reset():
+    with _histograms_lock:
+        _histograms.clear()
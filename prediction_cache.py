@@ -0,0 +1,83 @@
+"""Bounded LRU cache of predictions keyed on the feature vector.
+
+Hit / miss / eviction / invalidation counters of every cache of the process
+are listed by summary() (page ?admin=perf) and exported by
+perf.prometheus_text() as cardio_prediction_cache{cache, stat}.
+"""
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+import cardio_model
+import perf
+
+_caches = {}
+
+
+class PredictionCache:
+    """Thread-safe LRU of (proba, class, score) per float32 feature row.
+
+    Entries belong to one model fingerprint; scoring with a different model
+    clears the cache. Misses are scored by `scorer` (cardio_model.predict, or
+    a batching.MicroBatcher's predict to share calls with other sessions).
+    """
+
+    def __init__(self, maxsize=4096, scorer=cardio_model.predict, name="predict"):
+        self.maxsize = maxsize
+        self.scorer = scorer
+        self.fingerprint = None
+        self.hits = self.misses = self.evictions = self.invalidations = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        _caches[name] = self
+        perf.register_gauges("prediction_cache", f'cache="{name}"', self.stats)
+
+    def predict(self, model, x):
+        """Same result as cardio_model.predict for a single row."""
+        x = np.ascontiguousarray(x, dtype=np.float32).reshape(1, -1)
+        key = x.tobytes()
+        fp = getattr(model, "fingerprint", None)
+        with self._lock:
+            if fp != self.fingerprint:
+                if self._data:
+                    self.invalidations += 1
+                self._data.clear()
+                self.fingerprint = fp
+            hit = self._data.get(key)
+            if hit is not None:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return hit
+            self.misses += 1
+
+        result = self.scorer(model, x)
+        for arr in result:
+            arr.setflags(write=False)  # shared between sessions
+        with self._lock:
+            if fp == self.fingerprint:
+                self._data[key] = result
+                if len(self._data) > self.maxsize:
+                    self._data.popitem(last=False)
+                    self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"size": len(self._data), "maxsize": self.maxsize, "hits": self.hits,
+                    "misses": self.misses, "evictions": self.evictions,
+                    "invalidations": self.invalidations}
+
+
+def summary():
+    """[{cache, size, maxsize, hits, misses, hit_rate, evictions, invalidations}] of this process."""
+    rows = []
+    for name, cache in sorted(_caches.items()):
+        s = cache.stats()
+        looked = s["hits"] + s["misses"]
+        rows.append({"cache": name, **s, "hit_rate": round(s["hits"] / looked, 3) if looked else 0.0})
+    return rows
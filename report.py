@@ -0,0 +1,450 @@
+"""PDF bilan rendering for CardioIA.
+
+The layout only depends on the risk class, so it is drawn once per class into
+a template (bands, section headers, labels, recommendations, signature box,
+footer). A report copies the template page streams and draws the
+patient-specific cells into the recorded slots.
+"""
+import threading
+import unicodedata
+
+from fpdf import FPDF
+
+import perf
+
+CATS_PDF = ["RISQUE FAIBLE", "RISQUE MODERE", "RISQUE ELEVE"]
+CAT_LBL  = ["Risque Faible", "Risque Modere", "Risque Eleve"]
+BAR_COL  = [(40, 199, 111), (220, 155, 0), (200, 16, 46)]
+BAR_W    = 118
+
+N_FACTORS  = 5                # contributions listed in the bilan
+CONTRIB_X  = 122              # centre line of the contribution bars
+CONTRIB_W  = 50               # half-width: the largest |contribution| fills it
+CONTRIB_NEG = (140, 155, 175)
+
+RISK_FILLS   = {0: (215, 248, 228), 1: (255, 248, 215), 2: (255, 228, 234)}
+RISK_BORDERS = {0: (40, 199, 111),  1: (220, 155, 0),   2: (200, 16, 46)}
+RISK_TEXTS   = {0: (15, 110, 60),   1: (130, 85, 0),    2: (155, 10, 28)}
+
+RECO_TITRE = {
+    0: "Profil Cardiovasculaire Optimal",
+    1: "Vigilance Cardiovasculaire Requise",
+    2: "ALERTE - Risque Cardiaque Eleve Detecte"
+}
+RECO_CORPS = {
+    0: ("L'analyse par intelligence artificielle indique un profil cardiaque favorable. "
+        "Poursuivez vos bonnes habitudes de vie : alimentation equilibree riche en fibres, "
+        "activite physique reguliere d'au moins 30 min/jour, hydratation suffisante. "
+        "Bilan cardiaque annuel conseille. Surveillez tension et cholesterol periodiquement."),
+    1: ("Des facteurs de risque moderes ont ete detectes. Reduisez la consommation de sel, "
+        "de graisses saturees et de sucres raffines. Augmentez progressivement l'activite physique "
+        "(150 min/semaine). Limitez l'alcool et gerez le stress chronique. "
+        "Bilan sanguin complet recommande. Consultez votre medecin dans les 4 semaines."),
+    2: ("L'IA identifie un risque cardiovasculaire significativement eleve. "
+        "Consultation urgente chez un cardiologue imperative. Evitez tout effort physique intense. "
+        "Arretez le tabac immediatement, eliminez l'alcool, regime pauvre en sel et graisses. "
+        "Surveillance tensionnelle quotidienne obligatoire. En cas de douleur thoracique, "
+        "essoufflement ou palpitations, contactez les urgences sans delai.")
+}
+
+
+# --- HELPER: strip accents for PDF ---
+def safe(text):
+    """Convert any string to latin-1 safe ASCII for FPDF."""
+    text = str(text)
+    text = unicodedata.normalize('NFKD', text)
+    return text.encode('latin-1', 'ignore').decode('latin-1')
+
+
+class ReportPDF(FPDF):
+    """FPDF with a fixed font table and slots for patient-specific cells."""
+
+    recording = False  # True while a Template draws the static layout
+    page_offset = 0    # pages before this document in a merged bulk print
+
+    def __init__(self):
+        super().__init__()
+        self.set_auto_page_break(auto=True, margin=18)
+        self.alias_nb_pages()
+        # register fonts in a fixed order: template streams refer to them by index
+        for style in ('', 'B', 'I'):
+            self.set_font("Arial", style, 10)
+        self.rgb = (0, 0, 0)
+        self.slots = []
+
+    def set_text_color(self, r, g=-1, b=-1):
+        self.rgb = (r, g, b)
+        super().set_text_color(r, g, b)
+
+    def slot(self, key, w, h, align='', ln=0):
+        """Reserve a text cell filled in per report."""
+        self.slots.append(("T", self.page, key, self.x, self.y, w, h, align,
+                           self.font_family, self.font_style, self.font_size_pt, self.rgb))
+        self.cell(w, h, '', ln=ln)
+
+    def bar_slot(self, key, x, y, h, rgb):
+        """Reserve a probability bar of up to BAR_W mm."""
+        self.slots.append(("B", self.page, key, x, y, h, rgb))
+
+    def contrib_slot(self, key, x, y, h, rgb):
+        """Reserve a signed contribution bar around the centre line `x`."""
+        self.slots.append(("C", self.page, key, x, y, h, rgb))
+
+    def footer(self):
+        if not self.recording:
+            return  # reports get the footer from the template stream
+        self.set_y(-18)
+        self.set_fill_color(11, 31, 58)
+        self.rect(0, self.get_y()-1, 210, 22, 'F')
+        self.set_fill_color(184, 151, 42)
+        self.rect(0, self.get_y()-1, 210, 0.8, 'F')
+        self.set_font("Arial", '', 7.5)
+        self.set_text_color(100, 140, 180)
+        self.set_y(self.get_y() + 3)
+        self.cell(95, 6, "  CardioIA Pro  |  Laboratoire de Cardiologie  |  Algerie", align='L')
+        self.slot("page", 95, 6, align='R')
+
+
+# ── LAYOUT ──
+def _section_hdr(pdf, label, keep=0):
+    # start a new page rather than leave the header bar alone at the bottom
+    if pdf.get_y() + 11 + keep > pdf.page_break_trigger:
+        pdf.add_page()
+    pdf.set_fill_color(11, 31, 58)
+    pdf.set_draw_color(46, 109, 164)
+    pdf.set_line_width(0.5)
+    y = pdf.get_y()
+    pdf.rect(10, y, 190, 10, 'FD')
+    pdf.set_font("Arial", 'B', 10)
+    pdf.set_text_color(255, 255, 255)
+    pdf.set_x(15)
+    pdf.cell(185, 10, f"  {label}", ln=True)
+    pdf.ln(1)
+
+
+def _data_row(pdf, l1, k1, l2="", k2="", shade=False):
+    y = pdf.get_y()
+    if shade:
+        pdf.set_fill_color(232, 241, 252)
+    else:
+        pdf.set_fill_color(244, 248, 254)
+    pdf.set_draw_color(210, 222, 238)
+    pdf.set_line_width(0.15)
+    pdf.rect(10, y, 190, 9, 'FD')
+    pdf.set_font("Arial", '', 8.5)
+    pdf.set_text_color(80, 100, 130)
+    pdf.set_x(14)
+    pdf.cell(42, 9, l1)
+    pdf.set_font("Arial", 'B', 8.5)
+    pdf.set_text_color(11, 31, 58)
+    pdf.slot(k1, 48, 9)
+    if l2:
+        pdf.set_font("Arial", '', 8.5)
+        pdf.set_text_color(80, 100, 130)
+        pdf.cell(42, 9, l2)
+        pdf.set_font("Arial", 'B', 8.5)
+        pdf.set_text_color(11, 31, 58)
+        pdf.slot(k2, 48, 9)
+    pdf.ln(9)
+
+
+def _layout(pdf, res_idx):
+    """Draw the static part of the bilan for one risk class."""
+    pdf.add_page()
+
+    # ── TOP BAND ──
+    pdf.set_fill_color(11, 31, 58)
+    pdf.rect(0, 0, 210, 50, 'F')
+    pdf.set_fill_color(46, 109, 164)
+    pdf.rect(0, 50, 210, 3.5, 'F')
+    pdf.set_fill_color(184, 151, 42)
+    pdf.rect(0, 53.5, 210, 0.8, 'F')
+
+    pdf.set_y(8)
+    pdf.set_font("Arial", 'B', 23)
+    pdf.set_text_color(255, 255, 255)
+    pdf.cell(210, 11, "CARDIO IA PRO", align='C', ln=True)
+
+    pdf.set_font("Arial", 'I', 8.5)
+    pdf.set_text_color(140, 180, 220)
+    pdf.cell(210, 7, "RAPPORT MEDICAL DE DIAGNOSTIC CARDIAQUE PAR INTELLIGENCE ARTIFICIELLE", align='C', ln=True)
+
+    pdf.set_font("Arial", '', 7.5)
+    pdf.set_text_color(100, 140, 175)
+    pdf.slot("lab_line", 210, 6, align='C', ln=True)
+
+    pdf.set_font("Arial", '', 7)
+    pdf.set_text_color(80, 115, 155)
+    pdf.slot("ref_line", 180, 6, align='R', ln=True)
+
+    pdf.set_y(60)
+
+    # ── S1 — PATIENT ──
+    _section_hdr(pdf, "I.   INFORMATIONS DU PATIENT")
+    _data_row(pdf, "Nom", "nom", "Prenom", "prenom")
+    _data_row(pdf, "Age", "age", "Heredite Cardiaque", "family", shade=True)
+    pdf.ln(5)
+
+    # ── S2 — CLINIQUE ──
+    _section_hdr(pdf, "II.  DONNEES CLINIQUES")
+    _data_row(pdf, "Tension Arterielle", "bp", "Cholesterol", "chol")
+    _data_row(pdf, "Pouls", "pulse", "Tabagisme", "smoke", shade=True)
+    _data_row(pdf, "Taille / Poids", "size", "IMC", "bmi")
+    pdf.ln(5)
+
+    # ── S3 — MODE DE VIE ──
+    _section_hdr(pdf, "III. MODE DE VIE & HABITUDES")
+    _data_row(pdf, "Pas / Jour", "steps", "Sommeil", "sleep")
+    _data_row(pdf, "Niveau de Stress", "stress", "Qualite Alimentaire", "diet", shade=True)
+    _data_row(pdf, "Alcool", "alcohol", "Activite Physique", "activity")
+    pdf.ln(5)
+
+    # ── S4 — RESULTAT IA ──
+    _section_hdr(pdf, "IV.  ANALYSE PAR INTELLIGENCE ARTIFICIELLE")
+
+    rf = RISK_FILLS[res_idx]
+    rb = RISK_BORDERS[res_idx]
+    rt = RISK_TEXTS[res_idx]
+
+    y0 = pdf.get_y()
+    pdf.set_fill_color(*rf)
+    pdf.set_draw_color(*rb)
+    pdf.set_line_width(1.2)
+    pdf.rect(10, y0, 190, 28, 'FD')
+
+    pdf.set_font("Arial", 'B', 17)
+    pdf.set_text_color(*rt)
+    pdf.set_y(y0 + 5)
+    pdf.slot("result_line", 210, 9, align='C', ln=True)
+    pdf.set_font("Arial", 'I', 8.5)
+    pdf.set_text_color(70, 85, 110)
+    pdf.slot("patient_line", 210, 7, align='C', ln=True)
+    pdf.ln(5)
+
+    # probability bars
+    for i, lbl in enumerate(CAT_LBL):
+        yb = pdf.get_y()
+        pdf.set_font("Arial", '', 8)
+        pdf.set_text_color(70, 90, 120)
+        pdf.set_x(14)
+        pdf.cell(48, 8, lbl)
+        pdf.set_fill_color(225, 234, 246)
+        pdf.rect(62, yb+2, BAR_W, 4, 'F')
+        pdf.bar_slot(f"bar{i}", 62, yb+2, 4, BAR_COL[i])
+        pdf.set_font("Arial", 'B', 8)
+        pdf.set_text_color(11, 31, 58)
+        pdf.set_x(184)
+        pdf.slot(f"pct{i}", 22, 8, align='R')
+        pdf.ln(8)
+    pdf.ln(4)
+
+    # ── S5 — FACTEURS ──
+    _section_hdr(pdf, "V.   FACTEURS DETERMINANTS DU RISQUE", keep=6 + 8 * N_FACTORS)
+    pdf.set_font("Arial", 'I', 7.5)
+    pdf.set_text_color(110, 125, 150)
+    pdf.set_x(14)
+    pdf.cell(182, 6, safe(f"Contribution de chaque facteur au resultat \"{CAT_LBL[res_idx]}\" "
+                          "(TreeSHAP) : a droite il l'aggrave, a gauche il l'attenue."), ln=True)
+    for i in range(N_FACTORS):
+        yb = pdf.get_y()
+        pdf.set_font("Arial", 'B', 8)
+        pdf.set_text_color(70, 90, 120)
+        pdf.set_x(14)
+        pdf.slot(f"fac{i}", 48, 8)
+        pdf.set_fill_color(225, 234, 246)
+        pdf.rect(CONTRIB_X - CONTRIB_W, yb+2, 2 * CONTRIB_W, 4, 'F')
+        pdf.set_draw_color(160, 175, 195)
+        pdf.set_line_width(0.3)
+        pdf.line(CONTRIB_X, yb+1, CONTRIB_X, yb+7)
+        pdf.contrib_slot(f"facbar{i}", CONTRIB_X, yb+2, 4, BAR_COL[res_idx])
+        pdf.set_font("Arial", '', 8)
+        pdf.set_text_color(11, 31, 58)
+        pdf.set_x(184)
+        pdf.slot(f"facv{i}", 22, 8, align='R')
+        pdf.ln(8)
+    pdf.ln(4)
+
+    # ── S6 — RECOMMANDATIONS ──
+    _section_hdr(pdf, "VI.  RECOMMANDATIONS MEDICALES")
+    yr = pdf.get_y()
+    pdf.set_fill_color(*rf)
+    pdf.set_draw_color(*rb)
+    pdf.set_line_width(0.5)
+    pdf.set_font("Arial", 'B', 9.5)
+    pdf.set_text_color(*rt)
+    pdf.set_x(14)
+    pdf.multi_cell(182, 8, safe(RECO_TITRE[res_idx]))
+    pdf.set_font("Arial", '', 8.5)
+    pdf.set_text_color(38, 52, 72)
+    pdf.set_x(14)
+    pdf.multi_cell(182, 6, safe(RECO_CORPS[res_idx]))
+    pdf.rect(10, yr, 190, pdf.get_y() - yr + 2, 'D')
+    pdf.ln(5)
+
+    # ── S7 — SIGNATURE ──
+    _section_hdr(pdf, "VII. VALIDATION & SIGNATURE MEDICALE", keep=28)
+    ys = pdf.get_y()
+    pdf.set_fill_color(244, 248, 254)
+    pdf.set_draw_color(210, 222, 238)
+    pdf.set_line_width(0.2)
+    pdf.rect(10, ys, 190, 28, 'FD')
+    pdf.set_y(ys + 4)
+    pdf.set_font("Arial", '', 8)
+    pdf.set_text_color(80, 100, 130)
+    pdf.set_x(14)
+    pdf.cell(90, 6, "Medecin / Cardiologue Responsable :", ln=False)
+    pdf.set_x(120)
+    pdf.cell(80, 6, "Cachet & Signature :", ln=True)
+    pdf.set_draw_color(46, 109, 164)
+    pdf.set_line_width(0.4)
+    pdf.line(14, pdf.get_y() + 11, 104, pdf.get_y() + 11)
+    pdf.line(120, pdf.get_y() + 11, 200, pdf.get_y() + 11)
+    pdf.ln(18)
+    pdf.set_font("Arial", 'I', 7)
+    pdf.set_text_color(140, 155, 175)
+    pdf.set_x(14)
+    pdf.slot("generated_line", 182, 6, align='C', ln=True)
+
+    # footer of the last page (earlier pages got theirs on page break)
+    pdf.in_footer = 1
+    pdf.footer()
+    pdf.in_footer = 0
+
+
+# ── TEMPLATES ──
+class Template:
+    """Page streams and slots of the static layout for one risk class."""
+
+    def __init__(self, res_idx):
+        pdf = ReportPDF()
+        pdf.recording = True
+        _layout(pdf, res_idx)
+        self.pages = [page_stream(pdf, n) for n in range(1, pdf.page + 1)]
+        self.slots = [[s for s in pdf.slots if s[1] == n] for n in range(1, pdf.page + 1)]
+
+
+def page_stream(pdf, n):
+    page = pdf.pages[n]
+    page = getattr(page, "contents", page)  # fpdf2 keeps a PDFPage object
+    return page.decode('latin-1') if isinstance(page, (bytes, bytearray)) else page
+
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def get_template(res_idx):
+    if res_idx not in _templates:
+        with _templates_lock:
+            if res_idx not in _templates:
+                _templates[res_idx] = Template(res_idx)
+    return _templates[res_idx]
+
+
+# ── REPORT ──
+def _unit(v, unit):
+    return "-" if v is None or v == "-" else f"{v} {unit}"
+
+
+def _size(height, weight):
+    """'170 cm / 70.0 kg'; cohorts without height and weight print '-'."""
+    if height in (None, "-") or weight in (None, "-"):
+        return "-"
+    return f"{height} cm / {weight} kg"
+
+
+def report_values(patient, proba, res_idx, risk_score, now, ref_num=None, factors=()):
+    """Text of every slot for one patient.
+
+    `factors` is [(label, contribution)] as returned by cardio_model.top_factors.
+    """
+    heure_pdf = now.strftime("%d/%m/%Y  %H:%M:%S")
+    ref_num   = ref_num or f"CIA-{now.strftime('%Y%m%d%H%M%S')}"
+    nom_pdf    = safe(patient["nom"]).upper()
+    prenom_pdf = safe(patient["prenom"]).upper()
+    values = {
+        "lab_line":       f"Laboratoire de Cardiologie  |  Algerie  |  {heure_pdf}",
+        "ref_line":       f"Reference : {ref_num}",
+        "ref":            ref_num,
+        "nom":            nom_pdf,
+        "prenom":         prenom_pdf,
+        "age":            f"{patient['age']} ans",
+        "family":         safe(patient["family"]),
+        "bp":             f"{patient['sys_bp']}/{patient['dia_bp']} mmHg",
+        "chol":           f"{patient['chol']} mg/dL",
+        "pulse":          f"{patient['pulse']} BPM",
+        "smoke":          safe(patient["smoke"]),
+        "size":           _size(patient.get("height"), patient.get("weight")),
+        "bmi":            _unit(patient.get("bmi"), "kg/m2"),
+        "activity":       _unit(patient.get("activity"), "h/sem."),
+        "steps":          str(patient["steps"]),
+        "sleep":          f"{patient['sleep']} h/nuit",
+        "stress":         f"{patient['stress']} / 10",
+        "diet":           f"{patient['diet']} / 10",
+        "alcohol":        f"{patient['alcohol']} v/sem.",
+        "result_line":    f"{CATS_PDF[res_idx]}   |   Score IA : {risk_score:.1f}%",
+        "patient_line":   f"Patient : {prenom_pdf} {nom_pdf}   |   Age : {patient['age']} ans",
+        "generated_line": f"Ce rapport est genere electroniquement le {heure_pdf}  --  Ref. {ref_num}",
+    }
+    for i, prob in enumerate(proba):
+        values[f"bar{i}"] = float(prob)
+        values[f"pct{i}"] = f"{prob*100:.1f}%"
+    factors = list(factors)[:N_FACTORS]
+    scale = max((abs(v) for _, v in factors), default=0) or 1.0
+    for i in range(N_FACTORS):
+        lbl, v = factors[i] if i < len(factors) else ("", None)
+        values[f"fac{i}"] = safe(lbl)
+        values[f"facv{i}"] = "" if v is None else f"{v:+.2f}"
+        values[f"facbar{i}"] = 0.0 if v is None else v / scale
+    return values
+
+
+def draw_report(pdf, values, res_idx):
+    """Append the pages of one bilan to `pdf`."""
+    tpl = get_template(res_idx)
+    pdf.set_auto_page_break(False)
+    for stream, slots in zip(tpl.pages, tpl.slots):
+        pdf.add_page()
+        pdf._out(f"q\n{stream}Q")
+        for s in slots:
+            if s[0] == "T":
+                _, _, key, x, y, w, h, align, family, style, size, rgb = s
+                page = pdf.page_no() + pdf.page_offset
+                text = (f"Page {page} / {pdf.str_alias_nb_pages}   |   {values['ref']}  "
+                        if key == "page" else values[key])
+                pdf.set_font(family, style, size)
+                pdf.set_text_color(*rgb)
+                pdf.set_xy(x, y)
+                pdf.cell(w, h, text, align=align)
+            elif s[0] == "B":
+                _, _, key, x, y, h, rgb = s
+                pdf.set_fill_color(*rgb)
+                pdf.rect(x, y, int(values[key] * BAR_W), h, 'F')
+            else:
+                _, _, key, x, y, h, rgb = s
+                w = values[key] * CONTRIB_W
+                if w:
+                    pdf.set_fill_color(*(rgb if w > 0 else CONTRIB_NEG))
+                    pdf.rect(min(x, x + w), y, abs(w), h, 'F')
+
+
+def pdf_bytes(pdf):
+    # dest='S' retourne str (fpdf1) ou bytearray/bytes (fpdf2)
+    raw = pdf.output(dest='S')
+    if isinstance(raw, (bytearray, bytes)):
+        return bytes(raw)
+    return raw.encode('latin-1', errors='replace')
+
+
+def build_report(patient, proba, res_idx, risk_score, now, ref_num=None, factors=()):
+    """Render the bilan of one patient and return the PDF bytes."""
+    with perf.timer("pdf_build"):
+        pdf = ReportPDF()
+        values = report_values(patient, proba, res_idx, risk_score, now, ref_num, factors)
+        draw_report(pdf, values, res_idx)
+    with perf.timer("pdf_output"):
+        return pdf_bytes(pdf)
+
+
+def report_filename(patient, now):
+    return f"CardioIA_Bilan_{safe(patient['nom'])}_{safe(patient['prenom'])}_{now.strftime('%Y%m%d')}.pdf"
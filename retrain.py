@@ -0,0 +1,182 @@
+"""Incremental retraining: continue the published booster on newly appended records.
+
+Usage:
+    python retrain.py [--rounds 50] [--holdout 0.2] [--min-rows 200] [--compare]
+    python retrain.py --watch [--interval 900]
+
+Confirmed outcomes are added to the training store with
+`python data_store.py append`. The rows the published model has seen are the
+store prefix whose chained hash is the artifact's data_sha256; only the rows
+after it are read:
+
+  1. a seeded random split of the new rows into update and holdout rows
+  2. up to --rounds boosting rounds added to the booster on the update rows
+     (xgb.train with xgb_model=), early-stopped on the holdout
+  3. the update is accepted only if its holdout logloss is no worse than the
+     published model's and its accuracy on a fixed sample of the earlier rows
+     drops by less than ACC_TOLERANCE
+  4. the accepted rounds are refit on all the new rows and published: booster
+     and NumPy export first, then the metadata in one rename. The app and the
+     API switch to it on their next request (cardio_model.ServingModel).
+
+--compare also times a full refit of the same ensemble on every row.
+--watch repeats the update every --interval seconds (background job).
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import xgboost as xgb
+
+import cardio_model
+import data_store
+import tree_predictor
+
+ROUNDS         = 50
+EARLY_STOPPING = 10
+HOLDOUT        = 0.2
+MIN_ROWS       = 200
+REFERENCE_ROWS = 2000
+ACC_TOLERANCE  = 0.01
+SEED           = 42
+
+
+def booster_params(params):
+    """xgb.train parameters equivalent to the artifact's XGBClassifier params."""
+    p = {k: v for k, v in params.items() if k != "n_estimators"}
+    return dict(p, objective="multi:softprob", num_class=len(cardio_model.RISK_LABELS),
+                eval_metric="mlogloss", seed=SEED)
+
+
+def evaluate(booster, X, y):
+    proba = booster.inplace_predict(np.ascontiguousarray(X, dtype=np.float32))
+    p_true = np.clip(proba[np.arange(len(y)), y], 1e-15, 1)
+    return {"accuracy": float((proba.argmax(axis=1) == y).mean()),
+            "logloss": float(-np.log(p_true).mean())}
+
+
+def update(store_dir=cardio_model.STORE_DIR, rounds=ROUNDS, holdout=HOLDOUT,
+           min_rows=MIN_ROWS, publish=True):
+    """Try one incremental update; return a report dict (see "status")."""
+    store = data_store.open_store(store_dir)
+    meta = cardio_model.read_meta()
+    if meta is None:
+        raise RuntimeError("no published model; run `python train.py`")
+    seen = store.rows_at(meta["data_sha256"])
+    if seen is None:
+        raise RuntimeError("the published model was not trained on this store; run `python train.py`")
+    n_new = store.rows - seen
+    report = {"status": "skipped", "seen_rows": seen, "new_rows": n_new}
+    if n_new < min_rows:
+        return report
+
+    rng = np.random.default_rng(SEED)
+    X_new, y_new = np.asarray(store.X[seen:]), np.asarray(store.y[seen:])
+    perm = rng.permutation(n_new)
+    hold, upd = perm[:max(1, int(n_new * holdout))], perm[max(1, int(n_new * holdout)):]
+    ref = np.sort(rng.choice(seen, min(REFERENCE_ROWS, seen), replace=False))
+    X_ref, y_ref = store.X[ref], store.y[ref]
+
+    base = xgb.Booster(model_file=os.path.join(cardio_model.MODEL_DIR, meta["model_file"]))
+    params = booster_params(meta["params"])
+    names = store.feat_cols
+    t0 = time.perf_counter()
+    cand = xgb.train(params, xgb.DMatrix(X_new[upd], label=y_new[upd], feature_names=names),
+                     num_boost_round=rounds, xgb_model=base, early_stopping_rounds=EARLY_STOPPING,
+                     evals=[(xgb.DMatrix(X_new[hold], label=y_new[hold], feature_names=names),
+                             "holdout")], verbose_eval=False)
+    n_trees = cand.best_iteration + 1
+    cand = cand[:n_trees]
+    added = n_trees - base.num_boosted_rounds()
+
+    before, after = evaluate(base, X_new[hold], y_new[hold]), evaluate(cand, X_new[hold], y_new[hold])
+    ref_before, ref_after = evaluate(base, X_ref, y_ref), evaluate(cand, X_ref, y_ref)
+    accepted = (after["logloss"] <= before["logloss"]
+                and ref_after["accuracy"] > ref_before["accuracy"] - ACC_TOLERANCE)
+    report.update(status="rejected", rounds_added=added, n_trees=n_trees,
+                  holdout_before=before, holdout_after=after,
+                  reference_before=ref_before, reference_after=ref_after)
+    if not accepted or not publish:
+        report["update_seconds"] = time.perf_counter() - t0
+        return report
+
+    final = xgb.train(params, xgb.DMatrix(X_new, label=y_new, feature_names=names),
+                      num_boost_round=added, xgb_model=base)
+    update_seconds = time.perf_counter() - t0
+    mdl = xgb.XGBClassifier()
+    mdl.load_model(bytearray(final.save_raw("ubj")))
+    metrics = {
+        "holdout_rows":       len(hold),
+        "holdout_accuracy":   after["accuracy"],
+        "holdout_logloss":    after["logloss"],
+        "reference_accuracy": ref_after["accuracy"],
+    }
+    published = cardio_model.save_artifact(
+        mdl, names, store.hash, dict(meta["params"], n_estimators=n_trees), update_seconds, metrics,
+        extra={"warm_start": {"from": meta["fingerprint"], "new_rows": n_new, "rounds_added": added}})
+    ensemble, _ = cardio_model.load_model(store_dir, engine="numpy")
+    report.update(status="published", update_seconds=update_seconds, meta=published,
+                  parity=tree_predictor.parity(final, ensemble, X_new))
+    return report
+
+
+def full_refit_seconds(store_dir, n_trees):
+    """Time of a from-scratch fit of `n_trees` rounds on the whole store."""
+    store = data_store.open_store(store_dir)
+    params = dict(cardio_model.read_meta()["params"], n_estimators=n_trees)
+    t0 = time.perf_counter()
+    cardio_model.fit(store.X, store.y, params, store.feat_cols)
+    return time.perf_counter() - t0
+
+
+def print_report(r):
+    print(f"{r['seen_rows']} rows already learnt, {r['new_rows']} new")
+    if r["status"] == "skipped":
+        print("Nothing to do.")
+        return
+    print(f"{'':<24}{'accuracy':>8}{'logloss':>10}")
+    for label, key in [("holdout, published", "holdout_before"), ("holdout, updated", "holdout_after"),
+                       ("earlier rows, published", "reference_before"),
+                       ("earlier rows, updated", "reference_after")]:
+        print(f"{label:<24}{r[key]['accuracy']:>8.4f}{r[key]['logloss']:>10.4f}")
+    print(f"+{r['rounds_added']} rounds ({r['n_trees']} total) in {r['update_seconds']:.2f}s: {r['status']}")
+    if r["status"] == "published":
+        print(f"Saved {r['meta']['model_file']}, NumPy export parity {r['parity']:.2e}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA incremental retraining")
+    parser.add_argument("--store", default=cardio_model.STORE_DIR)
+    parser.add_argument("--rounds", type=int, default=ROUNDS, help="max boosting rounds to add")
+    parser.add_argument("--holdout", type=float, default=HOLDOUT)
+    parser.add_argument("--min-rows", type=int, default=MIN_ROWS, help="new rows needed to update")
+    parser.add_argument("--dry-run", action="store_true", help="validate without publishing")
+    parser.add_argument("--compare", action="store_true", help="also time a full refit")
+    parser.add_argument("--watch", action="store_true", help="run every --interval seconds")
+    parser.add_argument("--interval", type=float, default=900)
+    args = parser.parse_args(argv)
+
+    while True:
+        try:
+            r = update(args.store, args.rounds, args.holdout, args.min_rows, not args.dry_run)
+        except RuntimeError as e:
+            print(e, file=sys.stderr)
+            return 1
+        print_report(r)
+        if args.compare and r["status"] != "skipped":
+            full = full_refit_seconds(args.store, r["n_trees"])
+            print(f"Full refit of {r['n_trees']} rounds: {full:.2f}s "
+                  f"(incremental saves {full - r['update_seconds']:.2f}s, "
+                  f"{full / r['update_seconds']:.1f}x)")
+        if r.get("parity", 0) > tree_predictor.PARITY_ATOL:
+            print("NumPy export does not match the booster", file=sys.stderr)
+            return 1
+        if not args.watch:
+            return 0 if r["status"] != "rejected" else 2
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
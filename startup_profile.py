@@ -0,0 +1,122 @@
+"""Startup profiling for the Streamlit app.
+
+Usage:
+    python startup_profile.py [--top 15] [--json out.json] [--budget 2.5]
+
+Runs app.py once in a fresh interpreter (Streamlit's AppTest harness) with
+`-X importtime` and CARDIO_PROFILE_STARTUP=1, then prints the slowest
+top-level imports, the app's own stage marks and the time to first render.
+--budget makes the exit status 1 when the first render is slower.
+
+With CARDIO_PROFILE_STARTUP=1 under `streamlit run`, app.py writes the same
+stage marks to stderr after its first run in each process.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+ENABLED = os.environ.get("CARDIO_PROFILE_STARTUP") == "1"
+PREFIX  = "cardio-startup "
+HEAVY   = ["pandas", "pyarrow", "xgboost", "sklearn", "scipy", "fpdf", "altair", "matplotlib", "seaborn"]
+
+_t0 = time.perf_counter()
+_marks = []
+_done = False
+
+
+def _process_age():
+    """Seconds since this process started (Linux), else since this module loaded."""
+    try:
+        with open("/proc/self/stat") as f:
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return time.perf_counter() - _t0
+
+
+def mark(stage):
+    """Record the time since process start at `stage` (no-op unless enabled)."""
+    if ENABLED and not _done:
+        _marks.append((stage, round(_process_age(), 3)))
+
+
+def dump():
+    """Write the marks and the heavy modules loaded so far, once per process."""
+    global _done
+    if not ENABLED or _done:
+        return
+    _done = True
+    record = {"marks": dict(_marks), "first_render_s": _marks[-1][1] if _marks else None,
+              "heavy_modules": [m for m in HEAVY if m in sys.modules]}
+    print(PREFIX + json.dumps(record), file=sys.stderr, flush=True)
+
+
+# ── PROFILER ──
+RUNNER = """
+from streamlit.testing.v1 import AppTest
+AppTest.from_file("app.py", default_timeout=120).run()
+"""
+
+
+def parse_importtime(lines):
+    """{top-level package: cumulative seconds} from `-X importtime` output."""
+    totals = {}
+    for line in lines:
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if name.startswith("  "):  # nested import, already in its parent's total
+            continue
+        top = name.strip().split(".")[0]
+        totals[top] = totals.get(top, 0) + int(cumulative) / 1e6
+    return totals
+
+
+def profile():
+    env = dict(os.environ, CARDIO_PROFILE_STARTUP="1")
+    here = os.path.dirname(os.path.abspath(__file__))
+    t0 = time.perf_counter()
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", RUNNER], cwd=here, env=env,
+                         capture_output=True, text=True, check=True)
+    wall = time.perf_counter() - t0
+    lines = out.stderr.splitlines()
+    record = next((json.loads(l[len(PREFIX):]) for l in lines if l.startswith(PREFIX)), {})
+    record["imports"] = parse_importtime(lines)
+    record["wall_s"] = round(wall, 3)
+    return record
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA startup profile")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the profile to this file")
+    parser.add_argument("--budget", type=float, help="max seconds to first render")
+    args = parser.parse_args(argv)
+
+    record = profile()
+    imports = sorted(record["imports"].items(), key=lambda kv: -kv[1])
+    print(f"{'top-level import':<28}{'cumulative s':>14}")
+    for name, secs in imports[:args.top]:
+        print(f"{name:<28}{secs:>14.3f}")
+    print(f"{'(all imports)':<28}{sum(s for _, s in imports):>14.3f}\n")
+    print(f"{'stage':<28}{'since start s':>14}")
+    for stage, secs in record.get("marks", {}).items():
+        print(f"{stage:<28}{secs:>14.3f}")
+    print(f"\nfirst render {record.get('first_render_s')} s, heavy modules loaded: "
+          f"{', '.join(record.get('heavy_modules', [])) or 'none'}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(record, f, indent=2)
+    if args.budget is not None and (record.get("first_render_s") or 0) > args.budget:
+        print(f"over budget ({args.budget} s)", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
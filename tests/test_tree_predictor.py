@@ -0,0 +1,99 @@
+"""Numerical parity of the NumPy tree ensembles with xgboost.
+
+    python -m pytest tests/
+
+Runs on the published artifact when there is one and always on a small
+booster fit here with missing values, so that every split learns a default
+direction the NaN rows must follow.
+"""
+import numpy as np
+import pytest
+
+xgb = pytest.importorskip("xgboost")
+
+import cardio_model
+import data_store
+import tree_predictor
+from tree_predictor import PARITY_ATOL, CompactEnsemble, TreeEnsemble
+
+ROWS = 2_000
+
+
+@pytest.fixture(scope="module")
+def store_rows():
+    store = data_store.open_store()
+    idx = np.random.default_rng(0).choice(store.rows, min(ROWS, store.rows), replace=False)
+    return np.asarray(store.X[np.sort(idx)]), np.asarray(store.y[np.sort(idx)])
+
+
+def with_missing(X, seed=1):
+    X = X.copy()
+    X[np.random.default_rng(seed).random(X.shape) < 0.2] = np.nan
+    X[0] = np.nan  # a row that follows the default direction at every split
+    return X
+
+
+@pytest.fixture(scope="module")
+def fitted(store_rows):
+    X, y = store_rows
+    mdl = xgb.XGBClassifier(n_estimators=30, max_depth=5, objective="multi:softprob")
+    mdl.fit(with_missing(X, seed=2), y)
+    return mdl.get_booster()
+
+
+@pytest.fixture(scope="module")
+def published():
+    try:
+        mdl, _ = cardio_model.load_model(fit_missing=False, engine="xgboost")
+    except FileNotFoundError:
+        pytest.skip("no published model artifact")
+    return mdl.get_booster()
+
+
+@pytest.fixture(params=["fitted", "published"])
+def booster(request):
+    return request.getfixturevalue(request.param)
+
+
+@pytest.fixture(params=[TreeEnsemble, CompactEnsemble])
+def ensemble(request, booster):
+    arrays = tree_predictor.flatten(booster.save_raw("json"))
+    if request.param is CompactEnsemble:
+        arrays = tree_predictor.compress(arrays)
+    return request.param(arrays)
+
+
+def test_parity_on_store_rows(booster, ensemble, store_rows):
+    X, _ = store_rows
+    assert tree_predictor.parity(booster, ensemble, X) <= PARITY_ATOL
+
+
+def test_parity_with_missing_values(booster, ensemble, store_rows):
+    X = with_missing(store_rows[0])
+    assert np.isnan(X).any(axis=1).mean() > 0.5
+    assert tree_predictor.parity(booster, ensemble, X) <= PARITY_ATOL
+
+
+def test_missing_values_take_the_default_branch(fitted, store_rows):
+    """An all-NaN row ends in the leaf reached by following default_right
+    from the root of every tree."""
+    arrays = tree_predictor.flatten(fitted.save_raw("json"))
+    ens = TreeEnsemble(arrays)
+    n_inner = ens.feature.shape[1]
+    node = np.zeros(ens.n_trees, dtype=np.intp)
+    for _ in range(ens.depth):
+        node = 2 * node + 1 + ens.default_right[np.arange(ens.n_trees), node]
+    expected = np.arange(ens.n_trees) * (n_inner + 1) + node - n_inner
+    row = np.full((1, store_rows[0].shape[1]), np.nan, dtype=np.float32)
+    assert np.array_equal(ens.leaves(row)[0], expected)
+    assert tree_predictor.parity(fitted, ens, row) <= PARITY_ATOL
+
+
+def test_export_round_trip(fitted, store_rows, tmp_path):
+    X = with_missing(store_rows[0])
+    for compact, cls in [(False, TreeEnsemble), (True, CompactEnsemble)]:
+        path = str(tmp_path / f"trees-{compact}.npz")
+        tree_predictor.export(fitted, path, compact=compact)
+        ens = TreeEnsemble.load(path)
+        assert type(ens) is cls
+        assert tree_predictor.parity(fitted, ens, X) <= PARITY_ATOL
@@ -0,0 +1,133 @@
+"""Offline training pipeline: grid search with parallel k-fold CV.
+
+Usage:
+    python train.py [--folds 5] [--jobs -1] [--max-trees 1000]
+
+Every (grid point, fold) fit runs as its own single-threaded job across the
+available cores, with tree_method="hist" and early stopping on the held-out
+fold. A grid point's ensemble size is its mean best iteration; the winner is
+the smallest ensemble whose CV accuracy stays within ACC_TOLERANCE of the
+best one. It is refit on all rows and written to models/ with its metrics,
+where the app, the API and the batch tools pick it up on their next start.
+The NumPy export written alongside is checked against the booster.
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+
+import numpy as np
+import xgboost as xgb
+from joblib import Parallel, delayed
+from sklearn.model_selection import StratifiedKFold
+
+import cardio_model
+import data_store
+import tree_predictor
+
+GRID = {
+    "max_depth":     [3, 4, 5, 6],
+    "learning_rate": [0.05, 0.1, 0.2],
+}
+FIXED = {"tree_method": "hist", "eval_metric": "mlogloss"}
+MAX_TREES      = 1000
+EARLY_STOPPING = 30
+ACC_TOLERANCE  = 0.005
+SEED           = 42
+SEARCH_PATH    = os.path.join(cardio_model.MODEL_DIR, "cardio_xgb.search.json")
+
+
+def grid_points(grid=GRID):
+    keys = sorted(grid)
+    return [dict(zip(keys, values)) for values in itertools.product(*(grid[k] for k in keys))]
+
+
+def fit_fold(params, X, y, train_idx, val_idx, max_trees=MAX_TREES):
+    """Fit one fold with early stopping; return (trees, accuracy, logloss)."""
+    mdl = xgb.XGBClassifier(n_estimators=max_trees, early_stopping_rounds=EARLY_STOPPING,
+                            n_jobs=1, random_state=SEED, **FIXED, **params)
+    mdl.fit(X[train_idx], y[train_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+    acc = float((mdl.predict(X[val_idx]) == y[val_idx]).mean())  # at the best iteration
+    return mdl.best_iteration + 1, acc, float(mdl.best_score)
+
+
+def cross_validate(X, y, grid=GRID, folds=5, jobs=-1, max_trees=MAX_TREES):
+    """CV every grid point; return one result dict per point."""
+    points = grid_points(grid)
+    splits = list(StratifiedKFold(folds, shuffle=True, random_state=SEED).split(X, y))
+    runs = Parallel(n_jobs=jobs)(
+        delayed(fit_fold)(p, X, y, tr, va, max_trees) for p in points for tr, va in splits)
+    results = []
+    for k, params in enumerate(points):
+        trees, acc, loss = map(np.array, zip(*runs[k * folds:(k + 1) * folds]))
+        results.append({
+            "params":       params,
+            "n_estimators": int(np.ceil(trees.mean())),
+            "accuracy":     round(float(acc.mean()), 4),
+            "accuracy_std": round(float(acc.std()), 4),
+            "logloss":      round(float(loss.mean()), 4),
+        })
+    return results
+
+
+def select(results, tolerance=ACC_TOLERANCE):
+    """Smallest ensemble within `tolerance` of the best CV accuracy."""
+    best = max(r["accuracy"] for r in results)
+    close = [r for r in results if r["accuracy"] >= best - tolerance]
+    return min(close, key=lambda r: (r["n_estimators"], r["logloss"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="CardioIA offline training")
+    parser.add_argument("--store", default=cardio_model.STORE_DIR)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--jobs", type=int, default=-1, help="parallel fits (-1: all cores)")
+    parser.add_argument("--max-trees", type=int, default=MAX_TREES)
+    args = parser.parse_args(argv)
+
+    store = data_store.open_store(args.store)
+    X, y = store.X, store.y
+
+    t0 = time.perf_counter()
+    results = cross_validate(X, y, folds=args.folds, jobs=args.jobs, max_trees=args.max_trees)
+    cv_seconds = time.perf_counter() - t0
+    best = select(results)
+    print(f"{'max_depth':>9}{'lr':>7}{'trees':>7}{'acc':>8}{'+/-':>8}{'logloss':>9}")
+    for r in sorted(results, key=lambda r: -r["accuracy"]):
+        mark = "  <-" if r is best else ""
+        print(f"{r['params']['max_depth']:>9}{r['params']['learning_rate']:>7}{r['n_estimators']:>7}"
+              f"{r['accuracy']:>8.4f}{r['accuracy_std']:>8.4f}{r['logloss']:>9.4f}{mark}")
+
+    params = {"n_estimators": best["n_estimators"], **best["params"], "tree_method": "hist"}
+    t0 = time.perf_counter()
+    mdl = cardio_model.fit(X, y, params, store.feat_cols)
+    train_seconds = time.perf_counter() - t0
+    metrics = {
+        "cv_folds":        args.folds,
+        "cv_accuracy":     best["accuracy"],
+        "cv_accuracy_std": best["accuracy_std"],
+        "cv_logloss":      best["logloss"],
+        "cv_seconds":      round(cv_seconds, 2),
+    }
+    meta = cardio_model.save_artifact(mdl, store.feat_cols, store.hash, params, train_seconds, metrics)
+    with open(SEARCH_PATH, "w") as f:
+        json.dump({"fingerprint": meta["fingerprint"], "results": results}, f, indent=2)
+
+    print(f"\n{len(results)} candidates x {args.folds} folds in {cv_seconds:.1f}s")
+    print(f"Saved {meta['model_file']}: {json.dumps(params)}")
+    print(f"CV accuracy {best['accuracy']:.4f} +/- {best['accuracy_std']:.4f}, "
+          f"refit {train_seconds:.2f}s")
+
+    ensemble, _ = cardio_model.load_model(engine="numpy")
+    diff = tree_predictor.parity(mdl.get_booster(), ensemble, X)
+    print(f"NumPy export parity: max |dproba| = {diff:.2e}")
+    if diff > tree_predictor.PARITY_ATOL:
+        print("NumPy export does not match the booster", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
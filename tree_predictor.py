@@ -0,0 +1,247 @@
+"""Pure-NumPy evaluation of the exported XGBoost ensemble.
+
+Usage:
+    python tree_predictor.py export [--compact]   # (re)write the .npz of the current artifact
+    python tree_predictor.py check                # parity with xgboost on the training data
+
+Every tree is padded to a complete binary tree of the ensemble's depth and
+stored in heap order, so the children of node i are 2i+1 and 2i+2 and a walk
+needs no child pointers: per level, one gather of the split feature and
+threshold for all (row, tree) pairs. Leaves above the bottom level are
+pushed down as always-left splits. The .npz holds the per-node feature
+index, threshold and missing-value direction, the bottom-level leaf values,
+the class of every tree and the base score. Serving with it needs neither
+xgboost nor pandas.
+
+The compact export (--compact, CARDIO_COMPACT_TREES=1) stores each node as a
+uint8 feature / missing direction and a uint16 index into the sorted
+distinct thresholds. It predicts exactly the same (CompactEnsemble) from a
+file about 40 % smaller; it only saves bytes: the extra gather per level
+makes batch scoring slower than the heap layout (python -m
+benchmarks.bench_compact), and a worker's memory is the Python / NumPy
+runtime, not the model.
+"""
+import json
+import os
+import sys
+
+import numpy as np
+
+PARITY_ATOL = 1e-5
+BLOCK_ROWS  = 256  # rows walked together; keeps the (rows, trees) temporaries in cache
+
+
+def flatten(raw_json):
+    """Heap-ordered node arrays of a booster saved with `save_raw("json")`."""
+    learner = json.loads(raw_json)["learner"]
+    if learner["objective"]["name"] != "multi:softprob":
+        raise ValueError(f"unsupported objective {learner['objective']['name']}")
+    model = learner["gradient_booster"]["model"]
+    base_score = np.atleast_1d(np.asarray(
+        json.loads(learner["learner_model_param"]["base_score"]), dtype=np.float32))
+    n_class = int(learner["learner_model_param"]["num_class"])
+    trees = model["trees"]
+    if any(any(t["split_type"]) for t in trees):
+        raise ValueError("categorical splits are not supported")
+
+    def tree_depth(t, n=0):
+        lc, rc = t["left_children"][n], t["right_children"][n]
+        return 0 if lc == -1 else 1 + max(tree_depth(t, lc), tree_depth(t, rc))
+
+    depth = max(tree_depth(t) for t in trees)
+    n_inner, n_leaf = 2 ** depth - 1, 2 ** depth
+    feature       = np.zeros((len(trees), n_inner), dtype=np.int32)
+    threshold     = np.full((len(trees), n_inner), np.inf, dtype=np.float32)
+    default_right = np.zeros((len(trees), n_inner), dtype=bool)
+    value         = np.zeros((len(trees), n_leaf), dtype=np.float32)
+
+    for k, t in enumerate(trees):
+        stack = [(0, 0)]  # (xgboost node, heap position)
+        while stack:
+            n, h = stack.pop()
+            lc, rc = t["left_children"][n], t["right_children"][n]
+            if h >= n_inner:
+                value[k, h - n_inner] = t["split_conditions"][n]  # leaf weight
+            elif lc == -1:
+                stack += [(n, 2 * h + 1), (n, 2 * h + 2)]  # +inf threshold: both sides agree
+            else:
+                feature[k, h] = t["split_indices"][n]
+                threshold[k, h] = t["split_conditions"][n]
+                default_right[k, h] = not t["default_left"][n]
+                stack += [(lc, 2 * h + 1), (rc, 2 * h + 2)]
+
+    return {
+        "feature":       feature,
+        "threshold":     threshold,
+        "default_right": default_right,
+        "value":         value,
+        "tree_class":    np.asarray(model["tree_info"], dtype=np.int32),
+        "base_score":    np.broadcast_to(base_score, (n_class,)).copy(),
+    }
+
+
+def compress(arrays):
+    """The compact form of flatten()'s arrays; predictions are unchanged.
+
+    Thresholds become uint16 indices into "cuts", the sorted distinct float32
+    thresholds of the whole ensemble (+inf last, for the padding nodes). The
+    feature index and the missing direction share one uint8 per node and the
+    classes are uint8: 4 bytes per inner node instead of 9.
+    """
+    feature, threshold = arrays["feature"], arrays["threshold"]
+    if feature.size and feature.max() >= 0x80:
+        raise ValueError(f"{feature.max() + 1} features do not fit the compact node code")
+    cuts = np.unique(threshold)  # NumPy sorts +inf last
+    if len(cuts) > np.iinfo(np.uint16).max + 1:
+        raise ValueError(f"{len(cuts)} distinct thresholds; the compact export holds 65536")
+    if not len(cuts) or cuts[-1] != np.inf:
+        cuts = np.append(cuts, np.float32(np.inf))
+    node = feature.astype(np.uint8) | (arrays["default_right"].astype(np.uint8) << 7)
+    out = {k: v for k, v in arrays.items() if k not in ("feature", "threshold", "default_right")}
+    return dict(out, node=node, cut=np.searchsorted(cuts, threshold).astype(np.uint16), cuts=cuts,
+                tree_class=arrays["tree_class"].astype(np.uint8))
+
+
+def export(booster, path, compact=False):
+    """Write the flattened `booster` to `path` (.npz) and return the arrays.
+
+    `compact` writes the compress()ed form.
+    """
+    arrays = flatten(booster.save_raw("json"))
+    if compact:
+        arrays = compress(arrays)
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **arrays)
+    os.replace(tmp, path)
+    return arrays
+
+
+class TreeEnsemble:
+    """Vectorized predictor over the exported arrays.
+
+    Duck-types XGBClassifier.predict_proba, which is all cardio_model.predict
+    needs from a model.
+    """
+
+    def __init__(self, arrays):
+        self.feature = np.asarray(arrays["feature"])
+        self.threshold = np.asarray(arrays["threshold"])
+        self.default_right = np.asarray(arrays["default_right"])
+        self._leaves_and_classes(arrays)
+
+    def _leaves_and_classes(self, arrays):
+        self.value = np.asarray(arrays["value"])
+        self.tree_class = np.asarray(arrays["tree_class"])
+        self.base_score = np.asarray(arrays["base_score"])
+        self.n_trees, n_inner = self.feature.shape
+        self.depth = n_inner.bit_length()
+        self.n_classes = len(self.base_score)
+        # (trees, classes) one-hot: summing leaf values per class is one matmul
+        self.class_matrix = np.zeros((self.n_trees, self.n_classes), dtype=np.float32)
+        self.class_matrix[np.arange(self.n_trees), self.tree_class] = 1
+
+    @classmethod
+    def load(cls, path):
+        """TreeEnsemble or CompactEnsemble, whichever `path` holds."""
+        with np.load(path) as f:
+            arrays = dict(f)
+        return CompactEnsemble(arrays) if "cuts" in arrays else cls(arrays)
+
+    @property
+    def nbytes(self):
+        """Bytes of the arrays a prediction reads."""
+        return sum(a.nbytes for a in vars(self).values() if isinstance(a, np.ndarray))
+
+    def leaves(self, X):
+        """Index into `value` (flattened) of the leaf reached in every tree, shape (n, trees)."""
+        n, n_feat = X.shape
+        n_inner = self.feature.shape[1]
+        feature = self.feature.ravel()
+        flat_x = X.ravel()
+        tree_base = np.arange(self.n_trees, dtype=np.intp) * n_inner
+        row_base = np.arange(n, dtype=np.intp)[:, None] * n_feat
+        missing = np.isnan(X).any()
+        node = np.zeros((n, self.n_trees), dtype=np.intp)
+        for _ in range(self.depth):
+            at = tree_base + node
+            x = flat_x[row_base + feature[at]]
+            right = x >= self._threshold(at)
+            if missing:
+                right |= np.isnan(x) & self.default_right.ravel()[at]
+            node = 2 * node + 1 + right
+        return np.arange(self.n_trees, dtype=np.intp) * (n_inner + 1) + node - n_inner
+
+    def _threshold(self, at):
+        return self.threshold.ravel()[at]
+
+    def predict_margin(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        value = self.value.ravel()
+        out = np.empty((len(X), self.n_classes), dtype=np.float32)
+        for i in range(0, len(X), BLOCK_ROWS):
+            block = X[i:i + BLOCK_ROWS]
+            out[i:i + len(block)] = value[self.leaves(block)] @ self.class_matrix
+        return out + self.base_score
+
+    def predict_proba(self, X):
+        margin = self.predict_margin(X)
+        e = np.exp(margin - margin.max(axis=1, keepdims=True))
+        return e / e.sum(axis=1, keepdims=True)
+
+
+class CompactEnsemble(TreeEnsemble):
+    """TreeEnsemble over the compress()ed arrays (same predictions)."""
+
+    def __init__(self, arrays):
+        node = np.asarray(arrays["node"])
+        self.feature = node & 0x7F
+        self.default_right = node >= 0x80
+        self.cut = np.asarray(arrays["cut"])
+        self.cuts = np.asarray(arrays["cuts"])
+        self._leaves_and_classes(arrays)
+
+    def _threshold(self, at):
+        return self.cuts[self.cut.ravel()[at]]
+
+
+def parity(booster, ensemble, X):
+    """Max absolute difference between xgboost and NumPy probabilities."""
+    X = np.ascontiguousarray(X, dtype=np.float32)
+    return float(np.abs(booster.inplace_predict(X) - ensemble.predict_proba(X)).max())
+
+
+# ── CLI ──
+def main(argv=None):
+    import argparse
+
+    import cardio_model
+
+    parser = argparse.ArgumentParser(description="CardioIA NumPy tree export")
+    parser.add_argument("cmd", choices=["export", "check"])
+    parser.add_argument("--compact", action="store_true", default=cardio_model.COMPACT_TREES,
+                        help="export the compact form")
+    args = parser.parse_args(argv)
+
+    model, _ = cardio_model.load_model(engine="xgboost")
+    if args.cmd == "export":
+        meta = cardio_model.export_trees(model.get_booster(), cardio_model.read_meta(), args.compact)
+        print(f"Wrote {meta['tree_file']} ({meta['tree_format']})")
+    ensemble, _ = cardio_model.load_model(engine="numpy")  # exports if missing
+
+    X, _ = cardio_model.load_training_data()
+    X_missing = X.copy()
+    X_missing[::7, ::3] = np.nan  # exercise the default directions too
+    diff = max(parity(model.get_booster(), ensemble, X),
+               parity(model.get_booster(), ensemble, X_missing))
+    ok = diff <= PARITY_ATOL
+    print(f"{ensemble.n_trees} trees of depth {ensemble.depth}, {type(ensemble).__name__} "
+          f"({ensemble.nbytes / 1024:.1f} KiB)")
+    print(f"parity on {2 * len(X)} rows: max |dproba| = {diff:.2e} "
+          f"({'OK' if ok else 'FAIL'}, tolerance {PARITY_ATOL:g})")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
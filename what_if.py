@@ -0,0 +1,75 @@
+"""What-if / sensitivity analysis around one patient.
+
+Every scenario is a copy of the patient's feature row with one or more
+features changed; all of them are scored in a single booster call.
+"""
+import numpy as np
+
+import cardio_model
+
+# UI label and (min, max, points) of the sweep, roughly the training ranges
+SWEEPS = {
+    'systolic_bp':                      ("Tension Systolique (mmHg)", 90, 200, 45),
+    'diastolic_bp':                     ("Tension Diastolique (mmHg)", 60, 120, 31),
+    'cholesterol_mg_dl':                ("Cholesterol (mg/dL)", 140, 340, 41),
+    'resting_heart_rate':               ("Pouls (BPM)", 45, 100, 28),
+    'smoking_status':                   ("Tabagisme (0 Jamais, 1 Ex, 2 Fumeur)", 0, 2, 3),
+    'daily_steps':                      ("Pas / Jour", 500, 17000, 34),
+    'stress_level':                     ("Niveau de Stress", 1, 10, 10),
+    'physical_activity_hours_per_week': ("Activite (h/sem.)", 0, 13, 27),
+    'sleep_hours':                      ("Sommeil (H/nuit)", 4, 10, 25),
+    'diet_quality_score':               ("Qualite Alimentaire", 1, 10, 10),
+    'alcohol_units_per_week':           ("Alcool (verres/sem.)", 0, 30, 31),
+    'bmi':                              ("IMC", 15, 41, 27),
+}
+DEFAULT_SWEEPS = ['systolic_bp', 'cholesterol_mg_dl', 'daily_steps', 'smoking_status', 'sleep_hours']
+
+# named scenarios: label -> {feature: function of the current value}
+SCENARIOS = {
+    "Tension systolique -20 mmHg": {'systolic_bp': lambda v: v - 20},
+    "Arret du tabac":              {'smoking_status': lambda v: 0},
+    "Cholesterol -40 mg/dL":       {'cholesterol_mg_dl': lambda v: v - 40},
+    "+4000 pas / jour":            {'daily_steps': lambda v: v + 4000},
+    "Sommeil 8 h":                 {'sleep_hours': lambda v: 8},
+}
+
+
+def sweep_values(feature):
+    _, lo, hi, n = SWEEPS[feature]
+    return np.linspace(lo, hi, n, dtype=np.float32)
+
+
+def build_grid(x, feat_cols, features):
+    """Stack the patient row, one sweep per feature and the named scenarios."""
+    x = np.asarray(x, dtype=np.float32).reshape(-1)
+    col = {c: i for i, c in enumerate(feat_cols)}
+    blocks, index = [x[None, :]], {}
+    start = 1
+    for f in features:
+        values = sweep_values(f)
+        block = np.repeat(x[None, :], len(values), axis=0)
+        block[:, col[f]] = values
+        blocks.append(block)
+        index[f] = (start, values)
+        start += len(values)
+    for name, changes in SCENARIOS.items():
+        row = x.copy()
+        for f, change in changes.items():
+            row[col[f]] = change(row[col[f]])
+        blocks.append(row[None, :])
+        index[name] = (start, None)
+        start += 1
+    return np.concatenate(blocks), index
+
+
+def analyse(model, x, feat_cols, features=DEFAULT_SWEEPS):
+    """Score every scenario in one call.
+
+    Returns (base proba, {feature: (values, proba)}, {scenario: proba}).
+    """
+    grid, index = build_grid(x, feat_cols, features)
+    proba, _, _ = cardio_model.predict(model, grid)
+    curves = {f: (values, proba[i:i + len(values)])
+              for f, (i, values) in index.items() if values is not None}
+    scenarios = {name: proba[i] for name, (i, values) in index.items() if values is None}
+    return proba[0], curves, scenarios